@@ -0,0 +1,46 @@
+"""Add product photo variants table and processing status
+
+Revision ID: 014
+Revises: 25786fc02a9b
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '25786fc02a9b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Статус фоновой обработки фото (существующие фото считаются готовыми)
+    op.add_column('product_photos', sa.Column('processing_status', sa.String(20), nullable=False, server_default='ready'))
+    
+    # Варианты фото разных размеров и форматов
+    op.create_table(
+        'product_photo_variants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('photo_id', sa.Integer(), nullable=False),
+        sa.Column('size', sa.String(20), nullable=False),
+        sa.Column('format', sa.String(10), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('file_path', sa.String(500), nullable=False),
+        sa.Column('file_size', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['photo_id'], ['product_photos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('photo_id', 'size', 'format', name='uq_product_photo_variants_photo_size_format')
+    )
+    op.create_index('ix_product_photo_variants_id', 'product_photo_variants', ['id'])
+    op.create_index('ix_product_photo_variants_photo_id', 'product_photo_variants', ['photo_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_photo_variants_photo_id', 'product_photo_variants')
+    op.drop_index('ix_product_photo_variants_id', 'product_photo_variants')
+    op.drop_table('product_photo_variants')
+    op.drop_column('product_photos', 'processing_status')
@@ -0,0 +1,28 @@
+"""Add content hash to product photos for deduplicated storage
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SHA-256 содержимого: фото с одинаковым хэшем ссылаются на один файл.
+    # У ранее загруженных фото хэша нет, они остаются по старым путям
+    op.add_column('product_photos', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.create_index('ix_product_photos_content_hash', 'product_photos', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_photos_content_hash', 'product_photos')
+    op.drop_column('product_photos', 'content_hash')
@@ -0,0 +1,51 @@
+"""Add unified qr_tokens index for orders and shop orders
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'qr_tokens',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('token', sa.String(64), nullable=False),
+        sa.Column('entity_type', sa.String(20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('revoked', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_qr_tokens_token', 'qr_tokens', ['token'], unique=True)
+    op.create_index('ix_qr_tokens_entity', 'qr_tokens', ['entity_type', 'entity_id'])
+
+    # Переносим уже выданные токены. Если токен заказа магазина совпал
+    # с токеном основного заказа, побеждает основной (как в прежнем поиске)
+    op.execute(
+        "INSERT INTO qr_tokens (token, entity_type, entity_id, revoked, created_at) "
+        "SELECT qr_payload, 'order', id, false, COALESCE(qr_generated_at, CURRENT_TIMESTAMP) "
+        "FROM orders WHERE qr_payload IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO qr_tokens (token, entity_type, entity_id, revoked, created_at) "
+        "SELECT qr_payload, 'shop_order', id, false, COALESCE(qr_generated_at, CURRENT_TIMESTAMP) "
+        "FROM shop_orders WHERE qr_payload IS NOT NULL "
+        "AND qr_payload NOT IN (SELECT token FROM qr_tokens)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_qr_tokens_entity', 'qr_tokens')
+    op.drop_index('ix_qr_tokens_token', 'qr_tokens')
+    op.drop_table('qr_tokens')
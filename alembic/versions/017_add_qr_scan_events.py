@@ -0,0 +1,41 @@
+"""Add qr_scan_events for offline scanner sync
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'qr_scan_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('client_id', sa.String(64), nullable=False),
+        sa.Column('device_id', sa.String(64), nullable=True),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('token', sa.String(64), nullable=True),
+        sa.Column('action', sa.String(20), nullable=False),
+        sa.Column('scanned_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('result', sa.String(20), nullable=False),
+        sa.Column('entity_type', sa.String(20), nullable=True),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+    )
+    # Уникальность client_id - основа идемпотентной синхронизации
+    op.create_index('ix_qr_scan_events_client_id', 'qr_scan_events', ['client_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_qr_scan_events_client_id', 'qr_scan_events')
+    op.drop_table('qr_scan_events')
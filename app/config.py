@@ -22,6 +22,54 @@ class Settings(BaseSettings):
     smtp_username: Optional[str] = None
     smtp_password: Optional[str] = None
     
+    # Response cache for anonymous shop pages
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 512
+    
+    # Response compression
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024  # Ответы меньше этого размера не сжимаются
+    compression_level: int = 6
+    
+    # Templates
+    template_bytecode_cache_dir: Optional[str] = None  # None - системная временная папка
+    template_precompile: bool = False  # Компилировать все шаблоны при старте
+    
+    # Image processing
+    image_workers: int = 2  # Процессов для создания вариантов фото
+    media_cache_dir: str = "cache/media"  # Уменьшенные копии фото, создаваемые по запросу
+    media_cache_max_mb: int = 512
+    
+    # QR label sheets
+    label_font_path: Optional[str] = None  # TTF с кириллицей; по умолчанию ищется DejaVuSans
+    
+    # Uploads
+    max_request_body_mb: int = 12  # Больше - 413 до чтения тела (фото до 10 МБ + поля формы)
+    max_concurrent_uploads: int = 4
+    
+    # Metrics (/metrics в формате OpenMetrics)
+    metrics_enabled: bool = True
+    metrics_token: Optional[str] = None  # Требуется заголовок Authorization: Bearer <token>; без токена /metrics работает только в development
+    metrics_multiprocess_dir: Optional[str] = None  # Общий каталог снимков при нескольких воркерах
+    metrics_flush_interval: float = 5.0  # Как часто воркер записывает свой снимок, секунды
+    
+    # N+1 detector: один отпечаток SQL больше порога раз за запрос
+    nplusone_mode: str = "warn"  # off | warn | raise (raise - для тестов)
+    nplusone_threshold: int = 10
+    
+    # Slow requests: SQL-трасса и EXPLAIN для запросов дольше порога (/admin/metrics)
+    slow_request_capture: bool = True
+    slow_request_threshold: float = 1.0  # Секунды
+    slow_request_buffer_size: int = 50  # Сколько последних медленных запросов хранить
+    slow_request_explain_top: int = 3  # Для скольких самых медленных SQL строить план
+    
+    # Tracing: спаны запросов, SQL, шаблонов и фоновых задач в файл OTLP/JSON (JSON-lines)
+    tracing_enabled: bool = False
+    tracing_export_path: str = "logs/traces.jsonl"
+    tracing_service_name: str = "sirius-sklad"
+    tracing_sample_rate: float = 1.0  # Доля записываемых трасс без входящего traceparent
+    tracing_flush_interval: float = 1.0  # Как часто спаны пишутся в файл, секунды
+    
     # Environment
     environment: str = "development"
     debug: bool = True
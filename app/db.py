@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .services.sql_stats import sql_fingerprint, sql_stats
+from .services.tracing import SPAN_KIND_CLIENT, tracer
 
 # Create database engine
 engine = create_engine(
@@ -9,6 +13,41 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
 )
 
+
+# Timing of every SQL statement. Listeners are registered on the Engine class,
+# so engines created elsewhere (tests, scripts) are instrumented as well
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+    if tracer.enabled:
+        context._trace_span = tracer.start_child("sql", SPAN_KIND_CLIENT, {"db.system": conn.dialect.name})
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is not None and context.execution_options.get("sql_stats", True):
+        sql_stats.record(statement, time.perf_counter() - start, parameters, executemany, conn.engine)
+    _end_trace_span(context, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    if context is not None:
+        _end_trace_span(context, exception_context.statement, exception_context.original_exception)
+
+
+def _end_trace_span(context, statement, error=None):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        context._trace_span = None
+        _, operation, table = sql_fingerprint(statement or "")
+        span.name = f"{operation} {table}".strip() or "sql"
+        span.set_attribute("db.statement", statement)
+        tracer.end_span(span, error)
+
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -16,6 +55,12 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+# Rows fetched per request: every ORM object materialized from a result row
+@event.listens_for(Base, "load", propagate=True)
+def _on_load(target, context):
+    sql_stats.record_row()
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -1,12 +1,23 @@
 from fastapi import FastAPI, Request, Depends
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from sqlalchemy.orm import Session
 from .config import settings
 from .db import engine, Base, get_db
-from .routers import web_public, web_products, web_orders, web_analytics, web_admin_panel, api, web_shop, shop_api, shop_admin, qr_scanner, delivery_payment, delivery_notifications
+from .routers import web_public, web_products, web_orders, web_analytics, web_admin_panel, api, web_shop, shop_api, shop_admin, qr_scanner, delivery_payment, delivery_notifications, media, metrics
 from .services.auth import get_current_user_optional
+from .services.response_cache import response_cache
+from .middleware.response_cache import ResponseCacheMiddleware
+from .middleware.compression import CompressionMiddleware
+from .middleware.upload_limit import RequestSizeLimitMiddleware
+from .middleware.tracing import TracingMiddleware
+from .middleware.profiling import ProfilingMiddleware
+from .middleware.error_handler import ErrorHandlerMiddleware
+from .services.monitoring import PerformanceMiddleware
+from .services.metrics_export import metrics_store
+from .services.tracing import tracer
+from .services.static_assets import PrecompressedStaticFiles
+from .services.image_pipeline import image_pipeline
+from .templating import templates, precompile_templates
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -27,11 +38,54 @@ app.add_middleware(
     https_only=False  # Разрешаем HTTP для локальной разработки
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Кэш готовых HTML-ответов анонимных страниц магазина.
+# Добавляется после SessionMiddleware, чтобы попадание в кэш не загружало сессию
+if settings.response_cache_enabled:
+    response_cache.max_entries = settings.response_cache_max_entries
+    app.add_middleware(ResponseCacheMiddleware)
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
+# Ограничение размера тела запроса: большие загрузки отклоняются до разбора multipart
+app.add_middleware(RequestSizeLimitMiddleware, max_body_size=settings.max_request_body_mb * 1024 * 1024)
+
+# Сжатие ответов - снаружи кэша ответов, чтобы сжимать и попадания в кэш
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        level=settings.compression_level
+    )
+
+# Профилирование запросов по требованию (/admin/profiler); без активной сессии - одна проверка флага
+app.add_middleware(ProfilingMiddleware)
+
+# Трассировка (спан запроса с дочерними спанами SQL и шаблонов) - только при TRACING_ENABLED
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
+# Метрики запросов (гистограммы по шаблонам маршрутов) - снаружи кэша, сжатия, профилирования
+# и трассировки, чтобы учитывать и ответы из кэша, и время сжатия; снаружи только ErrorHandlerMiddleware
+app.add_middleware(PerformanceMiddleware)
+
+# Страница или JSON 500 вместо необработанного исключения - снаружи метрик и трассировки,
+# чтобы они видели само исключение; начатый (потоковый) ответ не подменяется
+app.add_middleware(ErrorHandlerMiddleware)
+
+# Mount static files (сжатые варианты и fingerprint готовит scripts/build_static.py)
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
+
+# Компиляция шаблонов при старте, чтобы первый запрос не ждал компиляции
+if settings.template_precompile:
+    precompile_templates()
+
+# Пул процессов обработки фото создаётся при первой загрузке, останавливаем его вместе с приложением
+app.add_event_handler("shutdown", image_pipeline.shutdown)
+
+# Снимки метрик воркера для /metrics (только если задан METRICS_MULTIPROCESS_DIR)
+app.add_event_handler("startup", metrics_store.start)
+app.add_event_handler("shutdown", metrics_store.stop)
+
+# Дописываем накопленные спаны при остановке
+app.add_event_handler("shutdown", tracer.shutdown)
 
 # Include routers
 app.include_router(web_public.router)
@@ -46,6 +100,8 @@ app.include_router(shop_admin.router)
 app.include_router(qr_scanner.router)
 app.include_router(delivery_payment.router)
 app.include_router(delivery_notifications.router)
+app.include_router(media.router)
+app.include_router(metrics.router)
 
 # Роуты для основных страниц
 @app.get("/")
@@ -1,11 +1,11 @@
 from fastapi import FastAPI, Request, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from sqlalchemy.orm import Session
 from .config import settings
 from .db import engine, Base, get_db
 from .services.auth import get_current_user_optional
+from .templating import templates
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -29,9 +29,6 @@ app.add_middleware(
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
-
 # ВАЖНО: Импортируем роутеры ПОСЛЕ создания app
 # Это предотвращает циклические импорты
 
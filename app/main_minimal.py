@@ -1,12 +1,12 @@
 from fastapi import FastAPI, Request, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from sqlalchemy.orm import Session
 from .config import settings
 from .db import engine, Base, get_db
 from .routers import web_public, web_products, web_orders
 from .services.auth import get_current_user_optional
+from .templating import templates
 
 # Create tables при импорте (синхронно)
 try:
@@ -34,9 +34,6 @@ app.add_middleware(
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
-
 # Include ТОЛЬКО БАЗОВЫЕ роутеры
 app.include_router(web_public.router)
 app.include_router(web_products.router)
@@ -0,0 +1,251 @@
+import time
+import zlib
+from typing import Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+
+# Типы содержимого, которые уже сжаты - повторное сжатие только тратит CPU
+SKIP_MEDIA_TYPE_PREFIXES = (
+    "image/png", "image/jpeg", "image/gif", "image/webp", "image/avif",
+    "video/", "audio/", "font/woff",
+    "application/zip", "application/gzip", "application/x-gzip",
+    "application/pdf", "application/octet-stream",
+)
+
+
+class CompressionStats:
+    """Счётчики работы middleware сжатия"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.compressed = {"gzip": 0, "br": 0}
+        self.skipped = {"small": 0, "media_type": 0, "encoded": 0, "partial": 0, "not_accepted": 0}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.time_spent = 0.0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, duration: float):
+        self.compressed[encoding] += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.time_spent += duration
+
+    def get_stats(self) -> Dict:
+        total = sum(self.compressed.values())
+        return {
+            "compressed": dict(self.compressed),
+            "skipped": dict(self.skipped),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0,
+            "total_time_ms": round(self.time_spent * 1000, 3),
+            "avg_time_ms": round(self.time_spent * 1000 / total, 3) if total else 0,
+        }
+
+
+# Глобальная статистика сжатия
+compression_stats = CompressionStats()
+
+
+class _Compressor:
+    """Потоковый компрессор gzip/brotli"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 - формат gzip
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    """Accept-Encoding -> {кодировка: q}; некорректный q считается запретом"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def _strip_weak_etags(scope):
+    """Снимает W/ с тегов If-None-Match: слабый ETag сжатого ответа сравнивается с исходным"""
+    headers = scope.get("headers", [])
+    for index, (name, value) in enumerate(headers):
+        if name == b"if-none-match" and b"W/" in value:
+            tags = b",".join(tag.strip().removeprefix(b"W/") for tag in value.split(b","))
+            scope["headers"] = headers[:index] + [(name, tags)] + headers[index + 1:]
+            return
+
+
+class CompressionMiddleware:
+    """ASGI middleware сжатия ответов (gzip, brotli при наличии модуля)
+
+    Маленькие ответы и уже сжатые типы содержимого пропускаются.
+    Ответы из нескольких частей (StreamingResponse) сжимаются потоково.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6, stats: CompressionStats = compression_stats):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.stats = stats
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Выбирает кодировку из Accept-Encoding клиента: наибольший q, при равенстве br"""
+        weights = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in (("br",) if brotli is not None else ()) + ("gzip",):
+            q = weights.get(encoding, weights.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is not None:
+            _strip_weak_etags(scope)
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Состояние сжатия одного ответа"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send):
+        self.middleware = middleware
+        self.stats = middleware.stats
+        self.encoding = encoding
+        self.downstream_send = send
+        self.start_message = None
+        self.active = None  # None - решение ещё не принято
+        self.compressor = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.duration = 0.0
+
+    def _should_compress(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            self.stats.skipped["encoded"] += 1
+            return False
+        if "content-range" in headers:
+            self.stats.skipped["partial"] += 1
+            return False
+        content_type = headers.get("content-type", "").lower()
+        if not content_type or content_type.startswith(SKIP_MEDIA_TYPE_PREFIXES):
+            self.stats.skipped["media_type"] += 1
+            return False
+        return True
+
+    def _start(self, streaming: bool) -> dict:
+        """Меняет заголовки ответа под сжатое тело"""
+        headers = MutableHeaders(raw=list(self.start_message.get("headers", [])))
+        headers["content-encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # Сжатое тело не совпадает побайтно с исходным - сильный ETag становится слабым
+            headers["etag"] = "W/" + etag
+        if streaming:
+            del headers["content-length"]
+        return {**self.start_message, "headers": headers.raw}
+
+    def _compress(self, data: bytes, final: bool) -> bytes:
+        started = time.perf_counter()
+        chunk = self.compressor.compress(data)
+        if final:
+            chunk += self.compressor.finish()
+        self.duration += time.perf_counter() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(chunk)
+        return chunk
+
+    async def send(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            status = message["status"]
+            if status < 200 or status in (204, 206, 304):
+                self.active = False
+                await self.downstream_send(message)
+                return
+            if not self._should_compress(Headers(raw=message.get("headers", []))):
+                self.active = False
+                await self.downstream_send(message)
+                return
+            # Ответ мог быть сжат при другом Accept-Encoding - кэши должны это учитывать
+            headers = MutableHeaders(raw=list(message.get("headers", [])))
+            headers.add_vary_header("Accept-Encoding")
+            self.start_message = {**message, "headers": headers.raw}
+            if self.encoding is None:
+                self.active = False
+                self.stats.skipped["not_accepted"] += 1
+                await self.downstream_send(self.start_message)
+            return
+
+        if message_type != "http.response.body" or self.active is False:
+            await self.downstream_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.active is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Целиком маленький ответ - отдаём как есть
+                self.active = False
+                self.stats.skipped["small"] += 1
+                await self.downstream_send(self.start_message)
+                await self.downstream_send(message)
+                return
+
+            self.active = True
+            self.compressor = _Compressor(self.encoding, self.middleware.level)
+            if not more_body:
+                compressed = self._compress(body, final=True)
+                start = self._start(streaming=False)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["content-length"] = str(len(compressed))
+                await self.downstream_send({**start, "headers": headers.raw})
+                await self.downstream_send({"type": "http.response.body", "body": compressed})
+                self._record()
+                return
+            await self.downstream_send(self._start(streaming=True))
+
+        compressed = self._compress(body, final=not more_body)
+        await self.downstream_send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        if not more_body:
+            self._record()
+
+    def _record(self):
+        self.stats.record(self.encoding, self.bytes_in, self.bytes_out, self.duration)
@@ -1,47 +1,81 @@
-from fastapi import Request, status
+import html
+from fastapi import status
 from fastapi.responses import JSONResponse, HTMLResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.requests import Request
 from starlette.responses import Response
 from ..services.logger import logger
 from ..config import settings
 from datetime import datetime
 
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    """Middleware для обработки ошибок"""
+def _show_error_details() -> bool:
+    """Текст исключения виден клиенту только при debug в окружении development"""
+    return settings.debug and settings.environment == "development"
+
+
+def _session_user_id(scope):
+    """user_id из сессии, если SessionMiddleware уже загрузил её в scope"""
+    session = scope.get("session")
+    return session.get("user_id") if session else None
+
+
+class ErrorHandlerMiddleware:
+    """ASGI middleware для обработки ошибок.
+    
+    Необработанное исключение превращается в страницу или JSON с кодом 500,
+    если ответ ещё не начат. Если заголовки уже отправлены (StreamingResponse
+    упал посреди тела), исключение пробрасывается дальше - сервер оборвёт соединение.
+    Тело ответа проходит насквозь, без буферизации и отдельной задачи на запрос.
+    """
+    
+    def __init__(self, app):
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
             # Логируем ошибку
             logger.log_error(
-                exc, 
-                context=f"HTTP {request.method} {request.url.path}",
-                user_id=request.session.get("user_id") if hasattr(request, 'session') else None
+                exc,
+                context=f"HTTP {scope.get('method', '')} {scope.get('path', '')}",
+                user_id=_session_user_id(scope)
             )
-            
-            # Определяем тип ответа
-            accept_header = request.headers.get("accept", "")
-            is_html_request = "text/html" in accept_header
-            
-            if is_html_request:
-                # Для HTML запросов возвращаем страницу ошибки
-                return HTMLResponse(
-                    content=self._get_error_html(exc),
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            else:
-                # Для API запросов возвращаем JSON
-                return JSONResponse(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    content={
-                        "error": "Внутренняя ошибка сервера",
-                        "detail": str(exc) if settings.debug else "Произошла ошибка",
-                        "timestamp": str(datetime.now())
-                    }
-                )
+            if response_started:
+                raise
+            response = self._get_error_response(exc, Headers(scope=scope).get("accept", ""))
+            await response(scope, receive, send)
+    
+    def _get_error_response(self, exc: Exception, accept_header: str) -> Response:
+        """Ответ 500: страница для браузера, JSON для API"""
+        if "text/html" in accept_header:
+            # Для HTML запросов возвращаем страницу ошибки
+            return HTMLResponse(
+                content=self._get_error_html(exc),
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        # Для API запросов возвращаем JSON
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "error": "Внутренняя ошибка сервера",
+                "detail": str(exc) if _show_error_details() else "Произошла ошибка",
+                "timestamp": str(datetime.now())
+            }
+        )
     
     def _get_error_html(self, error: Exception) -> str:
         """Генерирует HTML страницу ошибки"""
@@ -76,7 +110,7 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
                 <p class="error-detail">
                     Произошла непредвиденная ошибка. Попробуйте обновить страницу или вернуться на главную.
                 </p>
-                {f'<p class="error-detail">Детали: {str(error)}</p>' if settings.debug else ''}
+                {f'<p class="error-detail">Детали: {html.escape(str(error))}</p>' if _show_error_details() else ''}
                 <a href="/" class="back-button">Вернуться на главную</a>
             </div>
         </body>
@@ -84,17 +118,21 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
         """
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware для логирования запросов"""
+class RequestLoggingMiddleware:
+    """ASGI middleware для логирования запросов"""
+    
+    def __init__(self, app):
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next):
-        # Логируем входящий запрос
-        logger.log_request({
-            "method": request.method,
-            "url": str(request.url),
-            "client": request.client.host if request.client else "UNKNOWN",
-            "headers": dict(request.headers)
-        }, request.session.get("user_id") if hasattr(request, 'session') else None)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            # Логируем входящий запрос
+            request = Request(scope)
+            logger.log_request({
+                "method": request.method,
+                "url": str(request.url),
+                "client": request.client.host if request.client else "UNKNOWN",
+                "headers": dict(request.headers)
+            }, _session_user_id(scope))
         
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
@@ -0,0 +1,23 @@
+from ..services.profiler import RequestProfiler, request_profiler as default_profiler
+
+
+class ProfilingMiddleware:
+    """ASGI middleware профилирования запросов по требованию (см. /admin/profiler).
+
+    Без активных сессий запрос проходит насквозь после проверки одного флага.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler = default_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.armed:
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.claim(scope.get("method", ""), scope.get("path", ""))
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+        await self.profiler.run(session, self.app, scope, receive, send)
@@ -0,0 +1,130 @@
+import asyncio
+import re
+from typing import Iterable, List, Optional, Pattern, Tuple
+from ..services.response_cache import ResponseCache, response_cache
+
+
+# Анонимные страницы магазина и время жизни их кэша (секунды).
+# Счётчик корзины на этих страницах подгружается отдельно через /api/shop/cart/count
+SHOP_CACHE_RULES = [
+    (r"^/shop/?$", 60),
+    (r"^/shop/product/\d+$", 120),
+    (r"^/shop/search-order$", 600),
+]
+
+# Шаблон маршрута в метриках для ответов, отданных из кэша
+CACHED_ROUTE_TEMPLATE = "<response-cache>"
+
+# Заголовки, которые нельзя отдавать из общего кэша
+UNCACHEABLE_HEADERS = {b"set-cookie"}
+
+# Сколько запрос ждёт «лидера», формирующего ту же страницу (секунды).
+# После таймаута запрос выполняется сам, не дожидаясь зависшего лидера
+FILL_WAIT_TIMEOUT = 5.0
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware для кэширования готовых HTML-ответов анонимных страниц"""
+
+    def __init__(self, app, rules: Iterable[Tuple[str, float]] = SHOP_CACHE_RULES, cache: ResponseCache = response_cache,
+                 fill_timeout: float = FILL_WAIT_TIMEOUT):
+        self.app = app
+        self.cache = cache
+        self.fill_timeout = fill_timeout
+        self.rules: List[Tuple[Pattern, float]] = [(re.compile(pattern), ttl) for pattern, ttl in rules]
+
+    def get_ttl(self, path: str) -> Optional[float]:
+        """Возвращает TTL для пути или None, если путь не кэшируется"""
+        for pattern, ttl in self.rules:
+            if pattern.match(path):
+                return ttl
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('method') != 'GET':
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get('path', '')
+        ttl = self.get_ttl(path)
+        if ttl is None:
+            await self.app(scope, receive, send)
+            return
+
+        query = scope.get('query_string', b'').decode('latin-1')
+        key = f"{path}?{query}" if query else path
+
+        # Single flight: пока один запрос («лидер») формирует страницу, остальные ждут его результат.
+        # Если ответ лидера не попал в кэш (404, не HTML), лидером становится следующий запрос
+        cached = self.cache.get(key)
+        leader = False
+        while cached is None:
+            waiter = self.cache.begin_fill(key)
+            if waiter is None:
+                leader = True
+                break
+            try:
+                await asyncio.wait_for(waiter.wait(), self.fill_timeout)
+            except asyncio.TimeoutError:
+                break  # Лидер завис: выполняем запрос сами, не трогая его блокировку
+            cached = self.cache.get(key)
+
+        if cached is not None:
+            self.cache.hits += 1
+            scope['route_template'] = CACHED_ROUTE_TEMPLATE  # Для метрик: маршрутизация не выполнялась
+            await self._send_cached(cached, send)
+            return
+
+        self.cache.misses += 1
+        try:
+            await self._fill(scope, receive, send, key, ttl)
+        finally:
+            if leader:  # Снимаем только свою блокировку, а не блокировку следующего лидера
+                self.cache.end_fill(key)
+
+    async def _fill(self, scope, receive, send, key: str, ttl: float):
+        """Выполняет запрос и сохраняет ответ, если его можно кэшировать"""
+        start_message = {}
+        body_parts = []
+        cacheable = True
+
+        async def send_wrapper(message):
+            nonlocal cacheable
+            if message['type'] == 'http.response.start':
+                start_message.update(message)
+                cacheable = message['status'] == 200 and self._is_cacheable(message.get('headers', []))
+                if cacheable:
+                    message.setdefault('headers', [])
+                    message['headers'] = list(message['headers']) + [(b'x-cache', b'MISS')]
+            elif message['type'] == 'http.response.body' and cacheable:
+                body_parts.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    headers = [
+                        (name, value) for name, value in start_message.get('headers', [])
+                        if name.lower() not in UNCACHEABLE_HEADERS
+                    ]
+                    self.cache.set(key, start_message['status'], headers, b''.join(body_parts), ttl)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _is_cacheable(headers) -> bool:
+        """Проверяет, что ответ является HTML и не запрещает кэширование"""
+        for name, value in headers:
+            name = name.lower()
+            if name == b'content-type' and not value.startswith(b'text/html'):
+                return False
+            if name == b'cache-control' and (b'no-store' in value or b'private' in value):
+                return False
+        return True
+
+    @staticmethod
+    async def _send_cached(cached, send):
+        """Отправляет ответ из кэша"""
+        await send({
+            'type': 'http.response.start',
+            'status': cached.status,
+            'headers': cached.headers + [(b'x-cache', b'HIT')],
+        })
+        await send({'type': 'http.response.body', 'body': cached.body})
@@ -0,0 +1,56 @@
+from starlette.datastructures import Headers, MutableHeaders
+from ..services.monitoring import route_template
+from ..services.tracing import SPAN_KIND_SERVER, STATUS_ERROR, Tracer, current_span, tracer as default_tracer
+
+
+class TracingMiddleware:
+    """ASGI middleware, открывающее серверный спан на каждый HTTP-запрос.
+
+    Входящий заголовок traceparent продолжает трассу клиента, в ответ
+    добавляется traceresponse с идентификаторами спана запроса. Спаны SQL,
+    шаблонов и фоновых задач, запущенных из запроса, становятся его дочерними.
+    """
+
+    def __init__(self, app, tracer: Tracer = default_tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        span = self.tracer.start_span(
+            method,
+            SPAN_KIND_SERVER,
+            # Строку запроса не пишем: в ней бывают телефоны, коды заказов и токены
+            {"http.request.method": method, "url.path": scope.get("path", "")},
+            traceparent=Headers(scope=scope).get("traceparent"),
+        )
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.status = STATUS_ERROR
+                MutableHeaders(scope=message).append("traceresponse", span.traceparent)
+            await send(message)
+
+        token = current_span.set(span)
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            route = route_template(scope)
+            span.name = f"{method} {route}"
+            span.set_attribute("http.route", route)
+            self.tracer.end_span(span, error)
@@ -0,0 +1,71 @@
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+class RequestBodyTooLarge(HTTPException):
+    """Тело запроса превысило лимит.
+
+    Наследуется от HTTPException, чтобы FastAPI не превращал ошибку,
+    возникшую при разборе формы, в 400 "error parsing the body".
+    """
+
+    def __init__(self, max_body_size: int):
+        super().__init__(status_code=413, detail=f"Размер запроса превышает {max_body_size // (1024 * 1024)} МБ")
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware, ограничивающее размер тела запроса.
+
+    Запрос с Content-Length больше лимита отклоняется до чтения тела,
+    запрос без Content-Length (chunked) - как только прочитано больше лимита.
+    Так большой файл не успевает целиком лечь во временные файлы multipart-парсера.
+    """
+
+    def __init__(self, app, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise RequestBodyTooLarge(self.max_body_size)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestBodyTooLarge:
+            # Исключение вылетело мимо обработчиков (тело читали вне эндпоинта)
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {"detail": RequestBodyTooLarge(self.max_body_size).detail},
+            status_code=413,
+            headers={"connection": "close"}
+        )
+        await response(scope, receive, send)
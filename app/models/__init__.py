@@ -5,13 +5,17 @@ from .supply import Supply
 from .operation_log import OperationLog
 from .payment import PaymentMethod as PaymentMethodModel, PaymentInstrument, CashFlow
 from .product_photo import ProductPhoto
+from .product_photo_variant import ProductPhotoVariant
 from .shop_cart import ShopCart
 from .shop_order import ShopOrder, ShopOrderStatus
 from .product_batch import ProductBatch
+from .qr_token import QRToken
+from .qr_scan_event import QRScanEvent
 from ..constants.order_status_enum import OrderStatus
 
 __all__ = [
     "User", "UserRole", "Product", "Order", "OrderStatus", "PaymentMethodEnum", 
     "Supply", "OperationLog", "PaymentMethodModel", "PaymentInstrument", "CashFlow",
-    "ProductPhoto", "ShopCart", "ShopOrder", "ShopOrderStatus", "ProductBatch"
+    "ProductPhoto", "ProductPhotoVariant", "ShopCart", "ShopOrder", "ShopOrderStatus", "ProductBatch",
+    "QRToken", "QRScanEvent"
 ]
@@ -72,7 +72,7 @@ class Order(Base):
     @property
     def has_qr(self) -> bool:
         """Проверяет, есть ли QR-код у заказа"""
-        return bool(self.qr_payload and self.qr_image_path)
+        return bool(self.qr_payload)
     
     @property
     def delivery_display_name(self) -> str:
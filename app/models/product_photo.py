@@ -14,12 +14,37 @@ class ProductPhoto(Base):
     file_path = Column(String(500), nullable=False)  # Путь к файлу
     file_size = Column(Integer, nullable=False)  # Размер файла в байтах
     mime_type = Column(String(100), nullable=False)  # MIME-тип файла
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 содержимого, общий файл для одинаковых фото
     is_main = Column(Boolean, default=False, nullable=False)  # Главное фото
     sort_order = Column(Integer, default=0, nullable=False)  # Порядок сортировки
+    processing_status = Column(String(20), default="ready", server_default="ready", nullable=False)  # pending, ready, failed
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     # Связи
     product = relationship("Product", back_populates="photos")
+    variants = relationship("ProductPhotoVariant", back_populates="photo", cascade="all, delete-orphan")
+    
+    @property
+    def url(self) -> str:
+        """URL исходного файла"""
+        return "/static/" + self.file_path.replace("app/static/", "")
+    
+    def variant(self, size: str, format: str = "jpeg"):
+        """Вариант нужного размера и формата (None, если ещё не готов)"""
+        for variant in self.variants:
+            if variant.size == size and variant.format == format:
+                return variant
+        return None
+    
+    def variant_url(self, size: str, format: str = "jpeg") -> str:
+        """URL варианта; пока варианты не готовы - URL исходного файла"""
+        variant = self.variant(size, format)
+        return variant.url if variant else self.url
+    
+    def srcset(self, format: str = "jpeg") -> str:
+        """Значение атрибута srcset по всем готовым вариантам формата"""
+        variants = sorted((v for v in self.variants if v.format == format), key=lambda v: v.width)
+        return ", ".join(f"{v.url} {v.width}w" for v in variants)
     
     def __repr__(self):
         return f"<ProductPhoto(id={self.id}, product_id={self.product_id}, filename='{self.filename}')>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from ..db import Base
+
+
+class ProductPhotoVariant(Base):
+    """Уменьшенная копия фото товара в одном из форматов (thumb/card/full, webp/jpeg)"""
+    __tablename__ = "product_photo_variants"
+    __table_args__ = (
+        UniqueConstraint("photo_id", "size", "format", name="uq_product_photo_variants_photo_size_format"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    photo_id = Column(Integer, ForeignKey("product_photos.id", ondelete="CASCADE"), nullable=False, index=True)
+    size = Column(String(20), nullable=False)  # thumb, card, full
+    format = Column(String(10), nullable=False)  # webp, jpeg
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    file_path = Column(String(500), nullable=False)  # Путь к файлу
+    file_size = Column(Integer, nullable=False)  # Размер файла в байтах
+    
+    # Связи
+    photo = relationship("ProductPhoto", back_populates="variants")
+    
+    @property
+    def url(self) -> str:
+        return "/static/" + self.file_path.replace("app/static/", "")
+    
+    def __repr__(self):
+        return f"<ProductPhotoVariant(photo_id={self.photo_id}, size='{self.size}', format='{self.format}')>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..db import Base
+
+
+class QRScanEvent(Base):
+    """Событие сканирования, принятое от сканера (в том числе накопленное офлайн).
+
+    client_id генерирует устройство - повторная отправка той же очереди
+    не применяет событие второй раз, а возвращает сохранённый результат.
+    """
+    __tablename__ = "qr_scan_events"
+    
+    id = Column(Integer, primary_key=True)
+    client_id = Column(String(64), nullable=False, unique=True, index=True)
+    device_id = Column(String(64), nullable=True)
+    user_id = Column(String, nullable=True)
+    token = Column(String(64), nullable=True)
+    action = Column(String(20), nullable=False)  # scan, issue
+    scanned_at = Column(DateTime(timezone=True), nullable=False)  # Время на устройстве
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    status = Column(String(20), nullable=False)  # applied, conflict
+    result = Column(String(20), nullable=False)  # found, issued, already_issued, ...
+    entity_type = Column(String(20), nullable=True)
+    entity_id = Column(Integer, nullable=True)
+    
+    def __repr__(self):
+        return f"<QRScanEvent(client_id='{self.client_id}', action='{self.action}', result='{self.result}')>"
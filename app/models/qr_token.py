@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..db import Base
+
+
+class QRToken(Base):
+    """Единый индекс QR-токенов: токен -> заказ (orders или shop_orders).
+
+    Сканирование разрешается одним точечным запросом по уникальному индексу,
+    заказ подгружается тем же запросом через JOIN.
+    """
+    __tablename__ = "qr_tokens"
+    __table_args__ = (
+        Index("ix_qr_tokens_entity", "entity_type", "entity_id"),
+    )
+    
+    ENTITY_ORDER = "order"
+    ENTITY_SHOP_ORDER = "shop_order"
+    
+    id = Column(Integer, primary_key=True)
+    token = Column(String(64), nullable=False, unique=True, index=True)
+    entity_type = Column(String(20), nullable=False)  # order, shop_order
+    entity_id = Column(Integer, nullable=False)
+    revoked = Column(Boolean, nullable=False, default=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Связи (полиморфные: по entity_type выбирается одна из таблиц)
+    order = relationship(
+        "Order",
+        primaryjoin="and_(QRToken.entity_type == 'order', foreign(QRToken.entity_id) == Order.id)",
+        viewonly=True,
+        lazy="joined",
+    )
+    shop_order = relationship(
+        "ShopOrder",
+        primaryjoin="and_(QRToken.entity_type == 'shop_order', foreign(QRToken.entity_id) == ShopOrder.id)",
+        viewonly=True,
+        lazy="joined",
+    )
+    
+    @property
+    def entity(self):
+        """Заказ, которому принадлежит токен"""
+        return self.order if self.entity_type == self.ENTITY_ORDER else self.shop_order
+    
+    def __repr__(self):
+        return f"<QRToken(entity_type='{self.entity_type}', entity_id={self.entity_id}, revoked={self.revoked})>"
@@ -82,4 +82,4 @@ class ShopOrder(Base):
     @property
     def has_qr(self) -> bool:
         """Проверяет, есть ли QR-код у заказа"""
-        return bool(self.qr_payload and self.qr_image_path)
+        return bool(self.qr_payload)
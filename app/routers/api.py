@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db import get_db
+from app.deps import require_admin
 from app.services.product_photos import ProductPhotoService
 from ..services.monitoring import performance_monitor
+from ..middleware.compression import compression_stats
+from ..services.image_pipeline import image_pipeline
+from ..services.media_cache import media_cache
+from ..services.sql_stats import sql_stats
+from ..services.nplusone import nplusone_detector
+from ..services.slow_requests import slow_request_log
 
 router = APIRouter()
 
@@ -75,11 +82,83 @@ async def get_error_summary():
             "message": str(e)
         }
 
+@router.get("/metrics/compression")
+async def get_compression_metrics():
+    """Получить статистику сжатия ответов"""
+    try:
+        return {
+            "status": "success",
+            "data": compression_stats.get_stats()
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
+@router.get("/metrics/images")
+async def get_image_pipeline_metrics():
+    """Получить статистику обработки фото и кэша /media"""
+    try:
+        return {
+            "status": "success",
+            "data": {
+                "pipeline": image_pipeline.get_stats(),
+                "media_cache": media_cache.get_stats()
+            }
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
+@router.get("/metrics/sql")
+async def get_sql_metrics(limit: int = 20, order_by: str = "total"):
+    """Получить самые дорогие SQL-запросы (по отпечаткам без литералов)"""
+    if order_by not in ("total", "p95", "max", "count", "avg"):
+        raise HTTPException(status_code=400, detail="order_by: total, p95, max, count или avg")
+    try:
+        return {
+            "status": "success",
+            "data": {
+                "fingerprints": len(sql_stats.fingerprints),
+                "nplusone_detected": nplusone_detector.detected,
+                "queries": sql_stats.top(limit, order_by)
+            }
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
+@router.get("/metrics/slow-requests")
+async def get_slow_requests(current_user = Depends(require_admin())):
+    """Получить сохранённые медленные запросы с SQL-трассой и планами (только админ)"""
+    try:
+        return {
+            "status": "success",
+            "data": {
+                "threshold": slow_request_log.threshold,
+                "enabled": slow_request_log.enabled,
+                "requests": slow_request_log.get_entries()
+            }
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
 @router.post("/metrics/reset")
 async def reset_performance_metrics():
     """Сбросить метрики производительности"""
     try:
         performance_monitor.reset_metrics()
+        compression_stats.reset()
+        sql_stats.reset()
+        slow_request_log.clear()
         return {
             "status": "success",
             "message": "Метрики производительности сброшены"
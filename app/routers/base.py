@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
 from ..db import get_db
 from ..services.auth import get_current_user_optional
 from ..services.validation import ValidationService
+from ..templating import templates
 
 
 class BaseRouter:
@@ -13,7 +13,7 @@ class BaseRouter:
     
     def __init__(self, prefix: str = "", tags: Optional[list] = None):
         self.router = APIRouter(prefix=prefix, tags=tags or [])
-        self.templates = Jinja2Templates(directory="app/templates")
+        self.templates = templates
         self.validation = ValidationService()
     
     def get_current_user_safe(self, request: Request, db: Session) -> Optional[Any]:
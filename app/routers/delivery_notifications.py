@@ -1,12 +1,11 @@
 from fastapi import APIRouter, Depends, Request, Form
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.db import get_db
 from app.services.delivery_notifications import DeliveryNotificationService
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/admin/delivery-notifications")
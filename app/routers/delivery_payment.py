@@ -5,17 +5,14 @@
 
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.services.orders import OrderService
 from app.constants.delivery import DeliveryOption
+from app.templating import templates
 
 router = APIRouter(tags=["delivery"])
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
-
 
 @router.get("/delivery/payment", response_class=HTMLResponse)
 async def delivery_payment_page(
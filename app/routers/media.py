@@ -0,0 +1,84 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from ..db import get_db
+from ..models import ProductPhoto
+from ..services.media_cache import ALLOWED_SIZES, MEDIA_FORMATS, ZeroCopyFileResponse, media_cache, resized_images
+from ..services.static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+
+def _parse_request(width: int, height: int, ext: str):
+    box = (width, height)
+    if box not in ALLOWED_SIZES or ext not in MEDIA_FORMATS:
+        raise HTTPException(status_code=404, detail="Размер или формат не поддерживается")
+    return box, MEDIA_FORMATS[ext]
+
+
+def _get_photo(db: Session, photo_id: int) -> ProductPhoto:
+    photo = db.query(ProductPhoto).filter(ProductPhoto.id == photo_id).first()
+    if not photo or not os.path.exists(photo.file_path):
+        raise HTTPException(status_code=404, detail="Фото не найдено")
+    return photo
+
+
+async def _resized_response(request: Request, db: Session, photo_id: int, version: str,
+                            box, ext: str, cache_control: str, photo: Optional[ProductPhoto] = None):
+    """Копия из кэша; при промахе проверяет, что фото с этой версией содержимого существует"""
+    fmt, media_type = MEDIA_FORMATS[ext]
+    key = resized_images.cache_key(photo_id, version, box, ext)
+    path = media_cache.get(key)
+    if path is None:
+        if photo is None:
+            photo = _get_photo(db, photo_id)
+            if resized_images.photo_version(photo) != version:
+                raise HTTPException(status_code=404, detail="Фото не найдено")
+        path = await resized_images.render(key, photo.file_path, box, fmt)
+
+    etag = f'"{photo_id}-{version}-{box[0]}x{box[1]}.{ext}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"etag": etag, "cache-control": cache_control})
+    return ZeroCopyFileResponse(
+        path,
+        media_type=media_type,
+        headers={"cache-control": cache_control, "etag": etag},
+        stat_result=os.stat(path),
+        method=request.method
+    )
+
+
+@router.get("/products/{photo_id:int}/{version}/{width:int}x{height:int}.{ext}")
+async def versioned_product_photo(
+    photo_id: int,
+    version: str,
+    width: int,
+    height: int,
+    ext: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Фото товара в width x height по URL с версией содержимого (ResizedImageService.url)"""
+    box, _ = _parse_request(width, height, ext)
+    # Версия в URL меняется вместе с содержимым, поэтому копию можно кэшировать навсегда
+    return await _resized_response(request, db, photo_id, version, box, ext, IMMUTABLE_CACHE_CONTROL)
+
+
+@router.get("/products/{photo_id:int}/{width:int}x{height:int}.{ext}")
+async def resized_product_photo(
+    photo_id: int,
+    width: int,
+    height: int,
+    ext: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Фото товара, вписанное в width x height (только разрешённые размеры)"""
+    box, _ = _parse_request(width, height, ext)
+    # URL без версии: фото могут заменить или удалить, поэтому проверяем запись
+    # при каждом запросе, а браузер перепроверяет копию по ETag
+    photo = _get_photo(db, photo_id)
+    return await _resized_response(request, db, photo_id, resized_images.photo_version(photo), box, ext,
+                                   REVALIDATE_CACHE_CONTROL, photo)
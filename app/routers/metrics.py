@@ -0,0 +1,25 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..services.metrics_export import CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def openmetrics(request: Request):
+    """Метрики для Prometheus и совместимых сборщиков (OpenMetrics text)"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Вне разработки метрики (маршруты, пулы, процесс) без токена не отдаются
+    if not settings.metrics_token and settings.environment != "development":
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token:
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization, f"Bearer {settings.metrics_token}"):
+            raise HTTPException(status_code=401, detail="Unauthorized", headers={"WWW-Authenticate": "Bearer"})
+    # Чтение /proc и снимков других воркеров - файловый ввод-вывод, не держим event loop
+    body = await run_in_threadpool(render_metrics)
+    return Response(body, media_type=CONTENT_TYPE, headers={"cache-control": "no-store"})
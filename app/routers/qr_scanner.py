@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..db import get_db
 from ..services.auth import get_current_user_optional
+from ..services.qr_service import QRService, qr_image_cache
+from ..templating import templates
+
+# Изображение для токена не меняется; private - токен заказа не должен оседать в общих прокси
+QR_CACHE_CONTROL = "private, max-age=31536000, immutable"
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/qr-scanner", response_class=HTMLResponse)
@@ -19,3 +23,25 @@ async def qr_scanner_page(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse(url="/login?error=Требуется авторизация для доступа к QR-сканеру", status_code=302)
     
     return templates.TemplateResponse("qr_scanner.html", {"request": request, "current_user": current_user})
+
+
+@router.get("/qr/{token}.{fmt}")
+async def qr_image(token: str, fmt: str, request: Request, db: Session = Depends(get_db)):
+    """Изображение QR-кода заказа (PNG или SVG), рендерится в памяти"""
+    if fmt not in QRService.IMAGE_FORMATS or not QRService.is_valid_qr_token(token):
+        raise HTTPException(status_code=404, detail="QR-код не найден")
+    
+    etag = f'"qr-{token}-{fmt}"'
+    headers = {"cache-control": QR_CACHE_CONTROL, "etag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    # Токен проверяется по БД только при промахе кэша; проверка и рендер -
+    # в пуле потоков, чтобы генерация изображения не блокировала event loop
+    data = qr_image_cache.get((token, fmt))
+    if data is None:
+        data = await run_in_threadpool(QRService.render_qr_image, token, fmt, db)
+    if data is None:
+        raise HTTPException(status_code=404, detail="QR-код не найден")
+    
+    return Response(data, media_type=QRService.IMAGE_FORMATS[fmt], headers=headers)
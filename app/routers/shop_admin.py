@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.db import get_db
+from app.deps import require_admin_or_manager
+from app.schemas.qr_scan import QRBatchScanRequest, QRSyncRequest
+from app.services.qr_batch import QRBatchService
+from app.services.qr_sync import QRSyncService
 from app.services.shop_orders import ShopOrderService
 from app.services.qr_service import QRService
 from app.models import ShopOrderStatus
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
+from app.templating import templates
 
 router = APIRouter(prefix="/shop/admin", tags=["shop_admin"])
 
@@ -133,3 +135,48 @@ async def process_qr_scan(
         
     except Exception as e:
         return {"success": False, "message": f"Ошибка: {str(e)}"}
+
+
+# Пакетный скан: передача курьеру десятков посылок одним запросом
+@router.post("/qr-scan/batch")
+async def process_qr_scan_batch(
+    scan: QRBatchScanRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin_or_manager())
+):
+    """Обрабатывает пачку QR-кодов; при issue=true выдаёт заказы одной транзакцией"""
+    try:
+        result = QRBatchService.scan(db, scan.payloads, issue=scan.issue, user_id=current_user.username)
+        return {"success": True, **result}
+    except Exception as e:
+        return {"success": False, "message": f"Ошибка: {str(e)}"}
+
+
+# Офлайн-режим сканера: очередь событий и манифест открытых заказов
+@router.post("/qr-sync")
+async def sync_qr_scans(
+    sync: QRSyncRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin_or_manager())
+):
+    """Принимает очередь сканов устройства; повторная отправка не применяет события дважды"""
+    try:
+        result = QRSyncService.sync(db, sync.events, device_id=sync.device_id, user_id=current_user.username)
+        return {"success": True, **result}
+    except Exception as e:
+        return {"success": False, "message": f"Ошибка: {str(e)}"}
+
+
+@router.get("/qr-manifest")
+async def qr_manifest(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin_or_manager())
+):
+    """Компактный манифест токенов открытых заказов для проверки сканов без сети"""
+    manifest = QRSyncService.build_manifest(db)
+    etag = f'"{manifest["version"]}"'
+    headers = {"etag": etag, "cache-control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(manifest, headers=headers)
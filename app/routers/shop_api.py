@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, File, Form, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, Request, File, Form, UploadFile, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
@@ -268,6 +268,7 @@ async def get_product_photos(
 @router.post("/products/{product_id}/photos")
 async def upload_product_photo(
     product_id: int,
+    background_tasks: BackgroundTasks,
     photo: UploadFile = File(...),
     is_main: bool = Form(False),
     sort_order: int = Form(0),
@@ -282,9 +283,12 @@ async def upload_product_photo(
             product_id, 
             db,
             is_main=is_main, 
-            sort_order=sort_order
+            sort_order=sort_order,
+            background_tasks=background_tasks
         )
         return {"success": True, "photo": photo_data}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
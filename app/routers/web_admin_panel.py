@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Request, Depends, Query, HTTPException, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timedelta
@@ -13,9 +12,11 @@ from ..services.admin import (
 )
 from ..schemas.user import UserCreate, UserUpdate
 from ..deps import require_admin
+from ..services.profiler import PROFILER_MODES, request_profiler
+from ..services.logger import logger
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/admin", response_class=HTMLResponse)
 async def admin_dashboard(
@@ -61,6 +62,74 @@ async def admin_metrics(
         {"request": request, "current_user": current_user}
     )
 
+@router.get("/admin/profiler")
+async def profiler_sessions(current_user = Depends(require_admin())):
+    """Сессии профилирования (последние первыми)"""
+    return {"status": "success", "data": {"modes": PROFILER_MODES, "sessions": request_profiler.list_sessions()}}
+
+
+@router.post("/admin/profiler")
+async def start_profiler(
+    route: str = Form(...),
+    count: int = Form(5),
+    mode: str = Form("cprofile"),
+    method: Optional[str] = Form(None),
+    current_user = Depends(require_admin())
+):
+    """Профилировать следующие count запросов к маршруту (/orders или /orders/{order_id})"""
+    try:
+        session = request_profiler.arm(route.strip(), count, mode, method or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"{current_user.username} включил профилирование {session.mode}: {session.route} x{session.count}")
+    return {"status": "success", "data": session.to_dict()}
+
+
+@router.post("/admin/profiler/{session_id}/cancel")
+async def cancel_profiler(session_id: int, current_user = Depends(require_admin())):
+    """Отменить сессию профилирования"""
+    session = request_profiler.cancel(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Сессия профилирования не найдена")
+    return {"status": "success", "data": session.to_dict()}
+
+
+def _finished_session(session_id: int, mode: str):
+    session = request_profiler.get(session_id)
+    if session is None or session.mode != mode:
+        raise HTTPException(status_code=404, detail="Сессия профилирования не найдена")
+    if not session.done or not session.requests:
+        raise HTTPException(status_code=409, detail="Профилирование ещё не завершено")
+    return session
+
+
+@router.get("/admin/profiler/{session_id}/profile.pstats")
+async def download_pstats(session_id: int, current_user = Depends(require_admin())):
+    """Результат cProfile в формате pstats (python -m pstats, snakeviz)"""
+    session = _finished_session(session_id, "cprofile")
+    return Response(
+        content=session.pstats_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{session.id}.pstats"'}
+    )
+
+
+@router.get("/admin/profiler/{session_id}/profile.txt", response_class=PlainTextResponse)
+async def profile_report(session_id: int, current_user = Depends(require_admin())):
+    """Текстовый отчёт cProfile по накопленному времени"""
+    return _finished_session(session_id, "cprofile").report()
+
+
+@router.get("/admin/profiler/{session_id}/stacks.txt", response_class=PlainTextResponse)
+async def download_stacks(session_id: int, current_user = Depends(require_admin())):
+    """Стеки в формате collapsed для flamegraph.pl / speedscope"""
+    session = _finished_session(session_id, "sampling")
+    return PlainTextResponse(
+        session.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="stacks-{session.id}.txt"'}
+    )
+
+
 @router.get("/admin/users", response_class=HTMLResponse)
 async def users_page(
     request: Request,
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Request, Depends, Query, HTTPException
 from fastapi.responses import HTMLResponse, Response
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timedelta
@@ -13,9 +12,9 @@ from ..services.analytics import (
 )
 from ..services.products import get_products
 from ..deps import require_admin_or_manager
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/analytics", response_class=HTMLResponse)
 async def analytics_dashboard(
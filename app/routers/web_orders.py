@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Request, Form, HTTPException, status, Depends, Query
-from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from fastapi.responses import RedirectResponse, HTMLResponse, StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional
+from datetime import date, datetime, timezone
 from ..db import get_db
 from ..services.auth import get_current_user_optional, get_current_user
 from ..services.orders import (
@@ -15,10 +16,14 @@ from ..services.order_code import OrderCodeService
 from ..services.payments import PaymentService
 from ..schemas.order import OrderCreate, OrderUpdate, OrderStatusUpdate
 from ..deps import require_admin_or_manager
-from ..models import OrderStatus, PaymentMethodEnum, PaymentMethodModel
+from ..models import Order, OrderStatus, PaymentMethodEnum, PaymentMethodModel
+from ..services.image_pipeline import image_pipeline
+from ..services.qr_labels import stream_label_sheet
+from ..services.qr_service import QRService
+from ..config import settings
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/orders", response_class=HTMLResponse)
 async def orders_page(
@@ -61,6 +66,50 @@ async def orders_page(
         }
     )
 
+@router.get("/orders/labels.pdf")
+async def order_labels_pdf(
+    status_filter: OrderStatus = Query(OrderStatus.PAID_NOT_ISSUED, alias="status"),
+    on_date: Optional[date] = Query(None, alias="date"),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin_or_manager())
+):
+    """Лист этикеток с QR-кодами для печати (PDF, A4, 24 этикетки на странице)"""
+    query = db.query(Order).options(joinedload(Order.product)).filter(Order.status == status_filter)
+    if on_date:
+        query = query.filter(func.date(Order.created_at) == on_date)
+    query = query.order_by(Order.created_at, Order.id)
+    orders = query.all()
+    if not orders:
+        raise HTTPException(status_code=404, detail="Нет заказов для печати")
+    
+    # Токены для заказов без QR - одним коммитом
+    missing = [order for order in orders if not order.qr_payload]
+    if missing:
+        now = datetime.now(timezone.utc)
+        for order in missing:
+            QRService.issue_token(db, order, now)
+        db.commit()
+        orders = query.all()  # После commit объекты истекли: перечитываем одним запросом, а не по одному
+    
+    labels = [
+        {
+            "payload": QRService.generate_qr_payload(order),
+            "order_code": order.order_code or f"#{order.id}",
+            "product_name": order.product_name or (order.product.name if order.product else ""),
+            "details": f"{order.qty} шт. · {order.created_at:%d.%m.%Y}" if order.created_at else f"{order.qty} шт.",
+            "customer_name": order.customer_name or order.phone,
+        }
+        for order in orders
+    ]
+    
+    filename = f"labels-{status_filter.value}-{on_date.isoformat() if on_date else 'all'}.pdf"
+    return StreamingResponse(
+        stream_label_sheet(labels, image_pipeline.executor, settings.label_font_path),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{filename}"'}
+    )
+
+
 @router.get("/orders/new", response_class=HTMLResponse)
 async def new_order_page(
     request: Request, 
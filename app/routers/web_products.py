@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Request, Form, HTTPException, status, Depends, File, UploadFile
+from fastapi import APIRouter, Request, Form, HTTPException, status, Depends, File, UploadFile, BackgroundTasks
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
@@ -13,9 +12,9 @@ from ..services.products import (
 from ..schemas.product import ProductCreate, ProductUpdate
 from ..schemas.supply import SupplyCreate
 from ..deps import require_admin_or_manager
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/products", response_class=HTMLResponse)
@@ -51,6 +50,7 @@ async def new_product_page(
 @router.post("/products", response_class=HTMLResponse)
 async def create_product_post(
     request: Request,
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     description: Optional[str] = Form(None),
     detailed_description: Optional[str] = Form(None),
@@ -113,7 +113,8 @@ async def create_product_post(
                     product.id, 
                     db,
                     is_main=True, 
-                    sort_order=0
+                    sort_order=0,
+                    background_tasks=background_tasks
                 )
             except Exception as photo_error:
                 # Логируем ошибку, но не прерываем создание товара
@@ -240,6 +241,7 @@ async def edit_product_page(
 async def update_product_post(
     request: Request,
     product_id: int,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     detailed_description: Optional[str] = Form(None),
@@ -314,7 +316,8 @@ async def update_product_post(
                     product_id, 
                     db,
                     is_main=False, 
-                    sort_order=0
+                    sort_order=0,
+                    background_tasks=background_tasks
                 )
             except Exception as photo_error:
                 # Логируем ошибку, но не прерываем обновление товара
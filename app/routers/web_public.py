@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Request, Form, HTTPException, status, Depends
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..services.auth import authenticate_user, create_user, get_current_user_optional
 from ..models import UserRole
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/login")
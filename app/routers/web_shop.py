@@ -10,9 +10,7 @@ from app.services.shop_cart import ShopCartService
 from app.services.shop_orders import ShopOrderService
 from app.services.payments import PaymentService
 from app.services.qr_service import QRService
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
+from app.templating import templates
 
 router = APIRouter(prefix="/shop", tags=["shop"])
 
@@ -34,14 +32,11 @@ async def shop_catalog(
     """Каталог товаров магазина"""
     products = get_products(db)
     
-    # Получаем количество товаров в корзине
-    session_id = get_session_id(request)
-    cart_count = ShopCartService.get_cart_count(db, session_id)
-    
+    # Страница кэшируется целиком (см. ResponseCacheMiddleware), поэтому не зависит
+    # от сессии: количество товаров в корзине подгружается через /api/shop/cart/count
     return templates.TemplateResponse("shop/catalog.html", {
         "request": request,
-        "products": products,
-        "cart_count": cart_count
+        "products": products
     })
 
 
@@ -58,14 +53,10 @@ async def shop_product_detail(
     if not product:
         raise HTTPException(status_code=404, detail="Товар не найден")
     
-    # Получаем количество товаров в корзине
-    session_id = get_session_id(request)
-    cart_count = ShopCartService.get_cart_count(db, session_id)
-    
+    # Счётчик корзины подгружается на клиенте, страница кэшируется целиком
     return templates.TemplateResponse("shop/product.html", {
         "request": request,
-        "product": product,
-        "cart_count": cart_count
+        "product": product
     })
 
 
@@ -1,7 +1,6 @@
 import uuid
 from fastapi import APIRouter, Request, Form, HTTPException, status, Depends, Query
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional
 from ..db import get_db
@@ -9,9 +8,9 @@ from ..services.auth import get_current_user_optional
 from ..services.shop_cart import ShopCartService
 from ..services.shop_orders import ShopOrderService
 from ..services.qr_service import QRService
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 def get_session_id(request: Request) -> str:
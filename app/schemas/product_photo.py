@@ -10,6 +10,7 @@ class ProductPhotoBase(BaseModel):
     file_path: str = Field(..., max_length=500)
     file_size: int = Field(..., gt=0)
     mime_type: str = Field(..., max_length=100)
+    content_hash: Optional[str] = Field(None, max_length=64)
     is_main: bool = Field(default=False)
     sort_order: int = Field(default=0, ge=0)
 
@@ -30,6 +31,7 @@ class ProductPhotoUpdate(BaseModel):
 
 class ProductPhotoResponse(ProductPhotoBase):
     id: int
+    processing_status: str = "ready"
     created_at: datetime
     
     class Config:
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
+
+# Ограничение размера пачки: передача курьеру - десятки посылок
+MAX_BATCH_SCANS = 500
+
+
+class QRBatchScanRequest(BaseModel):
+    """Пачка отсканированных QR-кодов"""
+    payloads: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SCANS)
+    issue: bool = Field(default=False, description="Отметить найденные заказы выданными")
+
+
+class QRScanEventIn(BaseModel):
+    """Событие сканирования из очереди устройства"""
+    client_id: str = Field(..., min_length=1, max_length=64, description="Идентификатор события на устройстве")
+    payload: str = Field(..., max_length=512)
+    action: Literal["scan", "issue"] = Field(default="issue")
+    scanned_at: datetime = Field(..., description="Время сканирования на устройстве")
+
+
+class QRSyncRequest(BaseModel):
+    """Очередь событий, накопленная сканером"""
+    device_id: Optional[str] = Field(None, max_length=64)
+    events: List[QRScanEventIn] = Field(..., max_length=MAX_BATCH_SCANS)
@@ -1,9 +1,10 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, and_, extract
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 from ..models import Order, Product, Supply, OrderStatus
+from .products import issued_quantities
 import csv
 import io
 
@@ -70,18 +71,14 @@ def get_sales_report(db: Session, start_date: Optional[datetime] = None, end_dat
 def get_inventory_report(db: Session) -> Dict[str, Any]:
     """Получить отчет по остаткам товаров"""
     products = db.query(Product).all()
+    issued = issued_quantities(db)
     
     inventory_data = []
     low_stock_products = []
     
     for product in products:
         # Вычисляем остаток
-        issued_orders = db.query(func.coalesce(func.sum(Order.qty), 0)).filter(
-            Order.product_id == product.id,
-            Order.status == OrderStatus.PAID_ISSUED
-        ).scalar()
-        
-        stock = product.quantity - issued_orders
+        stock = product.quantity - issued.get(product.id, 0)
         stock = max(0, stock)
         
         # Вычисляем стоимость остатка
@@ -117,7 +114,7 @@ def get_inventory_report(db: Session) -> Dict[str, Any]:
 
 def get_supply_report(db: Session, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
     """Получить отчет по поставкам"""
-    query = db.query(Supply)
+    query = db.query(Supply).options(joinedload(Supply.product))
     
     if start_date:
         query = query.filter(Supply.created_at >= start_date)
@@ -213,7 +210,7 @@ def get_profit_analysis(db: Session, start_date: Optional[datetime] = None, end_
     orders = orders_query.all()
     
     # Получаем поставки за период
-    supplies_query = db.query(Supply)
+    supplies_query = db.query(Supply).options(joinedload(Supply.product))
     if start_date:
         supplies_query = supplies_query.filter(Supply.created_at >= start_date)
     if end_date:
@@ -339,14 +336,10 @@ def export_inventory_to_csv(db: Session) -> str:
     ])
     
     # Данные
+    issued = issued_quantities(db)
     for product in products:
         # Вычисляем остаток
-        issued_orders = db.query(func.coalesce(func.sum(Order.qty), 0)).filter(
-            Order.product_id == product.id,
-            Order.status == OrderStatus.PAID_ISSUED
-        ).scalar()
-        
-        stock = product.quantity - issued_orders
+        stock = product.quantity - issued.get(product.id, 0)
         stock = max(0, stock)
         stock_value = stock * (product.sell_price_rub or 0)
         status = 'Низкий остаток' if stock < product.min_stock else 'Норма'
@@ -394,12 +387,9 @@ def get_dashboard_stats(db: Session) -> Dict[str, Any]:
     # Товары с низким остатком
     low_stock_count = 0
     products = db.query(Product).all()
+    issued = issued_quantities(db)
     for product in products:
-        issued_orders = db.query(func.coalesce(func.sum(Order.qty), 0)).filter(
-            Order.product_id == product.id,
-            Order.status == OrderStatus.PAID_ISSUED
-        ).scalar()
-        stock = product.quantity - issued_orders
+        stock = product.quantity - issued.get(product.id, 0)
         if stock < product.min_stock:
             low_stock_count += 1
     
@@ -1,9 +1,8 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 from datetime import datetime, timedelta
 from ..models.product_batch import ProductBatch
-from ..models.product import Product
 
 
 class DeliveryNotificationService:
@@ -16,7 +15,7 @@ class DeliveryNotificationService:
         target_date = today + timedelta(days=days_ahead)
         
         # Получаем партии товаров с приближающейся датой доставки
-        upcoming_batches = db.query(ProductBatch).filter(
+        upcoming_batches = db.query(ProductBatch).options(joinedload(ProductBatch.product)).filter(
             and_(
                 ProductBatch.expected_arrival_date.isnot(None),
                 ProductBatch.expected_arrival_date <= target_date,
@@ -29,8 +28,8 @@ class DeliveryNotificationService:
         for batch in upcoming_batches:
             days_until_delivery = (batch.expected_arrival_date.date() - today).days
             
-            # Получаем информацию о товаре
-            product = db.query(Product).filter(Product.id == batch.product_id).first()
+            # Товар подгружен тем же запросом (joinedload)
+            product = batch.product
             if not product:
                 continue
             
@@ -58,7 +57,7 @@ class DeliveryNotificationService:
         today = datetime.now().date()
         
         # Получаем партии товаров с просроченной датой доставки
-        overdue_batches = db.query(ProductBatch).filter(
+        overdue_batches = db.query(ProductBatch).options(joinedload(ProductBatch.product)).filter(
             and_(
                 ProductBatch.expected_arrival_date.isnot(None),
                 ProductBatch.expected_arrival_date < today,
@@ -70,8 +69,8 @@ class DeliveryNotificationService:
         for batch in overdue_batches:
             days_overdue = (today - batch.expected_arrival_date.date()).days
             
-            # Получаем информацию о товаре
-            product = db.query(Product).filter(Product.id == batch.product_id).first()
+            # Товар подгружен тем же запросом (joinedload)
+            product = batch.product
             if not product:
                 continue
             
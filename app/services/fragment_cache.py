@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Dict, Optional, Tuple
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..models import Product, ProductPhoto, ProductBatch
+
+
+class FragmentCache:
+    """LRU-кэш отрендеренных фрагментов шаблонов"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Markup]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Markup]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Tuple, value: Markup):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def product_version(self, product) -> Tuple:
+        """Версия товара для ключа кэша карточки: products.updated_at общий для всех воркеров"""
+        return (product.id, str(product.updated_at))
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        """Статистика кэша"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0
+        }
+
+
+# Глобальный экземпляр кэша фрагментов
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja-расширение {% cache key, ... %}...{% endcache %}
+
+    Содержимое блока рендерится один раз для каждого значения ключа,
+    дальше отдаётся готовой строкой.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=fragment_cache)
+        environment.globals["product_version"] = fragment_cache.product_version
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render_cached", [nodes.Tuple(key_parts, "load")]),
+            [], [], body
+        ).set_lineno(lineno)
+
+    def _render_cached(self, key, caller):
+        cache = self.environment.fragment_cache
+        value = cache.get(key)
+        if value is None:
+            value = Markup(caller())
+            cache.set(key, value)
+        return value
+
+
+@event.listens_for(Session, "after_flush")
+def _touch_changed_products(session, flush_context):
+    """Обновляет products.updated_at у товаров, у которых изменились поля, фото или партии.
+
+    Время с микросекундами: func.now() в SQLite хранит секунды, и два изменения
+    за одну секунду дали бы одну версию карточки.
+    """
+    product_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Product):
+            product_id = obj.id
+        elif isinstance(obj, (ProductPhoto, ProductBatch)):
+            product_id = obj.product_id
+        else:
+            continue
+        if product_id is not None:
+            product_ids.add(product_id)
+    if product_ids:
+        products = Product.__table__
+        session.connection().execute(
+            products.update()
+            .where(products.c.id.in_(product_ids))
+            .values(updated_at=datetime.now(timezone.utc))
+        )
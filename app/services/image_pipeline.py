@@ -0,0 +1,141 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models import ProductPhoto, ProductPhotoVariant
+from ..services.image_variants import render_variants
+from ..services.logger import logger
+from ..services.tracing import tracer
+
+
+VARIANTS_DIR = Path("app/static/uploads/products/variants")
+
+
+class ImagePipeline:
+    """Фоновая обработка загруженных фото в пуле процессов.
+
+    Загрузка сохраняет исходный файл и сразу отвечает клиенту, а варианты
+    (thumb/card/full в WebP и JPEG) создаются в отдельных процессах,
+    чтобы ресайз не занимал event loop и не упирался в GIL.
+    """
+
+    def __init__(self, max_workers: int = 2, variants_dir: Path = VARIANTS_DIR):
+        self.max_workers = max_workers
+        self.variants_dir = variants_dir
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks = set()
+        self.processed = 0
+        self.failed = 0
+        self.processing_time = 0.0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: форк многопоточного сервера может унести в дочерний процесс захваченные блокировки
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def variant_dir_for(self, stem: str) -> Path:
+        """Каталог вариантов, разбитый по первым символам имени (хэша) исходника"""
+        return self.variants_dir / stem[:2] / stem[2:4]
+
+    def submit(self, photo_id: int, source_path: str, session_factory: Callable[[], Session]) -> asyncio.Task:
+        """Ставит фото в очередь обработки в текущем event loop"""
+        task = asyncio.get_running_loop().create_task(self.process(photo_id, source_path, session_factory))
+        self._tasks.add(task)  # Держим ссылку, иначе задачу может собрать GC
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def process(self, photo_id: int, source_path: str, session_factory: Callable[[], Session]):
+        """Создаёт варианты фото и записывает их в БД"""
+        with tracer.span("job image_pipeline.process", attributes={"photo.id": photo_id}):
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            stem = Path(source_path).stem
+            try:
+                with tracer.span("render_variants"):
+                    variants = await loop.run_in_executor(
+                        self.executor, render_variants, source_path, str(self.variant_dir_for(stem)), stem
+                    )
+            except Exception as e:
+                logger.error(f"Ошибка обработки фото {photo_id} ({source_path}): {e}")
+                variants = None
+            self.processing_time += time.perf_counter() - started
+
+            # Запись в БД синхронная - выполняем в потоке (с контекстом, чтобы SQL попал в трассу задачи)
+            await loop.run_in_executor(
+                None, contextvars.copy_context().run, self._store, photo_id, source_path, variants, session_factory
+            )
+
+    def _store(self, photo_id: int, source_path: str, variants: Optional[List[Dict]], session_factory: Callable[[], Session]):
+        db = session_factory()
+        try:
+            photo = db.query(ProductPhoto).filter(ProductPhoto.id == photo_id).first()
+            if photo is None:
+                # Фото удалили, пока шла обработка; файлы могут быть нужны фото с тем же содержимым
+                if db.query(ProductPhoto).filter(ProductPhoto.file_path == source_path).count() == 0:
+                    remove_files(v["file_path"] for v in variants or [])
+                return
+
+            if variants is None:
+                photo.processing_status = "failed"
+                self.failed += 1
+            else:
+                for variant in photo.variants:
+                    db.delete(variant)
+                db.flush()
+                for variant in variants:
+                    db.add(ProductPhotoVariant(photo_id=photo_id, **variant))
+                photo.processing_status = "ready"
+                self.processed += 1
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Не удалось сохранить варианты фото {photo_id}: {e}")
+        finally:
+            db.close()
+
+    async def drain(self):
+        """Дожидается всех запущенных обработок"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict:
+        finished = self.processed + self.failed
+        return {
+            "workers": self.max_workers,
+            "in_progress": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_time_ms": round(self.processing_time * 1000 / finished, 1) if finished else 0,
+        }
+
+
+def remove_files(paths):
+    """Удаляет файлы, игнорируя уже отсутствующие"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Файл останется сиротой - его уберёт сборщик мусора медиа (scripts/media_gc.py)
+            logger.warning(f"Не удалось удалить файл {path}: {e}")
+
+
+# Глобальный пул обработки фото
+image_pipeline = ImagePipeline(max_workers=settings.image_workers)
@@ -0,0 +1,97 @@
+"""
+Генерация уменьшенных копий изображений.
+
+Только Pillow: модуль импортируется в каждом процессе пула обработки фото.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from PIL import Image, ImageOps
+
+
+# Варианты фото: имя -> ограничивающий прямоугольник (ширина, высота)
+VARIANT_SIZES: Dict[str, Tuple[int, int]] = {
+    "thumb": (320, 320),
+    "card": (640, 640),
+    "full": (1920, 1080),
+}
+
+# Форматы: имя -> (формат Pillow, расширение, параметры сохранения)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def open_rgb(source_path: str, max_box: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Открывает изображение с учётом EXIF-поворота и приводит к RGB.
+
+    max_box - наибольший нужный размер: JPEG тогда декодируется сразу
+    в уменьшенном масштабе (1/2, 1/4, 1/8), что в разы быстрее полного.
+    """
+    with Image.open(source_path) as img:
+        if max_box is not None:
+            # draft не учитывает поворот, поэтому запас берём по большей стороне
+            side = max(max_box)
+            img.draft("RGB", (side, side))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.load()
+        return img
+
+
+def fit_to_box(img: Image.Image, box: Tuple[int, int]) -> Image.Image:
+    """Копия изображения, вписанная в box с сохранением пропорций (без увеличения)"""
+    resized = img.copy()
+    resized.thumbnail(box, Image.Resampling.LANCZOS)
+    return resized
+
+
+def save_as(img: Image.Image, fmt: str, target: Path):
+    """Сохраняет изображение в одном из VARIANT_FORMATS"""
+    pil_format, _, options = VARIANT_FORMATS[fmt]
+    img.save(target, pil_format, **options)
+
+
+def render_variants(source_path: str, output_dir: str, stem: str) -> List[Dict]:
+    """Создаёт все варианты фото (VARIANT_SIZES x VARIANT_FORMATS).
+
+    Возвращает описания созданных файлов для записи в product_photo_variants.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    # От большего размера к меньшему: каждый вариант уменьшается из предыдущего
+    ordered = sorted(VARIANT_SIZES.items(), key=lambda item: item[1], reverse=True)
+    resized = open_rgb(source_path, max_box=ordered[0][1])
+
+    variants = []
+    for size, box in ordered:
+        resized = fit_to_box(resized, box)
+        for fmt, (_, ext, _) in VARIANT_FORMATS.items():
+            target = output / f"{stem}-{size}{ext}"
+            save_as(resized, fmt, target)
+            variants.append({
+                "size": size,
+                "format": fmt,
+                "width": resized.width,
+                "height": resized.height,
+                "file_path": target.as_posix(),
+                "file_size": target.stat().st_size,
+            })
+    return variants
+
+
+def verify_image(source_path: str) -> Tuple[int, int]:
+    """Быстрая проверка, что файл - читаемое изображение (без декодирования пикселей)"""
+    with Image.open(source_path) as img:
+        size = img.size
+        img.verify()
+    return size
+
+
+def render_resized(source_path: str, target_path: str, box: Tuple[int, int], fmt: str) -> Tuple[int, int]:
+    """Одна уменьшенная копия произвольного (разрешённого) размера"""
+    resized = fit_to_box(open_rgb(source_path, max_box=box), box)
+    save_as(resized, fmt, Path(target_path))
+    return resized.size
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from starlette.responses import FileResponse
+from ..config import settings
+from ..services.image_pipeline import ImagePipeline, image_pipeline
+from ..services.image_variants import render_resized
+from ..services.logger import logger
+
+
+# Размеры, которые можно запросить через /media: произвольные размеры
+# позволили бы забить диск и процессор уникальными запросами
+ALLOWED_SIZES = {
+    (160, 160),
+    (320, 320),
+    (640, 640),
+    (1280, 1280),
+    (1920, 1080),
+}
+
+# Расширение в URL -> (формат VARIANT_FORMATS, MIME-тип)
+MEDIA_FORMATS = {
+    "webp": ("webp", "image/webp"),
+    "jpg": ("jpeg", "image/jpeg"),
+}
+
+
+class DiskLRUCache:
+    """Дисковый кэш файлов с ограничением суммарного размера.
+
+    Порядок использования хранится в памяти и восстанавливается при старте
+    по atime файлов; при превышении лимита удаляются давно не запрошенные.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries: Optional[OrderedDict] = None  # ключ -> размер файла
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self):
+        """Читает содержимое каталога кэша (один раз, при первом обращении)"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = Path(root) / name
+                if name.endswith(".tmp"):
+                    # Недописанный файл после падения процесса
+                    path.unlink(missing_ok=True)
+                    continue
+                stat_result = path.stat()
+                found.append((stat_result.st_atime, path.relative_to(self.directory).as_posix(), stat_result.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in found)
+        self.total_bytes = sum(self._entries.values())
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key
+
+    def get(self, key: str, record: bool = True) -> Optional[Path]:
+        """Путь к файлу в кэше или None (record=False - не учитывать в статистике)"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if key not in self._entries:
+                self.misses += record
+                return None
+            self._entries.move_to_end(key)
+            self.hits += record
+        path = self.path_for(key)
+        try:
+            # Обновляем только atime, чтобы порядок LRU пережил перезапуск;
+            # mtime не трогаем - от него зависят ETag и Last-Modified
+            os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+        except FileNotFoundError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def temp_path(self, key: str) -> Path:
+        """Временный файл рядом с итоговым (os.replace атомарен в пределах каталога)"""
+        target = self.path_for(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+
+    def put(self, key: str, temp_path: Path) -> Path:
+        """Переносит готовый временный файл в кэш и вытесняет старые записи"""
+        target = self.path_for(key)
+        os.replace(temp_path, target)
+        size = target.stat().st_size
+
+        evicted = []
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self.total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            self.path_for(old_key).unlink(missing_ok=True)
+        return target
+
+    def purge(self, directory: str) -> int:
+        """Удаляет подкаталог кэша целиком (и файлы, созданные другими процессами)"""
+        prefix = directory.rstrip("/") + "/"
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self.total_bytes -= self._entries.pop(key)
+        shutil.rmtree(self.path_for(prefix), ignore_errors=True)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            keys = list(self._entries)
+            self._entries.clear()
+            self.total_bytes = 0
+        for key in keys:
+            self.path_for(key).unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries) if self._entries is not None else 0,
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0,
+        }
+
+
+class ResizedImageService:
+    """Уменьшенные копии фото по запросу: рендер в пуле процессов, хранение в DiskLRUCache"""
+
+    def __init__(self, cache: DiskLRUCache, pipeline: ImagePipeline):
+        self.cache = cache
+        self.pipeline = pipeline
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def photo_version(photo) -> str:
+        """Версия содержимого фото для URL и ключа кэша (у старых фото хэша нет)"""
+        return (photo.content_hash or "legacy")[:16]
+
+    @staticmethod
+    def cache_key(photo_id: int, version: str, box: Tuple[int, int], ext: str) -> str:
+        return f"{photo_id}/{version}/{box[0]}x{box[1]}.{ext}"
+
+    @classmethod
+    def url(cls, photo, box: Tuple[int, int], ext: str = "webp") -> str:
+        """Адресуемый по содержимому URL копии: его можно кэшировать навсегда"""
+        return f"/media/products/{photo.id}/{cls.photo_version(photo)}/{box[0]}x{box[1]}.{ext}"
+
+    def purge_photo(self, photo_id: int) -> int:
+        """Удаляет все копии фото (после удаления записи)"""
+        return self.cache.purge(str(photo_id))
+
+    async def render(self, key: str, source_path: str, box: Tuple[int, int], fmt: str) -> Path:
+        """Рендерит копию и кладёт в кэш; одновременные запросы одного ключа ждут первый"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                # Пока ждали блокировку, копию мог создать другой запрос
+                path = self.cache.get(key, record=False)
+                if path is not None:
+                    return path
+                loop = asyncio.get_running_loop()
+                temp_path = self.cache.temp_path(key)
+                try:
+                    await loop.run_in_executor(
+                        self.pipeline.executor, render_resized, source_path, str(temp_path), box, fmt
+                    )
+                except Exception:
+                    temp_path.unlink(missing_ok=True)
+                    logger.error(f"Ошибка ресайза {source_path} -> {key}")
+                    raise
+                return await loop.run_in_executor(None, self.cache.put, key, temp_path)
+        finally:
+            if not lock.locked():
+                self._locks.pop(key, None)
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """FileResponse, который отдаёт файл средствами сервера, если тот умеет.
+
+    Серверы с ASGI-расширениями http.response.pathsend / http.response.zerocopy
+    отправляют файл сами (sendfile), иначе файл читается блоками, как обычно.
+    """
+
+    chunk_size = 256 * 1024
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        if self.send_header_only or self.stat_result is None or not (
+            "http.response.pathsend" in extensions or "http.response.zerocopy" in extensions
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "count": self.stat_result.st_size,
+                    "more_body": False,
+                })
+        if self.background is not None:
+            await self.background()
+
+
+# Глобальный кэш уменьшенных копий фото
+media_cache = DiskLRUCache(Path(settings.media_cache_dir), settings.media_cache_max_mb * 1024 * 1024)
+resized_images = ResizedImageService(media_cache, image_pipeline)
@@ -0,0 +1,178 @@
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from sqlalchemy.orm import Session
+from ..models import Order, ProductPhoto, ProductPhotoVariant, ShopOrder
+from ..services.logger import logger
+from ..services.product_photos import ProductPhotoService
+from ..services.qr_service import QRService
+
+
+@dataclass
+class MediaRoot:
+    """Каталог с файлами, на которые ссылаются записи БД"""
+    name: str
+    directory: Path
+    to_reference: Callable[[str], str]  # путь файла -> значение, которое хранится в БД
+    find_referenced: Callable[[Session, List[str]], Set[str]]  # какие из значений есть в БД
+
+
+@dataclass
+class RootReport:
+    scanned: int = 0
+    orphans: int = 0
+    removed: int = 0
+    bytes_reclaimed: int = 0
+    skipped_recent: int = 0
+    errors: int = 0
+
+
+@dataclass
+class GCReport:
+    dry_run: bool
+    roots: Dict[str, RootReport] = field(default_factory=dict)
+    duration: float = 0.0
+
+    def to_dict(self) -> Dict:
+        totals = RootReport()
+        for report in self.roots.values():
+            for name in totals.__dataclass_fields__:
+                setattr(totals, name, getattr(totals, name) + getattr(report, name))
+        return {
+            "dry_run": self.dry_run,
+            "duration_s": round(self.duration, 2),
+            "total": totals.__dict__,
+            "roots": {name: report.__dict__ for name, report in self.roots.items()},
+        }
+
+
+def _referenced_photos(db: Session, values: List[str]) -> Set[str]:
+    found = {row[0] for row in db.query(ProductPhoto.file_path).filter(ProductPhoto.file_path.in_(values))}
+    found.update(row[0] for row in db.query(ProductPhotoVariant.file_path).filter(ProductPhotoVariant.file_path.in_(values)))
+    return found
+
+
+def _referenced_qr(db: Session, values: List[str]) -> Set[str]:
+    found = {row[0] for row in db.query(Order.qr_image_path).filter(Order.qr_image_path.in_(values))}
+    found.update(row[0] for row in db.query(ShopOrder.qr_image_path).filter(ShopOrder.qr_image_path.in_(values)))
+    return found
+
+
+def default_roots() -> List[MediaRoot]:
+    """Фото товаров (с вариантами) и QR-изображения заказов"""
+    qr_dir = Path(QRService.QR_STORAGE_PATH)
+    return [
+        MediaRoot(
+            name="products",
+            directory=ProductPhotoService.UPLOAD_DIR,
+            to_reference=lambda path: Path(path).as_posix(),
+            find_referenced=_referenced_photos,
+        ),
+        MediaRoot(
+            name="qr",
+            directory=qr_dir,
+            # В заказах хранится путь относительно app/static: qr/<id>.png
+            to_reference=lambda path: "qr/" + Path(path).relative_to(qr_dir).as_posix(),
+            find_referenced=_referenced_qr,
+        ),
+    ]
+
+
+def iter_files(directory: Path, exclude: Optional[Path] = None) -> Iterator[os.DirEntry]:
+    """Обходит дерево через os.scandir, не собирая список файлов целиком"""
+    stack = [str(directory)]
+    exclude = os.path.abspath(exclude) if exclude else None
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if exclude is None or os.path.abspath(entry.path) != exclude:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+class MediaGarbageCollector:
+    """Удаление файлов, на которые не ссылается ни одна запись БД.
+
+    Файлы обходятся потоково и проверяются пачками: для каждой пачки
+    одним запросом на таблицу выясняется, какие пути ещё используются.
+    Память не зависит от числа файлов. Свежие файлы (моложе min_age)
+    не трогаются: их могла только что записать загрузка или обработка фото.
+    """
+
+    def __init__(self, roots: Optional[List[MediaRoot]] = None, batch_size: int = 500,
+                 min_age: float = 3600, quarantine_dir: Optional[Path] = None, dry_run: bool = False):
+        self.roots = roots if roots is not None else default_roots()
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.quarantine_dir = Path(quarantine_dir) if quarantine_dir else None
+        self.dry_run = dry_run
+
+    def run(self, db: Session) -> GCReport:
+        started = time.perf_counter()
+        report = GCReport(dry_run=self.dry_run)
+        for root in self.roots:
+            report.roots[root.name] = self.collect_root(db, root)
+        report.duration = time.perf_counter() - started
+
+        totals = report.to_dict()["total"]
+        logger.info(
+            f"Сборка мусора медиа: проверено {totals['scanned']}, сирот {totals['orphans']}, "
+            f"удалено {totals['removed']}, освобождено {totals['bytes_reclaimed']} байт"
+        )
+        return report
+
+    def collect_root(self, db: Session, root: MediaRoot) -> RootReport:
+        report = RootReport()
+        deadline = time.time() - self.min_age
+        batch = []
+        for entry in iter_files(root.directory, exclude=self.quarantine_dir):
+            report.scanned += 1
+            try:
+                stat_result = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat_result.st_mtime > deadline:
+                report.skipped_recent += 1
+                continue
+            batch.append((entry.path, stat_result.st_size))
+            if len(batch) >= self.batch_size:
+                self._process_batch(db, root, batch, report)
+                batch = []
+        if batch:
+            self._process_batch(db, root, batch, report)
+        return report
+
+    def _process_batch(self, db: Session, root: MediaRoot, batch, report: RootReport):
+        references = {path: root.to_reference(path) for path, _ in batch}
+        referenced = root.find_referenced(db, list(references.values()))
+        for path, size in batch:
+            if references[path] in referenced:
+                continue
+            report.orphans += 1
+            if self.dry_run:
+                report.bytes_reclaimed += size
+                continue
+            try:
+                if self.quarantine_dir is not None:
+                    target = self.quarantine_dir / root.name / Path(path).relative_to(root.directory)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.move(path, target)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                report.errors += 1
+                logger.warning(f"Не удалось удалить файл-сироту {path}: {e}")
+                continue
+            report.removed += 1
+            report.bytes_reclaimed += size
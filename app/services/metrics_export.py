@@ -0,0 +1,325 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from ..config import settings
+from ..db import engine
+from ..middleware.compression import compression_stats
+from ..services.fragment_cache import fragment_cache
+from ..services.image_pipeline import image_pipeline
+from ..services.logger import logger
+from ..services.media_cache import media_cache
+from ..services.monitoring import HISTOGRAM_BOUNDS, HISTOGRAM_BUCKETS_PER_DOUBLING, LatencyHistogram, performance_monitor
+from ..services.qr_service import qr_image_cache
+from ..services.response_cache import response_cache
+
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "sirius_"
+
+# В экспорт идёт одна граница на удвоение (0.5 мс ... ~65 с) - набор le постоянный,
+# внутренние корзины гистограммы суммируются в ближайшую экспортируемую
+EXPORT_BOUND_INDEXES = list(range(0, len(HISTOGRAM_BOUNDS), HISTOGRAM_BUCKETS_PER_DOUBLING))
+
+
+class MetricFamily:
+    """Семейство метрик одного имени: тип, описание и сэмплы по наборам меток"""
+
+    def __init__(self, name: str, metric_type: str, help_text: str, unit: str = "", per_process: bool = False):
+        self.name = PREFIX + name
+        self.type = metric_type  # counter, gauge, histogram
+        self.help = help_text
+        self.unit = unit
+        # Значения процессов не складываются, а различаются меткой pid (память, CPU)
+        self.per_process = per_process
+        self.samples: List[List[Any]] = []  # [метки, значение]
+
+    def add(self, labels: Dict[str, str], value):
+        self.samples.append([labels, value])
+        return self
+
+    def add_histogram(self, labels: Dict[str, str], histogram: LatencyHistogram):
+        cumulative = []
+        running = 0
+        position = 0
+        for index in EXPORT_BOUND_INDEXES:
+            while position <= index:
+                running += histogram.counts[position]
+                position += 1
+            cumulative.append(running)
+        return self.add(labels, {"buckets": cumulative, "sum": histogram.total, "count": histogram.count})
+
+    def to_dict(self) -> Dict:
+        return {"type": self.type, "help": self.help, "unit": self.unit,
+                "per_process": self.per_process, "samples": self.samples}
+
+
+def read_process_stats() -> Dict[str, float]:
+    """RSS, CPU и время старта процесса из /proc (без psutil)"""
+    stats = {}
+    try:
+        with open("/proc/self/stat") as f:
+            # Имя процесса в скобках может содержать пробелы - поля считаем после ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        stats["cpu_seconds"] = (int(fields[11]) + int(fields[12])) / ticks
+        stats["resident_memory_bytes"] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        stats["start_time_seconds"] = boot_time + int(fields[19]) / ticks
+        stats["open_fds"] = len(os.listdir("/proc/self/fd"))
+    except (OSError, ValueError, IndexError, StopIteration):
+        # Не Linux: CPU доступен и без /proc
+        times = os.times()
+        stats["cpu_seconds"] = times.user + times.system
+    return stats
+
+
+def collect_local() -> Dict:
+    """Снимок метрик текущего процесса"""
+    families = []
+
+    requests = MetricFamily("http_request_duration_seconds", "histogram",
+                            "Время обработки HTTP-запроса по шаблону маршрута", unit="seconds")
+    responses = MetricFamily("http_responses", "counter", "HTTP-ответы по классам статусов")
+    route_queries = MetricFamily("http_request_db_queries", "counter", "SQL-запросы, выполненные при обработке маршрута")
+    for key, stats in list(performance_monitor.routes.items()):
+        method, _, route = key.partition(" ")
+        labels = {"method": method, "route": route}
+        requests.add_histogram(labels, stats.histogram)
+        for status_class, count in stats.status_classes.items():
+            if count:
+                responses.add({**labels, "status_class": status_class}, count)
+        if stats.db_queries:
+            route_queries.add(labels, stats.db_queries)
+    families += [requests, responses, route_queries]
+
+    queries = MetricFamily("db_query_duration_seconds", "histogram",
+                           "Время выполнения SQL-запросов по типу операции", unit="seconds")
+    for operation, histogram in list(performance_monitor.database_histograms.items()):
+        queries.add_histogram({"operation": operation}, histogram)
+    families.append(queries)
+
+    pool = engine.pool
+    pool_family = MetricFamily("db_pool_connections", "gauge", "Соединения пула БД по состоянию")
+    for state, getter in (("size", "size"), ("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+        if hasattr(pool, getter):
+            # overflow() у QueuePool отрицателен, пока пул не заполнен
+            pool_family.add({"state": state}, max(0, getattr(pool, getter)()))
+    families.append(pool_family)
+
+    hits = MetricFamily("cache_hits", "counter", "Попадания в кэши (доля попаданий: hits / (hits + misses))")
+    misses = MetricFamily("cache_misses", "counter", "Промахи кэшей")
+    entries = MetricFamily("cache_entries", "gauge", "Записей в кэше")
+    for name, cache in (("response", response_cache), ("fragment", fragment_cache),
+                        ("media", media_cache), ("qr_image", qr_image_cache)):
+        cache_stats = cache.get_stats()
+        hits.add({"cache": name}, cache_stats["hits"])
+        misses.add({"cache": name}, cache_stats["misses"])
+        entries.add({"cache": name}, cache_stats["entries"])
+    families += [hits, misses, entries]
+
+    compression = compression_stats.get_stats()
+    families.append(MetricFamily("compression_input_bytes", "counter", "Байт до сжатия ответов")
+                    .add({}, compression["bytes_in"]))
+    families.append(MetricFamily("compression_output_bytes", "counter", "Байт после сжатия ответов")
+                    .add({}, compression["bytes_out"]))
+
+    pipeline = image_pipeline.get_stats()
+    families.append(MetricFamily("image_jobs_in_progress", "gauge", "Задачи обработки фото в очереди и в работе")
+                    .add({}, pipeline["in_progress"]))
+    families.append(MetricFamily("image_jobs", "counter", "Завершённые задачи обработки фото")
+                    .add({"result": "processed"}, pipeline["processed"])
+                    .add({"result": "failed"}, pipeline["failed"]))
+
+    process = read_process_stats()
+    families.append(MetricFamily("process_cpu_seconds", "counter", "Процессорное время процесса (user + system)",
+                                 unit="seconds", per_process=True).add({}, process["cpu_seconds"]))
+    for key, name, help_text, unit in (
+        ("resident_memory_bytes", "process_resident_memory_bytes", "Резидентная память процесса", "bytes"),
+        ("start_time_seconds", "process_start_time_seconds", "Время старта процесса (Unix)", "seconds"),
+        ("open_fds", "process_open_fds", "Открытые файловые дескрипторы", ""),
+    ):
+        if key in process:
+            families.append(MetricFamily(name, "gauge", help_text, unit=unit, per_process=True).add({}, process[key]))
+
+    return {
+        "pid": os.getpid(),
+        "written_at": time.time(),
+        "families": {family.name: family.to_dict() for family in families},
+    }
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict[str, Dict]:
+    """Сводит снимки процессов: счётчики и гистограммы складываются,
+    процессные метрики получают метку pid"""
+    merged: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        pid = str(snapshot["pid"])
+        for name, family in snapshot["families"].items():
+            target = merged.setdefault(name, {**family, "samples": {}})
+            for labels, value in family["samples"]:
+                if family["per_process"]:
+                    labels = {**labels, "pid": pid}
+                key = json.dumps(labels, sort_keys=True)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = (labels, value)
+                elif isinstance(value, dict):
+                    target["samples"][key] = (labels, {
+                        "buckets": [a + b for a, b in zip(current[1]["buckets"], value["buckets"])],
+                        "sum": current[1]["sum"] + value["sum"],
+                        "count": current[1]["count"] + value["count"],
+                    })
+                else:
+                    target["samples"][key] = (labels, current[1] + value)
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render_openmetrics(families: Dict[str, Dict]) -> str:
+    """Текст в формате OpenMetrics 1.0"""
+    lines = []
+    bounds = [repr(HISTOGRAM_BOUNDS[index]) for index in EXPORT_BOUND_INDEXES]
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# TYPE {name} {family['type']}")
+        if family["unit"]:
+            lines.append(f"# UNIT {name} {family['unit']}")
+        lines.append(f"# HELP {name} {_escape(family['help'])}")
+        for labels, value in family["samples"].values():
+            if family["type"] == "histogram":
+                for bound, count in zip(bounds, value["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+            elif family["type"] == "counter":
+                lines.append(f"{name}_total{_format_labels(labels)} {_format_value(value)}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsFileStore:
+    """Общее хранилище снимков метрик для нескольких воркеров uvicorn/gunicorn.
+
+    Каждый процесс раз в interval секунд записывает свой снимок в <pid>.json,
+    /metrics читает снимки всех живых процессов и сводит их. Без каталога
+    (по умолчанию) отдаются метрики только текущего процесса.
+    """
+
+    def __init__(self, directory: Optional[str], interval: float = 5.0):
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def path_for(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def write(self, snapshot: Dict):
+        """Атомарная запись снимка процесса"""
+        path = self.path_for(snapshot["pid"])
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _is_stale(self, snapshot: Dict) -> bool:
+        """Процесс завершился или давно не писал (pid мог достаться другому процессу)"""
+        if time.time() - snapshot.get("written_at", 0) > max(60.0, self.interval * 10):
+            return True
+        try:
+            os.kill(snapshot["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def read_others(self) -> List[Dict]:
+        """Снимки остальных процессов; снимки завершённых процессов удаляются"""
+        if not self.enabled:
+            return []
+        snapshots = []
+        own_pid = os.getpid()
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        for entry in entries:
+            if not entry.name.endswith(".json") or entry.name == f"{own_pid}.json":
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if self._is_stale(snapshot):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            snapshots.append(snapshot)
+        return snapshots
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write(collect_local())
+            except Exception as e:
+                logger.warning(f"Не удалось записать снимок метрик: {e}")
+
+    def start(self):
+        """Запускает фоновую запись снимков (вызывается при старте воркера)"""
+        if not self.enabled or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-store", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает запись и убирает снимок процесса"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        self._thread = None
+        try:
+            os.remove(self.path_for(os.getpid()))
+        except OSError:
+            pass
+
+
+# Глобальное хранилище снимков (каталог задаётся METRICS_MULTIPROCESS_DIR)
+metrics_store = MetricsFileStore(settings.metrics_multiprocess_dir, settings.metrics_flush_interval)
+
+
+def render_metrics() -> str:
+    """Метрики всех процессов приложения в формате OpenMetrics"""
+    snapshots = [collect_local()] + metrics_store.read_others()
+    return render_openmetrics(merge_snapshots(snapshots))
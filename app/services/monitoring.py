@@ -1,39 +1,343 @@
+import math
+import threading
 import time
-from typing import Dict, Any, Optional
+from array import array
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import Counter, defaultdict
+from starlette.concurrency import run_in_threadpool
 from ..services.logger import logger
+from ..services.nplusone import nplusone_detector
+from ..services.slow_requests import MAX_TRACE_STATEMENTS, slow_request_log
 
 
-class PerformanceMonitor:
-    """Упрощенный сервис мониторинга производительности без внешних зависимостей"""
+# Гистограмма задержек: корзины в логарифмической шкале от 0.5 мс,
+# 4 корзины на удвоение (погрешность перцентиля не больше ~19%), до ~2 минут.
+# Всё, что дольше, попадает в последнюю корзину
+HISTOGRAM_MIN = 0.0005
+HISTOGRAM_BUCKETS_PER_DOUBLING = 4
+HISTOGRAM_BUCKETS = 72
+HISTOGRAM_BOUNDS = [HISTOGRAM_MIN * 2 ** (i / HISTOGRAM_BUCKETS_PER_DOUBLING) for i in range(HISTOGRAM_BUCKETS)]
+
+# Ограничение числа маршрутов: лишние попадают в общий OTHER_ROUTE
+MAX_ROUTES = 500
+UNMATCHED_ROUTE = "<unmatched>"
+OTHER_ROUTE = "<other>"
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+# Последние запросы хранятся в кольцевых буферах фиксированного размера,
+# сводка за последний час - в поминутных корзинах
+REQUEST_BUFFER_SIZE = 1000
+TIME_BUCKET_SECONDS = 60
+TIME_BUCKETS = 60
+
+# Ограничение числа типов ошибок: лишние попадают в общий OTHER_ERROR
+MAX_ERROR_TYPES = 100
+OTHER_ERROR = "<other>"
+
+
+class LatencyHistogram:
+    """Гистограмма задержек фиксированного размера с оценкой перцентилей"""
+    
+    __slots__ = ("counts", "count", "total", "min", "max")
     
     def __init__(self):
-        self.request_times = deque(maxlen=1000)  # Последние 1000 запросов
-        self.error_counts = defaultdict(int)     # Счетчики ошибок
-        self.database_query_times = deque(maxlen=500)  # Время запросов к БД
+        self.counts = [0] * (HISTOGRAM_BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+    
+    @staticmethod
+    def bucket_index(duration: float) -> int:
+        """Номер корзины: верхняя граница корзины i - HISTOGRAM_BOUNDS[i]"""
+        if duration <= HISTOGRAM_MIN:
+            return 0
+        index = math.ceil(math.log2(duration / HISTOGRAM_MIN) * HISTOGRAM_BUCKETS_PER_DOUBLING)
+        return min(index, HISTOGRAM_BUCKETS)
+    
+    def record(self, duration: float):
+        self.counts[self.bucket_index(duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+    
+    def merge(self, other: "LatencyHistogram"):
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля (q от 0 до 1) по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, value in enumerate(self.counts):
+            cumulative += value
+            if value and cumulative >= rank:
+                bound = HISTOGRAM_BOUNDS[index] if index < HISTOGRAM_BUCKETS else self.max
+                return max(self.min, min(bound, self.max))
+        return self.max
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else 0,
+            "min": round(self.min, 4) if self.count else 0,
+            "max": round(self.max, 4),
+            "p50": round(self.percentile(0.50), 4),
+            "p90": round(self.percentile(0.90), 4),
+            "p99": round(self.percentile(0.99), 4),
+        }
+
+
+@dataclass
+class QueryLog:
+    """SQL-запросы одного HTTP-запроса (заполняется обработчиками событий движка)"""
+    count: int = 0
+    duration: float = 0.0
+    rows: int = 0  # Загруженных ORM-объектов (строк результата, ставших объектами)
+    fingerprints: Counter = field(default_factory=Counter)
+    locations: Dict[str, str] = field(default_factory=dict)  # Повторяющиеся отпечатки (N+1) -> место в коде
+    started: float = field(default_factory=time.perf_counter)
+    # Трасса для медленных запросов: (смещение, длительность, SQL, параметры, executemany, engine);
+    # None - трасса не собирается
+    statements: Optional[List[tuple]] = None
+    
+    def record(self, fingerprint: str, duration: float) -> int:
+        """Учитывает запрос, возвращает число повторов отпечатка"""
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint] += 1
+        return self.fingerprints[fingerprint]
+
+
+# Журнал SQL текущего HTTP-запроса, его устанавливает PerformanceMiddleware.
+# Контекст копируется в поток run_in_threadpool, поэтому синхронные
+# эндпоинты пишут в тот же журнал
+current_query_log: ContextVar[Optional[QueryLog]] = ContextVar("current_query_log", default=None)
+
+
+class RouteStats:
+    """Статистика одного маршрута: гистограмма задержек, ответы по классам статусов и SQL"""
+    
+    __slots__ = ("route_id", "histogram", "status_classes", "db_queries", "db_time", "db_max_queries", "db_rows")
+    
+    def __init__(self, route_id: int = 0):
+        self.route_id = route_id  # Номер маршрута в кольцевом буфере последних запросов
+        self.histogram = LatencyHistogram()
+        self.status_classes = dict.fromkeys(STATUS_CLASSES, 0)
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.db_max_queries = 0
+        self.db_rows = 0
+    
+    def record(self, duration: float, status_code: int, queries: Optional[QueryLog] = None):
+        self.histogram.record(duration)
+        status_class = f"{status_code // 100}xx"
+        if status_class in self.status_classes:
+            self.status_classes[status_class] += 1
+        if queries is not None:
+            self.db_queries += queries.count
+            self.db_time += queries.duration
+            self.db_rows += queries.rows
+            if queries.count > self.db_max_queries:
+                self.db_max_queries = queries.count
+    
+    def to_dict(self) -> Dict[str, Any]:
+        count = self.histogram.count
+        errors = self.status_classes["4xx"] + self.status_classes["5xx"]
+        return {
+            **self.histogram.to_dict(),
+            "status": dict(self.status_classes),
+            "error_rate": {
+                "4xx": round(self.status_classes["4xx"] / count, 4) if count else 0,
+                "5xx": round(self.status_classes["5xx"] / count, 4) if count else 0,
+                "total": round(errors / count, 4) if count else 0,
+            },
+            "db": {
+                "queries": self.db_queries,
+                "avg_queries": round(self.db_queries / count, 2) if count else 0,
+                "max_queries": self.db_max_queries,
+                "time": round(self.db_time, 4),
+                "avg_time": round(self.db_time / count, 5) if count else 0,
+                "rows": self.db_rows,
+                "avg_rows": round(self.db_rows / count, 2) if count else 0,
+            },
+        }
+
+
+class RequestRingBuffer:
+    """Последние запросы в массивах array фиксированного размера.
+    
+    Вместо словаря с datetime на каждый запрос - по одному числу в каждом массиве:
+    время (секунды epoch), длительность, код ответа и номер маршрута.
+    """
+    
+    __slots__ = ("capacity", "timestamps", "durations", "status_codes", "route_ids", "position", "size")
+    
+    def __init__(self, capacity: int = REQUEST_BUFFER_SIZE):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.durations = array("d", bytes(8 * capacity))
+        self.status_codes = array("H", bytes(2 * capacity))
+        self.route_ids = array("i", bytes(4 * capacity))
+        self.position = 0  # Куда пишется следующий запрос
+        self.size = 0
+    
+    def append(self, timestamp: float, duration: float, status_code: int, route_id: int):
+        position = self.position
+        self.timestamps[position] = timestamp
+        self.durations[position] = duration
+        self.status_codes[position] = status_code
+        self.route_ids[position] = route_id
+        self.position = position + 1 if position + 1 < self.capacity else 0
+        if self.size < self.capacity:
+            self.size += 1
+    
+    def indexes(self) -> range:
+        """Позиции от самого старого запроса к самому новому (номера по модулю capacity)"""
+        start = self.position - self.size
+        return range(start, start + self.size)
+    
+    def clear(self):
+        self.position = 0
+        self.size = 0
+
+
+class TimeBucketedCounter:
+    """Количество, сумма, минимум и максимум значений в корзинах по времени.
+    
+    Корзина соответствует интервалу width секунд; устаревшая корзина
+    обнуляется при первой записи в неё, так что сводка за окно
+    buckets * width секунд стоит O(buckets) независимо от нагрузки.
+    """
+    
+    __slots__ = ("width", "buckets", "epochs", "counts", "totals", "mins", "maxs")
+    
+    def __init__(self, width: float = TIME_BUCKET_SECONDS, buckets: int = TIME_BUCKETS):
+        self.width = width
+        self.buckets = buckets
+        self.epochs = array("q", [-1]) * buckets  # Номер интервала, который сейчас хранит корзина
+        self.counts = array("q", bytes(8 * buckets))
+        self.totals = array("d", bytes(8 * buckets))
+        self.mins = array("d", bytes(8 * buckets))
+        self.maxs = array("d", bytes(8 * buckets))
+    
+    def record(self, value: float, now: Optional[float] = None):
+        # Без блокировки, как LatencyHistogram: гонка потоков пула может потерять единичное значение
+        epoch = int((time.time() if now is None else now) // self.width)
+        slot = epoch % self.buckets
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.counts[slot] = 1
+            self.totals[slot] = self.mins[slot] = self.maxs[slot] = value
+            return
+        self.counts[slot] += 1
+        self.totals[slot] += value
+        if value < self.mins[slot]:
+            self.mins[slot] = value
+        elif value > self.maxs[slot]:
+            self.maxs[slot] = value
+    
+    def summary(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Сводка за последние buckets интервалов (включая текущий)"""
+        current = int((time.time() if now is None else now) // self.width)
+        oldest = max(current - self.buckets, -1)  # -1 - пустая корзина
+        count = 0
+        total = 0.0
+        low = math.inf
+        high = 0.0
+        for slot, epoch in enumerate(self.epochs):
+            if not oldest < epoch <= current:
+                continue
+            count += self.counts[slot]
+            total += self.totals[slot]
+            low = min(low, self.mins[slot])
+            high = max(high, self.maxs[slot])
+        return {
+            "count": count,
+            "avg": total / count if count else 0.0,
+            "min": low if count else 0.0,
+            "max": high,
+        }
+    
+    def clear(self):
+        self.epochs = array("q", [-1]) * self.buckets
+
+
+class PerformanceMonitor:
+    """Упрощенный сервис мониторинга производительности без внешних зависимостей.
+    
+    Память не растёт с нагрузкой: последние запросы лежат в кольцевом буфере
+    на массивах, сводка за час - в поминутных счётчиках, маршруты и типы ошибок
+    ограничены MAX_ROUTES и MAX_ERROR_TYPES.
+    """
+    
+    def __init__(self, buffer_size: int = REQUEST_BUFFER_SIZE):
+        self.recent_requests = RequestRingBuffer(buffer_size)  # Пишется из event loop
+        self.request_counter = TimeBucketedCounter()  # Длительности запросов за последний час
+        self.database_counter = TimeBucketedCounter()  # Длительности запросов к БД за последний час
+        self.error_counts: Dict[str, int] = {}  # Счетчики ошибок по типам
+        self.routes: Dict[str, RouteStats] = {}  # "GET /orders/{order_id}" -> статистика
+        self.route_keys: List[str] = []  # Номер маршрута -> ключ в routes
+        self.database_histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)  # По операциям
+        self._routes_lock = threading.Lock()
         self.start_time = datetime.now()
     
-    def record_request_time(self, path: str, method: str, duration: float):
-        """Запись времени выполнения запроса"""
+    def _route_stats(self, key: str) -> RouteStats:
+        stats = self.routes.get(key)
+        if stats is None:
+            with self._routes_lock:
+                stats = self.routes.get(key)
+                if stats is None:
+                    if len(self.routes) >= MAX_ROUTES:
+                        key = OTHER_ROUTE
+                        stats = self.routes.get(key)
+                    if stats is None:
+                        stats = self.routes[key] = RouteStats(len(self.route_keys))
+                        self.route_keys.append(key)
+        return stats
+    
+    def record_request_time(self, path: str, method: str, duration: float,
+                            status_code: int = 200, route: Optional[str] = None,
+                            queries: Optional[QueryLog] = None):
+        """Запись времени выполнения запроса.
+        
+        route - шаблон маршрута (/orders/{order_id}); по нему копится гистограмма,
+        чтобы /orders/123 и /orders/124 попадали в одну запись.
+        queries - SQL-запросы, выполненные при обработке запроса.
+        """
         try:
-            self.request_times.append({
-                'timestamp': datetime.now(),
-                'path': path,
-                'method': method,
-                'duration': duration
-            })
+            now = time.time()
+            stats = self._route_stats(f"{method} {route or path}")
+            stats.record(duration, status_code, queries)
+            self.recent_requests.append(now, duration, status_code, stats.route_id)
+            self.request_counter.record(duration, now)
             
             # Логируем медленные запросы
-            if duration > 1.0:  # Больше 1 секунды
-                logger.warning(f"Медленный запрос: {method} {path} - {duration:.2f}s")
+            if duration > slow_request_log.threshold:
+                db_info = f" (SQL: {queries.count} за {queries.duration:.3f}s)" if queries is not None else ""
+                logger.warning(f"Медленный запрос: {method} {path} - {duration:.2f}s{db_info}")
         except Exception as e:
             logger.error(f"Ошибка при записи времени запроса: {e}")
     
     def record_error(self, error_type: str, path: str, error_message: str):
         """Запись ошибки"""
         try:
-            self.error_counts[error_type] += 1
+            if error_type not in self.error_counts and len(self.error_counts) >= MAX_ERROR_TYPES:
+                error_type = OTHER_ERROR
+            self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
             logger.error(f"Ошибка {error_type} на {path}: {error_message}")
         except Exception as e:
             logger.error(f"Ошибка при записи ошибки: {e}")
@@ -41,12 +345,8 @@ class PerformanceMonitor:
     def record_database_query(self, table: str, operation: str, duration: float):
         """Запись времени выполнения запроса к БД"""
         try:
-            self.database_query_times.append({
-                'timestamp': datetime.now(),
-                'table': table,
-                'operation': operation,
-                'duration': duration
-            })
+            self.database_counter.record(duration)
+            self.database_histograms[operation].record(duration)
             
             # Логируем медленные запросы к БД
             if duration > 0.5:  # Больше 500ms
@@ -59,42 +359,38 @@ class PerformanceMonitor:
         try:
             now = datetime.now()
             
-            # Статистика запросов за последний час
-            hour_ago = now - timedelta(hours=1)
-            recent_requests = [r for r in self.request_times if r['timestamp'] > hour_ago]
-            
-            if recent_requests:
-                avg_response_time = sum(r['duration'] for r in recent_requests) / len(recent_requests)
-                max_response_time = max(r['duration'] for r in recent_requests)
-                min_response_time = min(r['duration'] for r in recent_requests)
-            else:
-                avg_response_time = max_response_time = min_response_time = 0
+            # Статистика запросов и БД за последний час - по поминутным корзинам
+            recent_requests = self.request_counter.summary()
+            recent_db_queries = self.database_counter.summary()
             
             # Статистика ошибок
-            total_errors = sum(self.error_counts.values())
+            error_counts = dict(self.error_counts)
+            total_errors = sum(error_counts.values())
             
-            # Статистика БД
-            recent_db_queries = [q for q in self.database_query_times if q['timestamp'] > hour_ago]
-            if recent_db_queries:
-                avg_db_time = sum(q['duration'] for q in recent_db_queries) / len(recent_db_queries)
-            else:
-                avg_db_time = 0
+            overall = LatencyHistogram()
+            for stats in list(self.routes.values()):
+                overall.merge(stats.histogram)
             
             return {
                 'uptime': str(now - self.start_time),
                 'requests': {
-                    'total_last_hour': len(recent_requests),
-                    'avg_response_time': round(avg_response_time, 3),
-                    'max_response_time': round(max_response_time, 3),
-                    'min_response_time': round(min_response_time, 3)
+                    'total_last_hour': recent_requests['count'],
+                    'avg_response_time': round(recent_requests['avg'], 3),
+                    'max_response_time': round(recent_requests['max'], 3),
+                    'min_response_time': round(recent_requests['min'], 3),
+                    'total': overall.count,
+                    'p50': round(overall.percentile(0.50), 4),
+                    'p90': round(overall.percentile(0.90), 4),
+                    'p99': round(overall.percentile(0.99), 4)
                 },
+                'routes': self.get_route_metrics(),
                 'errors': {
                     'total': total_errors,
-                    'by_type': dict(self.error_counts)
+                    'by_type': error_counts
                 },
                 'database': {
-                    'queries_last_hour': len(recent_db_queries),
-                    'avg_query_time': round(avg_db_time, 3)
+                    'queries_last_hour': recent_db_queries['count'],
+                    'avg_query_time': round(recent_db_queries['avg'], 3)
                 },
                 'system': {
                     'memory_percent': 0,  # Упрощено
@@ -107,17 +403,48 @@ class PerformanceMonitor:
             logger.error(f"Ошибка при получении метрик: {e}")
             return {
                 'uptime': '0:00:00',
-                'requests': {'total_last_hour': 0, 'avg_response_time': 0, 'max_response_time': 0, 'min_response_time': 0},
+                'requests': {'total_last_hour': 0, 'avg_response_time': 0, 'max_response_time': 0, 'min_response_time': 0,
+                             'total': 0, 'p50': 0, 'p90': 0, 'p99': 0},
+                'routes': [],
                 'errors': {'total': 0, 'by_type': {}},
                 'database': {'queries_last_hour': 0, 'avg_query_time': 0},
                 'system': {'memory_percent': 0, 'memory_used_gb': 0, 'cpu_percent': 0},
                 'timestamp': datetime.now().isoformat()
             }
     
+    def get_route_metrics(self) -> List[Dict[str, Any]]:
+        """Метрики по шаблонам маршрутов, самые нагруженные первыми"""
+        routes = [
+            {'route': key, **stats.to_dict()}
+            for key, stats in list(self.routes.items())
+        ]
+        routes.sort(key=lambda item: item['count'] * item['avg'], reverse=True)
+        return routes
+    
     def get_slow_queries(self, threshold: float = 1.0) -> list:
         """Получение медленных запросов"""
         try:
-            return [r for r in self.request_times if r['duration'] > threshold]
+            ring = self.recent_requests
+            route_keys = self.route_keys
+            slow = []
+            for index in ring.indexes():
+                index %= ring.capacity
+                duration = ring.durations[index]
+                if duration <= threshold:
+                    continue
+                route_id = ring.route_ids[index]
+                route = route_keys[route_id] if route_id < len(route_keys) else OTHER_ROUTE
+                method, _, path = route.partition(' ')
+                if not path:
+                    method, path = '', route
+                slow.append({
+                    'timestamp': datetime.fromtimestamp(ring.timestamps[index]),
+                    'path': path,  # Шаблон маршрута: конкретные пути в буфере не хранятся
+                    'method': method,
+                    'duration': duration,
+                    'status_code': ring.status_codes[index]
+                })
+            return slow
         except Exception as e:
             logger.error(f"Ошибка при получении медленных запросов: {e}")
             return []
@@ -133,9 +460,14 @@ class PerformanceMonitor:
     def reset_metrics(self):
         """Сброс метрик"""
         try:
-            self.request_times.clear()
+            self.recent_requests.clear()
+            self.request_counter.clear()
+            self.database_counter.clear()
             self.error_counts.clear()
-            self.database_query_times.clear()
+            with self._routes_lock:
+                self.routes.clear()
+                self.route_keys.clear()
+            self.database_histograms.clear()
             self.start_time = datetime.now()
             logger.info("Метрики производительности сброшены")
         except Exception as e:
@@ -146,28 +478,63 @@ class PerformanceMonitor:
 performance_monitor = PerformanceMonitor()
 
 
+def route_template(scope) -> str:
+    """Шаблон маршрута, который обработал запрос (известен после маршрутизации)"""
+    template = scope.get('route_template')
+    if template:
+        return template
+    route = scope.get('route')
+    if route is not None and getattr(route, 'path', None):
+        return route.path
+    if scope.get('endpoint') is not None and scope.get('root_path'):
+        # Смонтированное приложение (/static): путь внутри него не важен
+        return scope['root_path'] + '/{path}'
+    return UNMATCHED_ROUTE
+
+
 class PerformanceMiddleware:
     """Упрощенный middleware для мониторинга запросов"""
     
-    def __init__(self, app):
+    def __init__(self, app, monitor: PerformanceMonitor = performance_monitor):
         self.app = app
+        self.monitor = monitor
     
     async def __call__(self, scope, receive, send):
         if scope['type'] == 'http':
-            start_time = time.time()
+            start_time = time.perf_counter()
             path = scope.get('path', '')
             method = scope.get('method', '')
+            status = {'code': 500}
+            queries = QueryLog(statements=[] if slow_request_log.enabled else None)
+            token = current_query_log.set(queries)
+            
+            async def send_wrapper(message):
+                if message['type'] == 'http.response.start':
+                    status['code'] = message['status']
+                await send(message)
             
             try:
-                await self.app(scope, receive, send)
-                duration = time.time() - start_time
-                performance_monitor.record_request_time(path, method, duration)
+                await self.app(scope, receive, send_wrapper)
+                duration = time.perf_counter() - start_time
+                route = route_template(scope)
+                self.monitor.record_request_time(path, method, duration, status['code'], route, queries)
+                if slow_request_log.is_slow(duration):
+                    # Ответ уже отправлен; EXPLAIN выполняется в пуле потоков, не блокируя event loop
+                    await run_in_threadpool(slow_request_log.capture, method, path, route,
+                                            status['code'], duration, queries)
                 
             except Exception as e:
-                duration = time.time() - start_time
-                performance_monitor.record_error('http_error', path, str(e))
-                performance_monitor.record_request_time(path, method, duration)
+                duration = time.perf_counter() - start_time
+                route = route_template(scope)
+                self.monitor.record_error('http_error', path, str(e))
+                self.monitor.record_request_time(path, method, duration, 500, route, queries)
+                if slow_request_log.is_slow(duration):
+                    await run_in_threadpool(slow_request_log.capture, method, path, route, 500, duration, queries)
                 raise
+            else:
+                # Вне try: NPlusOneError в режиме raise не должен второй раз записать запрос как 500
+                nplusone_detector.check(queries, f"{method} {route}")
+            finally:
+                current_query_log.reset(token)
         else:
             await self.app(scope, receive, send)
-
@@ -0,0 +1,92 @@
+import os
+import sys
+from typing import Dict, List
+from ..config import settings
+from ..services.logger import logger
+
+
+NPLUSONE_MODES = ("off", "warn", "raise")
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROJECT_DIR = os.path.dirname(_APP_DIR)
+# Обработчики событий движка и сам детектор: их кадры в месте вызова не показываются
+_INSTRUMENTATION_FILES = {
+    os.path.join(_APP_DIR, "db.py"),
+    os.path.join(_APP_DIR, "services", "sql_stats.py"),
+    os.path.join(_APP_DIR, "services", "nplusone.py"),
+}
+LOCATION_DEPTH = 3
+
+
+class NPlusOneError(Exception):
+    """Один и тот же SQL повторяется в запросе больше допустимого (режим raise)"""
+    pass
+
+
+def code_location(depth: int = LOCATION_DEPTH) -> str:
+    """Место в коде проекта, откуда выполняется текущий SQL-запрос.
+
+    Возвращает до depth ближайших кадров проекта - app/, tests/, scripts/
+    (включая строки шаблонов Jinja2, но не SQLAlchemy и библиотеки),
+    от внутреннего к внешнему: "app/templates/shop/cart.html:12 <- app/routers/shop.py:88 in cart_page".
+    """
+    frames: List[str] = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        template = frame.f_globals.get("__jinja_template__")
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if template is not None:
+            lineno = template.get_corresponding_lineno(frame.f_lineno)
+            frames.append(f"{os.path.relpath(filename, _PROJECT_DIR)}:{lineno}")
+        elif (filename.startswith(_PROJECT_DIR + os.sep) and filename not in _INSTRUMENTATION_FILES
+              and "site-packages" not in filename):
+            frames.append(f"{os.path.relpath(filename, _PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(frames) if frames else "<unknown>"
+
+
+class NPlusOneDetector:
+    """Находит N+1: один отпечаток SELECT больше threshold раз за HTTP-запрос.
+
+    Место в коде определяется один раз - в момент превышения порога,
+    проверка и предупреждение (или NPlusOneError в режиме raise) - в конце запроса.
+    """
+
+    def __init__(self, threshold: int = 10, mode: str = "warn"):
+        if mode not in NPLUSONE_MODES:
+            raise ValueError(f"Неизвестный режим детектора N+1: {mode}")
+        self.threshold = threshold
+        self.mode = mode
+        self.detected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def observe(self, log, fingerprint: str, repeats: int):
+        """Вызывается на каждый SQL-запрос; запоминает место первого превышения порога"""
+        if repeats == self.threshold + 1 and self.enabled:
+            log.locations[fingerprint] = code_location()
+
+    def find(self, log) -> Dict[str, int]:
+        """Отпечатки, превысившие порог: отпечаток -> число повторов"""
+        return {fingerprint: log.fingerprints[fingerprint] for fingerprint in log.locations}
+
+    def check(self, log, label: str):
+        """Предупреждение или NPlusOneError по итогам запроса"""
+        if not self.enabled or not log.locations:
+            return
+        repeated = self.find(log)
+        self.detected += len(repeated)
+        details = "; ".join(
+            f"{count}x {fingerprint} at {log.locations[fingerprint]}"
+            for fingerprint, count in sorted(repeated.items(), key=lambda item: -item[1])
+        )
+        message = f"N+1 в {label}: {details}"
+        if self.mode == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+# Глобальный детектор (в тестах включается режим raise, см. tests/conftest.py)
+nplusone_detector = NPlusOneDetector(settings.nplusone_threshold, settings.nplusone_mode)
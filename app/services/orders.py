@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List, Optional
 from datetime import datetime, timezone
@@ -57,7 +57,7 @@ class OrderService:
 
 def get_orders(db: Session, skip: int = 0, limit: int = 100, status_filter: Optional[str] = None) -> List[Order]:
     """Получить список заказов с фильтрацией по статусу"""
-    query = db.query(Order)
+    query = db.query(Order).options(joinedload(Order.product))  # Товар нужен каждой строке списка
     
     if status_filter:
         # Преобразуем строковый фильтр в enum
@@ -1,12 +1,17 @@
+import hashlib
 import os
 import uuid
 from pathlib import Path
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from PIL import Image
-from app.models import ProductPhoto, Product
+from typing import List, Optional, Tuple
+import anyio
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from app.config import settings
+from app.models import ProductPhoto, ProductPhotoVariant, Product
 from app.schemas.product_photo import ProductPhotoCreate, ProductPhotoUpdate
-from fastapi import HTTPException, status, UploadFile
+from app.services.image_pipeline import image_pipeline, remove_files
+from app.services.image_variants import verify_image
+from app.services.media_cache import resized_images
+from fastapi import BackgroundTasks, HTTPException, status, UploadFile
 
 
 class ProductPhotoService:
@@ -16,12 +21,103 @@ class ProductPhotoService:
     MAX_PHOTOS_PER_PRODUCT = 6
     ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    CHUNK_SIZE = 64 * 1024  # Загрузка читается частями, в памяти не больше одной части
+    MAX_CONCURRENT_UPLOADS = settings.max_concurrent_uploads
+    _active_uploads = 0
     
     @classmethod
     def ensure_upload_dir(cls):
         """Создаёт директорию для загрузки, если её нет"""
         cls.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     
+    @classmethod
+    def blob_path(cls, digest: str, ext: str) -> Path:
+        """Путь файла по хэшу содержимого: ab/cd/<hash><ext>.
+        
+        Два уровня подкаталогов держат каталоги маленькими при любом числе фото.
+        """
+        return cls.UPLOAD_DIR / digest[:2] / digest[2:4] / f"{digest}{ext}"
+    
+    @staticmethod
+    def detect_image_type(header: bytes) -> Optional[Tuple[str, str]]:
+        """Определяет формат по сигнатуре в начале файла: (расширение, MIME-тип)"""
+        if header.startswith(b"\xff\xd8\xff"):
+            return ".jpg", "image/jpeg"
+        if header.startswith(b"\x89PNG\r\n\x1a\n"):
+            return ".png", "image/png"
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return ".webp", "image/webp"
+        return None
+    
+    @classmethod
+    async def stream_upload(cls, file: UploadFile) -> Tuple[Path, int, str, str, str]:
+        """Пишет загрузку во временный файл частями, считая размер и хэш на ходу.
+        
+        Прерывается, как только размер превысил MAX_FILE_SIZE или начало файла
+        не похоже на изображение. Возвращает (временный файл, размер, sha256,
+        расширение, MIME-тип).
+        """
+        temp_dir = cls.UPLOAD_DIR / ".tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_dir / f"{uuid.uuid4().hex}.tmp"
+        
+        digest = hashlib.sha256()
+        size = 0
+        detected = None
+        try:
+            with open(temp_path, "wb") as f:
+                while True:
+                    chunk = await file.read(cls.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if detected is None:
+                        detected = cls.detect_image_type(chunk)
+                        if detected is None:
+                            break
+                    size += len(chunk)
+                    if size > cls.MAX_FILE_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="Файл слишком большой"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+            if detected is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Неподдерживаемый тип файла: ожидается JPEG, PNG или WebP"
+                )
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        
+        return (temp_path, size, digest.hexdigest()) + detected
+    
+    @staticmethod
+    def store_blob(temp_path: Path, file_path: Path):
+        """Проверяет изображение и атомарно переносит временный файл на место.
+        
+        Если файл с таким содержимым уже есть, временный просто удаляется,
+        а у файла обновляется mtime: сборщик мусора медиа не трогает свежие файлы,
+        поэтому бывшая сирота не будет удалена до коммита новой записи.
+        """
+        try:
+            try:
+                os.utime(file_path)
+            except FileNotFoundError:
+                verify_image(str(temp_path))
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, file_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    @staticmethod
+    def count_references(db: Session, photo: ProductPhoto) -> int:
+        """Сколько записей product_photos ссылается на файл этого фото"""
+        if photo.content_hash:
+            return db.query(ProductPhoto).filter(ProductPhoto.content_hash == photo.content_hash).count()
+        return db.query(ProductPhoto).filter(ProductPhoto.file_path == photo.file_path).count()
+    
     @classmethod
     def is_valid_file(cls, file: UploadFile) -> bool:
         """Проверяет, подходит ли файл для загрузки"""
@@ -33,15 +129,19 @@ class ProductPhotoService:
         if ext not in cls.ALLOWED_EXTENSIONS:
             return False
         
-        # Проверяем MIME-тип
-        if not file.content_type or not file.content_type.startswith('image/'):
-            return False
-        
+        # MIME-тип из запроса не проверяем: его задаёт клиент,
+        # настоящий формат определяется по содержимому в stream_upload
         return True
     
     @classmethod
-    async def save_photo(cls, file: UploadFile, product_id: int, db: Session, is_main: bool = False, sort_order: int = 0) -> ProductPhoto:
-        """Сохраняет загруженное фото"""
+    async def save_photo(cls, file: UploadFile, product_id: int, db: Session, is_main: bool = False, sort_order: int = 0,
+                         background_tasks: Optional[BackgroundTasks] = None) -> ProductPhoto:
+        """Сохраняет загруженное фото.
+        
+        Исходный файл сохраняется сразу, варианты (thumb/card/full) создаются
+        в фоне пулом процессов: после ответа, если передан background_tasks,
+        иначе отдельной задачей event loop.
+        """
         cls.ensure_upload_dir()
         
         if not cls.is_valid_file(file):
@@ -58,40 +158,29 @@ class ProductPhotoService:
                 detail=f"Максимальное количество фото для товара: {cls.MAX_PHOTOS_PER_PRODUCT}"
             )
         
-        # Генерируем уникальное имя файла
-        ext = Path(file.filename).suffix.lower()
-        filename = f"{uuid.uuid4()}{ext}"
-        file_path = cls.UPLOAD_DIR / filename
-        
-        # Сохраняем файл
-        content = await file.read()
-        if len(content) > cls.MAX_FILE_SIZE:
+        # Одновременные загрузки ограничены: каждая занимает диск, CPU на хэш и проверку
+        if cls._active_uploads >= cls.MAX_CONCURRENT_UPLOADS:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Файл слишком большой"
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много одновременных загрузок, повторите позже"
             )
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Сжимаем изображение
+        cls._active_uploads += 1
         try:
-            with Image.open(file_path) as img:
-                # Конвертируем в RGB если нужно
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Сжимаем если изображение слишком большое
-                if img.width > 1920 or img.height > 1080:
-                    img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
-                    img.save(file_path, quality=85, optimize=True)
-        except Exception as e:
-            # Если не удалось обработать изображение, удаляем файл
-            os.remove(file_path)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Ошибка обработки изображения: {str(e)}"
-            )
+            temp_path, file_size, digest, ext, mime_type = await cls.stream_upload(file)
+            
+            # Имя файла - хэш содержимого: повторная загрузка того же фото
+            # (в том числе для другого товара) использует уже сохранённый файл
+            file_path = cls.blob_path(digest, ext)
+            filename = file_path.name
+            try:
+                await anyio.to_thread.run_sync(cls.store_blob, temp_path, file_path)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Ошибка обработки изображения: {str(e)}"
+                )
+        finally:
+            cls._active_uploads -= 1
         
         # Создаём запись в БД
         photo_data = ProductPhotoCreate(
@@ -99,17 +188,50 @@ class ProductPhotoService:
             filename=filename,
             original_filename=file.filename,
             file_path=str(file_path).replace('\\', '/'),  # Нормализуем путь для веб
-            file_size=len(content),
-            mime_type=file.content_type,
+            file_size=file_size,
+            mime_type=mime_type,
+            content_hash=digest,
             is_main=is_main,
             sort_order=sort_order
         )
         
         photo = ProductPhoto(**photo_data.dict())
+        
+        # Варианты того же содержимого уже готовы - переиспользуем их файлы
+        donor = db.query(ProductPhoto).options(selectinload(ProductPhoto.variants)).filter(
+            ProductPhoto.content_hash == digest,
+            ProductPhoto.processing_status == "ready"
+        ).first()
+        if donor and donor.variants:
+            photo.variants = [
+                ProductPhotoVariant(
+                    size=variant.size,
+                    format=variant.format,
+                    width=variant.width,
+                    height=variant.height,
+                    file_path=variant.file_path,
+                    file_size=variant.file_size
+                )
+                for variant in donor.variants
+            ]
+            photo.processing_status = "ready"
+        else:
+            photo.processing_status = "pending"
+        
         db.add(photo)
         db.commit()
         db.refresh(photo)
         
+        if photo.processing_status == "ready":
+            return photo
+        
+        # Варианты пишутся в отдельной сессии к той же БД
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        if background_tasks is not None:
+            background_tasks.add_task(image_pipeline.process, photo.id, photo.file_path, session_factory)
+        else:
+            image_pipeline.submit(photo.id, photo.file_path, session_factory)
+        
         return photo
     
     @staticmethod
@@ -127,23 +249,23 @@ class ProductPhotoService:
             ProductPhoto.is_main == True
         ).first()
     
-    @staticmethod
-    def delete_photo(db: Session, photo_id: int) -> bool:
+    @classmethod
+    def delete_photo(cls, db: Session, photo_id: int) -> bool:
         """Удаляет фото товара"""
         photo = db.query(ProductPhoto).filter(ProductPhoto.id == photo_id).first()
         if not photo:
             return False
         
-        # Удаляем файл
-        try:
-            if os.path.exists(photo.file_path):
-                os.remove(photo.file_path)
-        except OSError:
-            pass  # Игнорируем ошибки удаления файла
+        # Файл и варианты общие для всех фото с тем же содержимым - удаляем вместе с последним
+        if cls.count_references(db, photo) <= 1:
+            remove_files([photo.file_path] + [variant.file_path for variant in photo.variants])
         
         # Удаляем запись из БД
         db.delete(photo)
         db.commit()
+        
+        # Уменьшенные копии из /media больше не отдаются, даже если id достанется новому фото
+        resized_images.purge_photo(photo_id)
         return True
     
     @staticmethod
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, exc
-from typing import List, Optional
-from ..models import Product, Supply, Order, OrderStatus
+from typing import Dict, Iterable, List, Optional
+from ..models import Product, ProductPhoto, Supply, Order, OrderStatus
 from ..schemas.product import ProductCreate, ProductUpdate
 from ..schemas.supply import SupplyCreate
 from fastapi import HTTPException, status
@@ -90,6 +90,14 @@ class ProductService:
         }
 
 
+def issued_quantities(db: Session, product_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """Выданное по заказам количество для всех (или перечисленных) товаров одним запросом"""
+    query = db.query(Order.product_id, func.sum(Order.qty)).filter(Order.status == OrderStatus.PAID_ISSUED)
+    if product_ids is not None:
+        query = query.filter(Order.product_id.in_(list(product_ids)))
+    return dict(query.group_by(Order.product_id).all())
+
+
 def calculate_stock(product: Product, db: Session) -> int:
     """Вычислить текущий остаток товара"""
     # Получаем количество выданных заказов
@@ -112,12 +120,16 @@ def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
     """Получить список товаров с вычисленными остатками и статусом"""
     from sqlalchemy.orm import joinedload
     
-    # Получаем товары из базы данных БЕЗ ИЗМЕНЕНИЙ
-    products = db.query(Product).options(joinedload(Product.photos)).offset(skip).limit(limit).all()
+    # Получаем товары из базы данных БЕЗ ИЗМЕНЕНИЙ (варианты фото - одним запросом на все товары)
+    products = db.query(Product).options(
+        joinedload(Product.photos).selectinload(ProductPhoto.variants)
+    ).offset(skip).limit(limit).all()
     
     # Вычисляем остатки для каждого товара, НЕ ТРОГАЯ availability_status
+    # (выданное количество - одним запросом на все товары страницы)
+    issued = issued_quantities(db, [product.id for product in products])
     for product in products:
-        stock = calculate_stock(product, db)
+        stock = max(0, product.quantity - issued.get(product.id, 0))
         product.stock = stock
         product.is_low_stock = is_low_stock(product, stock)
         
@@ -130,7 +142,9 @@ def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
 def get_product(db: Session, product_id: int) -> Optional[Product]:
     """Получить товар по ID с вычисленным остатком"""
     from sqlalchemy.orm import joinedload
-    product = db.query(Product).options(joinedload(Product.photos)).filter(Product.id == product_id).first()
+    product = db.query(Product).options(
+        joinedload(Product.photos).selectinload(ProductPhoto.variants)
+    ).filter(Product.id == product_id).first()
     if product:
         stock = calculate_stock(product, db)
         product.stock = stock
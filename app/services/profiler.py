@@ -0,0 +1,241 @@
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from starlette.routing import compile_path
+
+
+PROFILER_MODES = ("cprofile", "sampling")
+MAX_SESSIONS = 10  # Сколько последних сессий (с результатами) хранится
+MAX_REQUESTS = 100  # Больше запросов за одну сессию не профилируем
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+# Кадры простаивающих потоков (ждут задач или событий) в стеки не попадают
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"), ("queue.py", "get"),
+}
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Стек в формате collapsed (flamegraph.pl, speedscope): функции от корня к листу через ';'"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Поток, снимающий стеки всех потоков процесса раз в interval секунд"""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES:
+                    continue
+                self.stacks[collapse_stack(frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfileSession:
+    """Профилирование следующих count запросов, подходящих под маршрут"""
+
+    def __init__(self, session_id: int, route: str, count: int, mode: str,
+                 method: Optional[str] = None, interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.id = session_id
+        self.route = route
+        self.method = method.upper() if method else None
+        self.mode = mode
+        self.interval = interval
+        self.count = count
+        self.remaining = count
+        self.in_flight = 0
+        self.cancelled = False
+        self.pattern = compile_path(route)[0]
+        self.created_at = datetime.now()
+        self.requests: List[Dict[str, Any]] = []
+        self.stats: Optional[pstats.Stats] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    @property
+    def done(self) -> bool:
+        return (self.remaining == 0 or self.cancelled) and self.in_flight == 0
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method and method != self.method:
+            return False
+        return self.pattern.match(path) is not None
+
+    def add_profile(self, profile: cProfile.Profile):
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+
+    def add_stacks(self, sampler: StackSampler):
+        self.stacks.update(sampler.stacks)
+        self.samples += sampler.samples
+
+    def pstats_bytes(self) -> bytes:
+        """Результат в формате pstats (как Stats.dump_stats): открывается pstats, snakeviz, gprof2dot"""
+        return marshal.dumps(self.stats.stats)
+
+    def report(self, limit: int = 50) -> str:
+        """Текстовый отчёт pstats: самые дорогие функции по накопленному времени"""
+        output = io.StringIO()
+        report = pstats.Stats(stream=output)
+        report.add(self.stats)
+        report.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "route": self.route,
+            "method": self.method,
+            "mode": self.mode,
+            "count": self.count,
+            "profiled": len(self.requests),
+            "remaining": self.remaining,
+            "status": "cancelled" if self.cancelled and self.in_flight == 0 else ("done" if self.done else "armed"),
+            "created_at": self.created_at.isoformat(),
+            "requests": self.requests,
+            "samples": self.samples,
+            "has_result": self.stats is not None or bool(self.stacks),
+        }
+
+
+class RequestProfiler:
+    """Профилировщик живых запросов по требованию администратора.
+
+    Пока ни одна сессия не ждёт запросов, middleware проверяет только флаг armed.
+    В режиме cprofile одновременно профилируется один запрос (профиль снимается
+    с потока event loop, поэтому в него попадают и параллельные корутины);
+    режим sampling снимает стеки всех потоков, включая пул для синхронного кода.
+    """
+
+    def __init__(self):
+        self.sessions: "OrderedDict[int, ProfileSession]" = OrderedDict()
+        self.armed = False
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._cprofile_busy = False
+
+    def _update_armed(self):
+        self.armed = any(s.remaining > 0 and not s.cancelled for s in self.sessions.values())
+
+    def arm(self, route: str, count: int, mode: str = "cprofile", method: Optional[str] = None,
+            interval: float = DEFAULT_SAMPLING_INTERVAL) -> ProfileSession:
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        if not 1 <= count <= MAX_REQUESTS:
+            raise ValueError(f"Число запросов должно быть от 1 до {MAX_REQUESTS}")
+        if not route.startswith("/"):
+            raise ValueError("Маршрут должен начинаться с /")
+        with self._lock:
+            session = ProfileSession(next(self._ids), route, count, mode, method, interval)
+            self.sessions[session.id] = session
+            while len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+            self._update_armed()
+        return session
+
+    def cancel(self, session_id: int) -> Optional[ProfileSession]:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.cancelled = True
+                self._update_armed()
+        return session
+
+    def get(self, session_id: int) -> Optional[ProfileSession]:
+        return self.sessions.get(session_id)
+
+    def claim(self, method: str, path: str) -> Optional[ProfileSession]:
+        """Сессия, которая заберёт этот запрос (с уменьшением счётчика), или None"""
+        with self._lock:
+            for session in self.sessions.values():
+                if session.remaining <= 0 or session.cancelled or not session.matches(method, path):
+                    continue
+                if session.mode == "cprofile":
+                    if self._cprofile_busy:
+                        continue
+                    self._cprofile_busy = True
+                session.remaining -= 1
+                session.in_flight += 1
+                self._update_armed()
+                return session
+        return None
+
+    async def run(self, session: ProfileSession, app, scope, receive, send):
+        """Выполняет запрос под профилировщиком сессии"""
+        started = time.perf_counter()
+        profile = sampler = None
+        try:
+            if session.mode == "cprofile":
+                profile = cProfile.Profile()
+                profile.enable()
+            else:
+                sampler = StackSampler(session.interval)
+                sampler.start()
+            await app(scope, receive, send)
+        finally:
+            if profile is not None:
+                profile.disable()
+            if sampler is not None:
+                sampler.stop()
+            with self._lock:
+                if profile is not None:
+                    session.add_profile(profile)
+                    self._cprofile_busy = False
+                if sampler is not None:
+                    session.add_stacks(sampler)
+                session.requests.append({
+                    "method": scope.get("method", ""),
+                    "path": scope.get("path", ""),
+                    "duration": round(time.perf_counter() - started, 5),
+                })
+                session.in_flight -= 1
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [session.to_dict() for session in reversed(self.sessions.values())]
+
+
+# Глобальный профилировщик (управляется из /admin/profiler)
+request_profiler = RequestProfiler()
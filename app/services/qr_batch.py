@@ -0,0 +1,144 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from ..models import Order, OrderStatus, Product, ShopOrder, ShopOrderStatus
+from ..services.logger import logger
+from ..services.qr_service import QRService
+
+
+# Статусы, из которых заказ можно выдать, и статус после выдачи
+ISSUABLE_ORDER_STATUSES = {OrderStatus.PAID_NOT_ISSUED}
+ISSUABLE_SHOP_ORDER_STATUSES = {ShopOrderStatus.PAID, ShopOrderStatus.READY_FOR_PICKUP}
+
+
+class QRBatchService:
+    """Пакетная обработка сканов: все токены разрешаются одним запросом,
+    выдача всей пачки - одной транзакцией"""
+    
+    @staticmethod
+    def extract_token(payload: str) -> str:
+        """Токен из содержимого QR: /o/<token>, полный URL или сам токен"""
+        payload = payload.strip()
+        marker = payload.rfind("/o/")
+        if marker != -1:
+            payload = payload[marker + 3:]
+        return payload.split("?", 1)[0].rstrip("/")
+    
+    @staticmethod
+    def _is_issued(order) -> bool:
+        if isinstance(order, ShopOrder):
+            return order.status == ShopOrderStatus.COMPLETED
+        return order.status == OrderStatus.PAID_ISSUED
+    
+    @staticmethod
+    def issued_status(order):
+        return ShopOrderStatus.COMPLETED if isinstance(order, ShopOrder) else OrderStatus.PAID_ISSUED
+    
+    @staticmethod
+    def _is_cancelled(order) -> bool:
+        if isinstance(order, ShopOrder):
+            return order.status in (ShopOrderStatus.CANCELLED, ShopOrderStatus.EXPIRED)
+        return order.status == OrderStatus.PAID_DENIED
+    
+    @staticmethod
+    def _can_issue(order) -> bool:
+        if isinstance(order, ShopOrder):
+            return order.status in ISSUABLE_SHOP_ORDER_STATUSES
+        return order.status in ISSUABLE_ORDER_STATUSES
+    
+    @staticmethod
+    def describe(order) -> Dict:
+        is_shop = isinstance(order, ShopOrder)
+        return {
+            "order_id": order.id,
+            "order_type": "shop_order" if is_shop else "order",
+            "order_code": order.order_code,
+            "customer_name": order.customer_name,
+            "product_name": order.product_name,
+            "qty": order.quantity if is_shop else order.qty,
+            "order_status": order.status.value if hasattr(order.status, "value") else order.status,
+            "redirect_url": f"/shop/admin/orders/{order.id}" if is_shop else f"/orders/{order.id}",
+        }
+    
+    @classmethod
+    def classify(cls, order, issue: bool) -> str:
+        """Результат скана найденного заказа: cancelled, already_issued, found, issued или not_issuable"""
+        if cls._is_cancelled(order):
+            return "cancelled"
+        if cls._is_issued(order):
+            return "already_issued"
+        if not issue:
+            return "found"
+        return "issued" if cls._can_issue(order) else "not_issuable"
+    
+    @classmethod
+    def mark_issued(cls, order, now: datetime):
+        """Переводит заказ в «выдан» (без commit и без списания остатков)"""
+        order.status = cls.issued_status(order)
+        if isinstance(order, ShopOrder):
+            order.completed_at = now
+        else:
+            order.issued_at = now
+    
+    @staticmethod
+    def decrement_stock(db: Session, orders: List):
+        """Списывает остатки за выданные заказы как update_order_status:
+        только для заказов из магазина, все товары - одним запросом"""
+        stock = Counter()
+        for order in orders:
+            if isinstance(order, Order) and order.source == "shop":
+                stock[order.product_id] += order.qty
+        if stock:
+            for product in db.query(Product).filter(Product.id.in_(list(stock))):
+                product.quantity = max(0, product.quantity - stock[product.id])
+    
+    @classmethod
+    def scan(cls, db: Session, payloads: List[str], issue: bool = False, user_id: Optional[str] = None) -> Dict:
+        """Разрешает пачку сканов; при issue=True выдаёт найденные заказы одной транзакцией.
+        
+        Результат по каждому скану в исходном порядке: found, issued,
+        already_issued, not_issuable, cancelled, duplicate, not_found, invalid.
+        """
+        tokens = [cls.extract_token(payload) for payload in payloads]
+        valid = {token for token in tokens if QRService.is_valid_qr_token(token)}
+        entities = QRService.resolve_tokens(db, valid)
+        
+        results = []
+        to_issue = []
+        seen = set()
+        for payload, token in zip(payloads, tokens):
+            result = {"payload": payload, "token": token if token in valid else None}
+            order = entities.get(token)
+            if token not in valid:
+                result["result"] = "invalid"
+            elif order is None:
+                result["result"] = "not_found"
+            elif token in seen:
+                result["result"] = "duplicate"
+            else:
+                result["result"] = cls.classify(order, issue)
+                if result["result"] == "issued":
+                    to_issue.append(order)
+            if order is not None:
+                result.update(cls.describe(order))
+                if result["result"] == "issued":
+                    result["order_status"] = cls.issued_status(order).value
+            if token in valid:
+                seen.add(token)
+            results.append(result)
+        
+        if to_issue:
+            try:
+                now = datetime.now(timezone.utc)
+                for order in to_issue:
+                    cls.mark_issued(order, now)
+                cls.decrement_stock(db, to_issue)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            logger.info(f"Пакетная выдача по QR: {len(to_issue)} заказов, пользователь {user_id}")
+        
+        summary = Counter(result["result"] for result in results)
+        return {"results": results, "summary": dict(summary), "issued": len(to_issue)}
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import zlib
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from ..services.qr_render import qr_bitmap
+
+
+# Лист A4 при 200 dpi, сетка 3 x 8 (этикетки около 65 x 35 мм)
+DPI = 200
+PAGE_SIZE = (1654, 2339)
+PAGE_MARGIN = 60
+COLUMNS = 3
+ROWS = 8
+LABELS_PER_PAGE = COLUMNS * ROWS
+
+# A4 в пунктах PDF
+PDF_PAGE_SIZE = (595.28, 841.89)
+
+# Шрифты с кириллицей; встроенный шрифт Pillow кириллицу не содержит
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+)
+
+
+@lru_cache(maxsize=8)
+def load_font(size: int, font_path: Optional[str] = None):
+    for path in ((font_path,) if font_path else ()) + FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+def fit_text(draw: ImageDraw.ImageDraw, text: str, font, width: int) -> str:
+    """Обрезает строку по ширине с многоточием"""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def draw_qr(img: Image.Image, data: str, box: Tuple[int, int, int]):
+    """Рисует QR в квадрат (x, y, сторона) целым числом пикселей на модуль"""
+    x, y, side = box
+    qr = qr_bitmap(data, side)
+    offset = (side - qr.width) // 2
+    img.paste(qr, (x + offset, y + offset))
+
+
+def render_label_page(labels: List[Dict], font_path: Optional[str] = None) -> bytes:
+    """Растр одной страницы этикеток: 1 бит на пиксель, сжатый zlib (готовый поток PDF).
+
+    Выполняется в процессе пула, поэтому принимает и возвращает простые типы.
+    """
+    page = Image.new("1", PAGE_SIZE, 1)
+    draw = ImageDraw.Draw(page)
+    code_font = load_font(44, font_path)
+    text_font = load_font(26, font_path)
+
+    label_width = (PAGE_SIZE[0] - 2 * PAGE_MARGIN) // COLUMNS
+    label_height = (PAGE_SIZE[1] - 2 * PAGE_MARGIN) // ROWS
+    padding = 14
+    qr_side = label_height - 2 * padding
+
+    for index, label in enumerate(labels[:LABELS_PER_PAGE]):
+        left = PAGE_MARGIN + (index % COLUMNS) * label_width
+        top = PAGE_MARGIN + (index // COLUMNS) * label_height
+        draw_qr(page, label["payload"], (left + padding, top + padding, qr_side))
+
+        text_left = left + padding + qr_side + 8
+        text_width = left + label_width - padding - text_left
+        y = top + padding + 6
+        draw.text((text_left, y), fit_text(draw, label["order_code"], code_font, text_width), font=code_font, fill=0)
+        y += 60
+        for line in (label.get("product_name") or "", label.get("details") or "", label.get("customer_name") or ""):
+            if line:
+                draw.text((text_left, y), fit_text(draw, line, text_font, text_width), font=text_font, fill=0)
+                y += 36
+
+    return zlib.compress(page.tobytes(), 6)
+
+
+class StreamingPdfWriter:
+    """Минимальный PDF из растровых страниц, который отдаётся по мере готовности страниц.
+
+    Объекты страниц пишутся сразу; дерево страниц, каталог и таблица xref -
+    в конце, когда известны все смещения.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets: Dict[int, int] = {}
+        self.page_ids: List[int] = []
+        self.next_id = 3
+
+    def _emit(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def _object(self, object_id: int, body: bytes) -> bytes:
+        self.offsets[object_id] = self.offset
+        return self._emit(f"{object_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def page(self, raster: bytes, width: int = PAGE_SIZE[0], height: int = PAGE_SIZE[1]) -> bytes:
+        page_id, contents_id, image_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        self.page_ids.append(page_id)
+        page_w, page_h = PDF_PAGE_SIZE
+
+        chunks = [self._object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode /Length {len(raster)} >>\nstream\n"
+        ).encode() + raster + b"\nendstream")]
+        content = f"q {page_w} 0 0 {page_h} 0 0 cm /Im0 Do Q".encode()
+        chunks.append(self._object(contents_id, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream"))
+        chunks.append(self._object(page_id, (
+            f"<< /Type /Page /Parent {self.PAGES_ID} 0 R /MediaBox [0 0 {page_w} {page_h}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {contents_id} 0 R >>"
+        ).encode()))
+        return b"".join(chunks)
+
+    def finish(self) -> bytes:
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        chunks = [
+            self._object(self.PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode()),
+            self._object(self.CATALOG_ID, f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>".encode()),
+        ]
+        xref_offset = self.offset
+        size = self.next_id
+        xref = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, size):
+            xref.append(f"{self.offsets[object_id]:010d} 00000 n \n")
+        xref.append(f"trailer\n<< /Size {size} /Root {self.CATALOG_ID} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        chunks.append(self._emit("".join(xref).encode()))
+        return b"".join(chunks)
+
+
+async def stream_label_sheet(labels: List[Dict], executor: Executor, font_path: Optional[str] = None,
+                             max_pending: int = 4) -> AsyncIterator[bytes]:
+    """Рендерит страницы в пуле процессов и отдаёт PDF по частям в исходном порядке.
+
+    Одновременно в работе не больше max_pending страниц - память не растёт
+    с числом этикеток.
+    """
+    loop = asyncio.get_running_loop()
+    pages = [labels[i:i + LABELS_PER_PAGE] for i in range(0, len(labels), LABELS_PER_PAGE)]
+    writer = StreamingPdfWriter()
+    yield writer.header()
+
+    pending = []
+    next_page = 0
+    try:
+        while next_page < len(pages) or pending:
+            while next_page < len(pages) and len(pending) < max_pending:
+                pending.append(loop.run_in_executor(executor, render_label_page, pages[next_page], font_path))
+                next_page += 1
+            raster = await pending.pop(0)
+            yield writer.page(raster)
+    finally:
+        for future in pending:
+            future.cancel()
+    yield writer.finish()
@@ -0,0 +1,65 @@
+"""
+Растр и векторное изображение QR-кодов.
+
+Без импортов приложения: этикетки qr_labels рисуются в spawn-процессах пула.
+"""
+import io
+from typing import List
+import qrcode
+from PIL import Image
+
+
+# Размер PNG QR-кода заказа (пиксели)
+QR_SIZE = 512
+
+
+def qr_matrix(data: str) -> List[List[bool]]:
+    """Матрица модулей QR-кода (с белой рамкой)"""
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def qr_bitmap(data: str, side: int) -> Image.Image:
+    """Чёрно-белый QR не больше side пикселей: целое число пикселей на модуль, без сглаживания"""
+    matrix = qr_matrix(data)
+    modules = len(matrix)
+    img = Image.new("1", (modules, modules), 1)
+    img.putdata([0 if cell else 1 for row in matrix for cell in row])
+    scale = max(1, side // modules)
+    return img.resize((modules * scale, modules * scale), Image.Resampling.NEAREST)
+
+
+def render_qr_png(data: str, size: int = QR_SIZE) -> bytes:
+    """PNG около size пикселей"""
+    buffer = io.BytesIO()
+    qr_bitmap(data, size).save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def render_qr_svg(data: str) -> bytes:
+    """Компактный SVG: один path, тёмные модули строки объединены в полосы"""
+    matrix = qr_matrix(data)
+    modules = len(matrix)
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < modules:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < modules and row[x]:
+                x += 1
+            parts.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {modules} {modules}" '
+        f'shape-rendering="crispEdges"><rect width="100%" height="100%" fill="#fff"/>'
+        f'<path d="{"".join(parts)}"/></svg>'
+    )
+    return svg.encode()
@@ -1,12 +1,65 @@
-import qrcode
 import secrets
 import string
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from ..models import ShopOrder, Order
+from ..models import ShopOrder, Order, QRToken
+from . import qr_render
 import os
-from pathlib import Path
+
+
+class QRImageCache:
+    """LRU-кэш готовых изображений QR в памяти: (токен, формат) -> байты"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key: Tuple[str, str], data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == token]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": sum(len(data) for data in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0,
+        }
+
+
+# Глобальный кэш изображений QR
+qr_image_cache = QRImageCache()
 
 
 class QRService:
@@ -19,11 +72,14 @@ class QRService:
     TOKEN_ALPHABET = string.ascii_letters + string.digits
     
     # Размер QR-кода
-    QR_SIZE = 512
+    QR_SIZE = qr_render.QR_SIZE
     
-    # Папка для хранения QR-изображений
+    # Папка, куда раньше сохранялись PNG (файлы старых заказов ещё могут там лежать)
     QR_STORAGE_PATH = "app/static/qr"
     
+    # Форматы изображений QR: формат -> MIME-тип
+    IMAGE_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+    
     @classmethod
     def generate_token(cls) -> str:
         """Генерирует уникальный токен для QR-кода"""
@@ -36,47 +92,40 @@ class QRService:
         return f"/o/{order.qr_payload}"
     
     @classmethod
-    def ensure_qr_storage_directory(cls) -> None:
-        """Создает папку для хранения QR-изображений если её нет"""
-        Path(cls.QR_STORAGE_PATH).mkdir(parents=True, exist_ok=True)
+    def qr_matrix(cls, data: str) -> List[List[bool]]:
+        """Матрица модулей QR-кода (с белой рамкой)"""
+        return qr_render.qr_matrix(data)
     
     @classmethod
-    def generate_qr_image(cls, order) -> str:
-        """Генерирует QR-изображение и возвращает путь к файлу"""
-        if not order.qr_payload:
-            raise ValueError("Order must have qr_payload before generating QR image")
-        
-        # Создаем папку если её нет
-        cls.ensure_qr_storage_path()
-        
-        # Генерируем QR-код
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        
-        # Добавляем данные
-        qr_data = cls.generate_qr_payload(order)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        # Создаем изображение
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Сохраняем файл
-        filename = f"{order.id}.png"
-        file_path = os.path.join(cls.QR_STORAGE_PATH, filename)
-        img.save(file_path)
+    def render_qr_png(cls, data: str) -> bytes:
+        """PNG около QR_SIZE пикселей: чёрно-белая матрица, увеличенная без сглаживания"""
+        return qr_render.render_qr_png(data, cls.QR_SIZE)
+    
+    @classmethod
+    def render_qr_svg(cls, data: str) -> bytes:
+        """Компактный SVG: один path, тёмные модули строки объединены в полосы"""
+        return qr_render.render_qr_svg(data)
+    
+    @classmethod
+    def get_qr_image(cls, token: str, fmt: str = "png", db: Optional[Session] = None) -> Optional[bytes]:
+        """Изображение QR для токена из кэша; при промахе рендерится в памяти.
         
-        # Возвращаем относительный путь для веб-доступа
-        return f"qr/{filename}"
+        Если передан db, при промахе токен проверяется по заказам (None - заказа нет).
+        """
+        data = qr_image_cache.get((token, fmt))
+        if data is None:
+            data = cls.render_qr_image(token, fmt, db)
+        return data
     
     @classmethod
-    def ensure_qr_storage_path(cls) -> None:
-        """Создает папку для хранения QR-изображений если её нет"""
-        Path(cls.QR_STORAGE_PATH).mkdir(parents=True, exist_ok=True)
+    def render_qr_image(cls, token: str, fmt: str = "png", db: Optional[Session] = None) -> Optional[bytes]:
+        """Рендерит изображение QR и кладёт его в кэш (вызывается после промаха кэша)"""
+        if db is not None and cls.get_order_by_qr_token(db, token) is None:
+            return None
+        payload = f"/o/{token}"
+        data = cls.render_qr_svg(payload) if fmt == "svg" else cls.render_qr_png(payload)
+        qr_image_cache.set((token, fmt), data)
+        return data
     
     @classmethod
     def generate_qr_for_order(cls, db: Session, order) -> bool:
@@ -86,13 +135,8 @@ class QRService:
             if order.has_qr:
                 return True
             
-            # Генерируем токен
-            if not order.qr_payload:
-                order.qr_payload = cls.generate_token()
-            
-            # Генерируем изображение
-            order.qr_image_path = cls.generate_qr_image(order)
-            order.qr_generated_at = datetime.now(timezone.utc)
+            # Генерируем токен; изображение рендерится по запросу (get_qr_image)
+            cls.issue_token(db, order)
             
             # Сохраняем в БД
             db.commit()
@@ -105,16 +149,36 @@ class QRService:
             print(f"Error generating QR for order {order.id}: {e}")
             return False
     
+    @classmethod
+    def entity_type_of(cls, order) -> str:
+        """Тип заказа для индекса токенов"""
+        return QRToken.ENTITY_SHOP_ORDER if isinstance(order, ShopOrder) else QRToken.ENTITY_ORDER
+    
+    @classmethod
+    def issue_token(cls, db: Session, order, now: Optional[datetime] = None) -> str:
+        """Выдаёт заказу новый токен и записывает его в индекс qr_tokens (без commit)"""
+        token = cls.generate_token()
+        order.qr_payload = token
+        order.qr_generated_at = now or datetime.now(timezone.utc)
+        if order.id is None:
+            db.flush([order])
+        db.add(QRToken(token=token, entity_type=cls.entity_type_of(order), entity_id=order.id))
+        return token
+    
     @classmethod
     def get_order_by_qr_token(cls, db: Session, token: str) -> Optional[Order]:
-        """Получает заказ по QR-токену"""
-        # Сначала ищем в основной таблице Order
-        order = db.query(Order).filter(Order.qr_payload == token).first()
-        if order:
-            return order
-        
-        # Если не найден, ищем в ShopOrder (для совместимости)
-        return db.query(ShopOrder).filter(ShopOrder.qr_payload == token).first()
+        """Получает заказ по QR-токену одним запросом к индексу qr_tokens"""
+        entry = db.query(QRToken).filter(QRToken.token == token, QRToken.revoked.is_(False)).first()
+        return entry.entity if entry else None
+    
+    @classmethod
+    def resolve_tokens(cls, db: Session, tokens) -> Dict[str, object]:
+        """Пачка токенов -> заказы одним запросом (отозванные и неизвестные пропускаются)"""
+        tokens = list(tokens)
+        if not tokens:
+            return {}
+        entries = db.query(QRToken).filter(QRToken.token.in_(tokens), QRToken.revoked.is_(False)).all()
+        return {entry.token: entry.entity for entry in entries if entry.entity is not None}
     
     @classmethod
     def is_valid_qr_token(cls, token: str) -> bool:
@@ -129,7 +193,14 @@ class QRService:
     def revoke_qr_token(cls, db: Session, order) -> bool:
         """Отзывает QR-токен заказа (при отмене)"""
         try:
-            # Удаляем файл изображения если он есть
+            if order.qr_payload:
+                qr_image_cache.invalidate_token(order.qr_payload)
+                db.query(QRToken).filter(QRToken.token == order.qr_payload).update(
+                    {QRToken.revoked: True, QRToken.revoked_at: datetime.now(timezone.utc)},
+                    synchronize_session=False
+                )
+            
+            # Удаляем файл изображения старого формата, если он есть
             if order.qr_image_path:
                 file_path = os.path.join("app/static", order.qr_image_path)
                 if os.path.exists(file_path):
@@ -151,12 +222,12 @@ class QRService:
             return False
     
     @classmethod
-    def get_qr_image_url(cls, order) -> Optional[str]:
-        """Возвращает URL для доступа к QR-изображению"""
-        if not order.qr_image_path:
+    def get_qr_image_url(cls, order, fmt: str = "png") -> Optional[str]:
+        """Возвращает URL для доступа к QR-изображению (png или svg)"""
+        if not order.qr_payload:
             return None
         
-        return f"/static/{order.qr_image_path}"
+        return f"/qr/{order.qr_payload}.{fmt}"
     
     @classmethod
     def get_qr_public_url(cls, order) -> Optional[str]:
@@ -0,0 +1,156 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models import Order, QRScanEvent, QRToken, ShopOrder
+from ..services.logger import logger
+from ..services.qr_batch import ISSUABLE_ORDER_STATUSES, ISSUABLE_SHOP_ORDER_STATUSES, QRBatchService
+from ..services.qr_service import QRService
+
+
+# Результаты, при которых событие считается применённым; остальные - конфликты
+APPLIED_RESULTS = {"found", "issued"}
+
+
+def as_utc(value: datetime) -> datetime:
+    """Время устройства без зоны считается UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class QRSyncService:
+    """Синхронизация офлайн-очереди сканера.
+
+    События идемпотентны по client_id, применяются в порядке времени
+    сканирования на устройстве; всё, что нельзя применить (заказ уже выдан
+    другим сканером, отменён, не найден), возвращается как конфликт.
+    """
+    
+    @staticmethod
+    def _stored_result(event: QRScanEvent) -> Dict:
+        return {
+            "client_id": event.client_id,
+            "status": "duplicate",
+            "result": event.result,
+            "order_type": event.entity_type,
+            "order_id": event.entity_id,
+        }
+    
+    @classmethod
+    def sync(cls, db: Session, events: List, device_id: Optional[str] = None,
+             user_id: Optional[str] = None) -> Dict:
+        """Применяет очередь событий одной транзакцией"""
+        try:
+            return cls._sync(db, events, device_id, user_id)
+        except IntegrityError:
+            # Та же очередь пришла параллельно (повтор после таймаута):
+            # второй проход увидит уже сохранённые события как дубликаты
+            db.rollback()
+            return cls._sync(db, events, device_id, user_id)
+    
+    @classmethod
+    def _sync(cls, db: Session, events: List, device_id: Optional[str], user_id: Optional[str]) -> Dict:
+        client_ids = {event.client_id for event in events}
+        stored = {}
+        if client_ids:
+            stored = {
+                row.client_id: row
+                for row in db.query(QRScanEvent).filter(QRScanEvent.client_id.in_(client_ids))
+            }
+        
+        tokens = [QRBatchService.extract_token(event.payload) for event in events]
+        valid = {token for token in tokens if QRService.is_valid_qr_token(token)}
+        entities = QRService.resolve_tokens(db, valid)
+        
+        now = datetime.now(timezone.utc)
+        results: List[Optional[Dict]] = [None] * len(events)
+        accepted: Dict[str, Dict] = {}
+        issued = []
+        order_by_time = sorted(range(len(events)), key=lambda i: (as_utc(events[i].scanned_at), i))
+        for index in order_by_time:
+            event, token = events[index], tokens[index]
+            if event.client_id in stored:
+                results[index] = cls._stored_result(stored[event.client_id])
+                continue
+            if event.client_id in accepted:
+                results[index] = {**accepted[event.client_id], "status": "duplicate"}
+                continue
+            
+            order = entities.get(token)
+            if token not in valid:
+                outcome = "invalid"
+            elif order is None:
+                outcome = "not_found"
+            else:
+                outcome = QRBatchService.classify(order, event.action == "issue")
+            
+            result = {"client_id": event.client_id, "result": outcome,
+                      "status": "applied" if outcome in APPLIED_RESULTS else "conflict"}
+            if order is not None:
+                result.update(QRBatchService.describe(order))
+                if outcome == "already_issued":
+                    issued_at = order.completed_at if isinstance(order, ShopOrder) else order.issued_at
+                    result["issued_at"] = issued_at.isoformat() if issued_at else None
+            if outcome == "issued":
+                # Статус меняется сразу - следующие события очереди видят заказ выданным
+                QRBatchService.mark_issued(order, now)
+                result["order_status"] = QRBatchService.issued_status(order).value
+                issued.append(order)
+            
+            db.add(QRScanEvent(
+                client_id=event.client_id,
+                device_id=device_id,
+                user_id=user_id,
+                token=token if token in valid else None,
+                action=event.action,
+                scanned_at=as_utc(event.scanned_at),
+                status=result["status"],
+                result=outcome,
+                entity_type=result.get("order_type"),
+                entity_id=result.get("order_id"),
+            ))
+            accepted[event.client_id] = result
+            results[index] = result
+        
+        QRBatchService.decrement_stock(db, issued)
+        db.commit()
+        
+        conflicts = [result for result in results if result["status"] == "conflict"]
+        if issued or conflicts:
+            logger.info(f"Синхронизация сканера {device_id}: принято {len(accepted)}, "
+                        f"выдано {len(issued)}, конфликтов {len(conflicts)}")
+        return {
+            "results": results,
+            "applied": sum(1 for result in results if result["status"] == "applied"),
+            "duplicates": sum(1 for result in results if result["status"] == "duplicate"),
+            "conflicts": conflicts,
+            "server_time": now.isoformat(),
+        }
+    
+    @staticmethod
+    def build_manifest(db: Session) -> Dict:
+        """Манифест открытых заказов для офлайн-проверки: токен -> код заказа.
+        
+        Один запрос по qr_tokens с присоединёнными заказами обоих типов.
+        """
+        rows = (
+            db.query(QRToken.token, QRToken.entity_type, Order.order_code, ShopOrder.order_code)
+            .outerjoin(Order, and_(QRToken.entity_type == QRToken.ENTITY_ORDER, Order.id == QRToken.entity_id))
+            .outerjoin(ShopOrder, and_(QRToken.entity_type == QRToken.ENTITY_SHOP_ORDER, ShopOrder.id == QRToken.entity_id))
+            .filter(
+                QRToken.revoked.is_(False),
+                or_(Order.status.in_(ISSUABLE_ORDER_STATUSES), ShopOrder.status.in_(ISSUABLE_SHOP_ORDER_STATUSES)),
+            )
+            .order_by(QRToken.token)
+            .all()
+        )
+        orders = {token: order_code or shop_order_code or "" for token, _, order_code, shop_order_code in rows}
+        version = hashlib.sha256(json.dumps(orders, sort_keys=True).encode()).hexdigest()[:16]
+        return {
+            "version": version,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "count": len(orders),
+            "orders": orders,
+        }
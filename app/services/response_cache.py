@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..models import Product, ProductPhoto, ProductBatch
+from ..services.logger import logger
+
+
+@dataclass
+class CachedResponse:
+    """Готовый HTTP-ответ, сохранённый в кэше"""
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    expires_at: float
+    created_at: float
+
+
+class ResponseCache:
+    """In-memory кэш готовых ответов с LRU-вытеснением и защитой от stampede.
+
+    Записи читает event loop, а сбрасывают и потоки (коммиты синхронных эндпоинтов,
+    пул обработки фото), поэтому доступ к ним идёт под блокировкой.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Event] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Возвращает ответ из кэша, если он ещё не истёк"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, ttl: float):
+        """Сохраняет ответ в кэш на ttl секунд"""
+        now = time.monotonic()
+        entry = CachedResponse(
+            status=status,
+            headers=headers,
+            body=body,
+            expires_at=now + ttl,
+            created_at=now
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def begin_fill(self, key: str) -> Optional[asyncio.Event]:
+        """Регистрирует заполнение ключа.
+
+        Возвращает None, если текущий запрос стал «лидером» и должен сам
+        сформировать ответ, иначе событие, которого нужно дождаться.
+        """
+        waiter = self._inflight.get(key)
+        if waiter is not None:
+            return waiter
+        self._inflight[key] = asyncio.Event()
+        return None
+
+    def end_fill(self, key: str):
+        """Снимает блокировку заполнения и будит ожидающие запросы"""
+        waiter = self._inflight.pop(key, None)
+        if waiter is not None:
+            waiter.set()
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Удаляет записи, ключ которых начинается с prefix"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            logger.info(f"Кэш ответов: сброшено {len(keys)} записей ({prefix or '*'})")
+        return len(keys)
+
+    def clear(self):
+        """Полностью очищает кэш"""
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        """Статистика кэша"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0
+        }
+
+
+# Глобальный экземпляр кэша ответов
+response_cache = ResponseCache()
+
+# Модели, изменение которых влияет на страницы магазина
+CATALOG_MODELS = (Product, ProductPhoto, ProductBatch)
+
+# Префикс страниц, которые сбрасываются при изменении каталога
+CATALOG_CACHE_PREFIX = "/shop"
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_catalog_changes(session, flush_context):
+    """Помечает сессию, если в ней менялись товары"""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, CATALOG_MODELS):
+            session.info["response_cache_dirty"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    """Сбрасывает кэш страниц магазина после коммита изменений товаров"""
+    if session.info.pop("response_cache_dirty", False):
+        response_cache.invalidate(CATALOG_CACHE_PREFIX)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_after_rollback(session):
+    """Изменения откатились - сбрасывать кэш не нужно"""
+    session.info.pop("response_cache_dirty", None)
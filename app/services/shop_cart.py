@@ -1,5 +1,5 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 from decimal import Decimal
 from app.models import ShopCart, Product, ProductPhoto
@@ -94,24 +94,31 @@ class ShopCartService:
     def get_cart_items(db: Session, session_id: str) -> List[ShopCartItemResponse]:
         """Получает все товары в корзине с расширенной информацией"""
         
-        cart_items = db.query(ShopCart).filter(
+        # Товары - в том же запросе, главные фото - одним запросом на всю корзину
+        cart_items = db.query(ShopCart).options(joinedload(ShopCart.product)).filter(
             ShopCart.session_id == session_id
         ).all()
         
+        main_photos = {}
+        product_ids = {cart_item.product_id for cart_item in cart_items}
+        if product_ids:
+            for photo in db.query(ProductPhoto).filter(
+                and_(
+                    ProductPhoto.product_id.in_(product_ids),
+                    ProductPhoto.is_main == True
+                )
+            ):
+                main_photos.setdefault(photo.product_id, photo)
+        
         result = []
         for cart_item in cart_items:
             # Получаем информацию о товаре
-            product = db.query(Product).filter(Product.id == cart_item.product_id).first()
+            product = cart_item.product
             if not product:
                 continue
             
             # Получаем главное фото
-            main_photo = db.query(ProductPhoto).filter(
-                and_(
-                    ProductPhoto.product_id == product.id,
-                    ProductPhoto.is_main == True
-                )
-            ).first()
+            main_photo = main_photos.get(product.id)
             
             # Вычисляем доступный остаток (исключая резервы)
             available_stock = product.quantity
@@ -0,0 +1,132 @@
+import itertools
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List
+from ..config import settings
+
+
+# Сколько SQL-запросов одного HTTP-запроса сохраняется в трассе; остальные только считаются
+MAX_TRACE_STATEMENTS = 500
+# Для каких операций строится план (EXPLAIN не выполняет запрос, но INSERT малоинтересен)
+EXPLAIN_OPERATIONS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "None"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Форма параметров без значений (телефоны и имена клиентов в трассу не попадают)"""
+    if executemany:
+        if not parameters:
+            return "0 x ()"
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {_value_shape(value)}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_value_shape(value) for value in parameters) + ")"
+    return _value_shape(parameters)
+
+
+def explain(engine, statement: str, parameters, executemany: bool = False) -> List[str]:
+    """План выполнения запроса: EXPLAIN QUERY PLAN для SQLite, EXPLAIN для остальных СУБД"""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    with engine.connect() as conn:
+        rows = conn.execution_options(sql_stats=False).exec_driver_sql(prefix + statement, parameters or ()).all()
+    plan = []
+    for row in rows:
+        mapping = row._mapping
+        plan.append(str(mapping["detail"]) if "detail" in mapping else str(row[0]))
+    return plan
+
+
+class SlowRequestLog:
+    """Кольцевой буфер медленных запросов с полной SQL-трассой и планами самых медленных запросов"""
+
+    def __init__(self, capacity: int = 50, threshold: float = 1.0, explain_top: int = 3, enabled: bool = True):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.explain_top = explain_top
+        self.entries = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def is_slow(self, duration: float) -> bool:
+        return self.enabled and duration >= self.threshold
+
+    def _explain_slowest(self, statements) -> List[Dict[str, Any]]:
+        """Планы для explain_top самых медленных запросов (по одному на отпечаток)"""
+        explains = []
+        seen = set()
+        for offset, duration, statement, parameters, executemany, engine in sorted(
+            statements, key=lambda item: -item[1]
+        ):
+            if len(explains) >= self.explain_top:
+                break
+            if statement in seen or engine is None:
+                continue
+            if not statement.lstrip().upper().startswith(EXPLAIN_OPERATIONS):
+                continue
+            seen.add(statement)
+            entry = {"sql": statement, "duration": round(duration, 5)}
+            try:
+                entry["plan"] = explain(engine, statement, parameters, executemany)
+            except Exception as e:
+                entry["error"] = str(e)
+            explains.append(entry)
+        return explains
+
+    def capture(self, method: str, path: str, route: str, status_code: int,
+                duration: float, queries) -> Dict[str, Any]:
+        """Сохраняет медленный запрос; выполняет EXPLAIN (вызывать вне event loop)"""
+        statements = queries.statements or []
+        entry = {
+            "id": next(self._ids),
+            "timestamp": datetime.now().isoformat(),
+            "method": method,
+            "path": path,
+            "route": route,
+            "status_code": status_code,
+            "duration": round(duration, 5),
+            "queries": queries.count,
+            "db_time": round(queries.duration, 5),
+            "truncated": queries.count - len(statements),
+            "statements": [
+                {
+                    "offset": round(offset, 5),
+                    "duration": round(statement_duration, 5),
+                    "sql": statement,
+                    "params": parameter_shape(parameters, executemany),
+                }
+                for offset, statement_duration, statement, parameters, executemany, engine in statements
+            ],
+            "explains": self._explain_slowest(statements),
+        }
+        with self._lock:
+            self.entries.append(entry)
+        return entry
+
+    def get_entries(self) -> List[Dict[str, Any]]:
+        """Сохранённые запросы, новые первыми"""
+        with self._lock:
+            return list(reversed(self.entries))
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+# Глобальный буфер медленных запросов (заполняется PerformanceMiddleware)
+slow_request_log = SlowRequestLog(
+    capacity=settings.slow_request_buffer_size,
+    threshold=settings.slow_request_threshold,
+    explain_top=settings.slow_request_explain_top,
+    enabled=settings.slow_request_capture,
+)
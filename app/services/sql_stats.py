@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from ..services.monitoring import LatencyHistogram, QueryLog, current_query_log, performance_monitor
+from ..services.nplusone import nplusone_detector
+from ..services.slow_requests import MAX_TRACE_STATEMENTS
+
+
+# Ограничение числа отпечатков: всё сверх лимита копится в OTHER_FINGERPRINT
+MAX_FINGERPRINTS = 1000
+OTHER_FINGERPRINT = "<other>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_NAMED_PARAM = re.compile(r"(?:%\(\w+\)s|:\w+|\$\d+|%s)")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)\"?", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def sql_fingerprint(statement: str) -> Tuple[str, str, str]:
+    """Отпечаток запроса без литералов и параметров: (отпечаток, операция, таблица).
+
+    Списки IN (?, ?, ?) любой длины и многострочные VALUES сворачиваются,
+    чтобы запросы одной формы попадали в одну запись.
+    """
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _NAMED_PARAM.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _IN_LIST.sub("(?...)", text)
+    text = _VALUES_LIST.sub(r"\1, ...", text)
+    operation = text.split(" ", 1)[0].upper() if text else ""
+    table_match = _TABLE.search(text)
+    return text, operation, table_match.group(1).lower() if table_match else ""
+
+
+class FingerprintStats:
+    """Статистика одного отпечатка SQL"""
+
+    __slots__ = ("operation", "table", "histogram")
+
+    def __init__(self, operation: str, table: str):
+        self.operation = operation
+        self.table = table
+        self.histogram = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        histogram = self.histogram
+        return {
+            "operation": self.operation,
+            "table": self.table,
+            "count": histogram.count,
+            "total": round(histogram.total, 4),
+            "avg": round(histogram.total / histogram.count, 5) if histogram.count else 0,
+            "p95": round(histogram.percentile(0.95), 5),
+            "max": round(histogram.max, 5),
+        }
+
+
+class SQLStats:
+    """Агрегаты по отпечаткам SQL за время работы процесса"""
+
+    def __init__(self, max_fingerprints: int = MAX_FINGERPRINTS):
+        self.max_fingerprints = max_fingerprints
+        self.fingerprints: Dict[str, FingerprintStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats_for(self, fingerprint: str, operation: str, table: str) -> FingerprintStats:
+        stats = self.fingerprints.get(fingerprint)
+        if stats is None:
+            with self._lock:
+                stats = self.fingerprints.get(fingerprint)
+                if stats is None:
+                    if len(self.fingerprints) >= self.max_fingerprints:
+                        fingerprint, operation, table = OTHER_FINGERPRINT, "", ""
+                        stats = self.fingerprints.get(fingerprint)
+                    if stats is None:
+                        stats = self.fingerprints[fingerprint] = FingerprintStats(operation, table)
+        return stats
+
+    def record(self, statement: str, duration: float, parameters=None,
+               executemany: bool = False, engine=None) -> str:
+        """Учитывает выполненный запрос; возвращает его отпечаток.
+
+        parameters и engine нужны только трассе медленных запросов (форма параметров и EXPLAIN).
+        """
+        fingerprint, operation, table = sql_fingerprint(statement)
+        self._stats_for(fingerprint, operation, table).histogram.record(duration)
+        performance_monitor.record_database_query(table, operation, duration)
+        log = current_query_log.get()
+        if log is not None:
+            repeats = log.record(fingerprint, duration)
+            if operation == "SELECT":  # Пакеты INSERT/UPDATE при flush - не N+1
+                nplusone_detector.observe(log, fingerprint, repeats)
+            if log.statements is not None and len(log.statements) < MAX_TRACE_STATEMENTS:
+                offset = time.perf_counter() - duration - log.started
+                log.statements.append((offset, duration, statement, parameters, executemany, engine))
+        return fingerprint
+
+    def record_row(self):
+        """Учитывает загруженный ORM-объект в журнале текущего запроса"""
+        log = current_query_log.get()
+        if log is not None:
+            log.rows += 1
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[Dict[str, Any]]:
+        """Самые дорогие отпечатки: по суммарному времени, p95 или числу вызовов"""
+        items = [{"fingerprint": fingerprint, **stats.to_dict()}
+                 for fingerprint, stats in list(self.fingerprints.items())]
+        items.sort(key=lambda item: item[order_by], reverse=True)
+        return items[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.fingerprints.clear()
+
+
+@contextmanager
+def track_queries(label: str = "block"):
+    """Собирает SQL-запросы блока кода вне HTTP-запроса (скрипты, тесты сервисов).
+
+    По выходу из блока запускается проверка на N+1, как в конце HTTP-запроса.
+    """
+    log = QueryLog()
+    token = current_query_log.set(log)
+    try:
+        yield log
+    finally:
+        current_query_log.reset(token)
+    nplusone_detector.check(log, label)
+
+
+# Глобальная статистика SQL (заполняется обработчиками событий движка в app/db.py)
+sql_stats = SQLStats()
@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from ..services.logger import logger
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+
+STATIC_DIR = Path("app/static")
+BUILD_DIR_NAME = "build"
+MANIFEST_NAME = "manifest.json"
+
+# Каталоги с пользовательскими и генерируемыми файлами - в сборку не попадают
+EXCLUDED_DIRS = {BUILD_DIR_NAME, "uploads", "qr"}
+
+# Типы файлов, для которых имеет смысл готовить сжатые варианты
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html", ".ico", ".map"}
+
+# Сжатый вариант сохраняется, только если он заметно меньше оригинала
+MIN_COMPRESSION_GAIN = 0.9
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def file_hash(path: Path, length: int = 10) -> str:
+    """Хэш содержимого файла для имени"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def write_compressed_variants(path: Path) -> Dict[str, int]:
+    """Создаёт рядом с файлом .gz и (если доступен brotli) .br варианты"""
+    data = path.read_bytes()
+    variants = {"gzip": (".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variants["br"] = (".br", lambda raw: brotli.compress(raw, quality=11))
+
+    sizes = {}
+    for encoding, (suffix, compress) in variants.items():
+        compressed = compress(data)
+        if len(compressed) < len(data) * MIN_COMPRESSION_GAIN:
+            Path(f"{path}{suffix}").write_bytes(compressed)
+            sizes[encoding] = len(compressed)
+    return sizes
+
+
+def build_assets(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """Собирает статику: копирует файлы с хэшем в имени в static/build,
+    готовит сжатые варианты и записывает manifest.json.
+
+    Возвращает манифест: исходный путь -> путь собранного файла.
+    """
+    build_dir = static_dir / BUILD_DIR_NAME
+    if build_dir.exists():
+        shutil.rmtree(build_dir)
+    build_dir.mkdir(parents=True)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = Path(root).relative_to(static_dir)
+        if rel_root == Path("."):
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            source = Path(root) / name
+            rel_path = (rel_root / name).as_posix()
+            stem, ext = os.path.splitext(rel_path)
+            target_rel = f"{stem}.{file_hash(source)}{ext}"
+            target = build_dir / target_rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target)
+            if ext.lower() in COMPRESSIBLE_EXTENSIONS:
+                write_compressed_variants(target)
+            manifest[rel_path] = f"{BUILD_DIR_NAME}/{target_rel}"
+
+    with open(build_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """Манифест собранной статики для шаблонов"""
+
+    def __init__(self, static_dir: Path = STATIC_DIR, url_prefix: str = "/static"):
+        self.path = static_dir / BUILD_DIR_NAME / MANIFEST_NAME
+        self.url_prefix = url_prefix
+        self._entries: Optional[Dict[str, str]] = None
+
+    @property
+    def entries(self) -> Dict[str, str]:
+        if self._entries is None:
+            self._entries = self.load()
+        return self._entries
+
+    def load(self) -> Dict[str, str]:
+        """Читает manifest.json; без сборки отдаются исходные файлы"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать манифест статики {self.path}: {e}")
+            return {}
+
+    def reload(self):
+        self._entries = None
+
+    def url(self, name: str) -> str:
+        """URL файла статики с учётом fingerprint"""
+        name = name.lstrip("/")
+        return f"{self.url_prefix}/{self.entries.get(name, name)}"
+
+
+# Глобальный манифест статики (используется в шаблонах как static_url)
+asset_manifest = AssetManifest()
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, который отдаёт заранее сжатые варианты файлов
+    и выставляет Cache-Control в зависимости от типа файла"""
+
+    # Варианты в порядке предпочтения
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await self._get_precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if "cache-control" not in response.headers:
+            response.headers["cache-control"] = self.cache_control_for(path)
+        return response
+
+    async def _get_precompressed_response(self, path: str, scope) -> Optional[Response]:
+        """Ищет .br/.gz вариант, который принимает клиент"""
+        if scope["method"] not in ("GET", "HEAD"):
+            return None
+        if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return None
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, suffix in self.ENCODINGS:
+            if encoding not in accept_encoding:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if media_type.startswith("text/"):
+                media_type += "; charset=utf-8"
+            response.headers["content-type"] = media_type
+            response.headers["content-encoding"] = encoding
+            response.headers["vary"] = "Accept-Encoding"
+            return response
+        return None
+
+    @staticmethod
+    def cache_control_for(path: str) -> str:
+        """Политика кэширования для пути внутри /static"""
+        top_dir = path.lstrip("/").split("/", 1)[0]
+        if top_dir in (BUILD_DIR_NAME, "uploads"):
+            # Имя файла меняется вместе с содержимым
+            return IMMUTABLE_CACHE_CONTROL
+        if top_dir == "qr":
+            return REVALIDATE_CACHE_CONTROL
+        return DEFAULT_CACHE_CONTROL
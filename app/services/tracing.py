@@ -0,0 +1,263 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+from ..services.logger import logger
+
+
+# Виды спанов и коды статуса - числовые значения из OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Заголовок W3C traceparent -> (trace_id, parent_span_id, sampled); None, если заголовок некорректен"""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    """Один участок работы: запрос, SQL-запрос, рендер шаблона, фоновая задача"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "events")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = str(exc)
+        self.events.append({
+            "timeUnixNano": str(time.time_ns()),
+            "name": "exception",
+            "attributes": _otlp_attributes({"exception.type": type(exc).__name__, "exception.message": str(exc)}),
+        })
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status, "message": self.status_message} if self.status_message else {"code": self.status},
+        }
+        if self.events:
+            span["events"] = self.events
+        return span
+
+
+# Текущий спан; контекст копируется в задачи asyncio и run_in_threadpool,
+# поэтому SQL и шаблоны внутри запроса становятся его дочерними спанами
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class JSONLinesSpanExporter:
+    """Запись завершённых спанов в файл JSON-lines: каждая строка - ExportTraceServiceRequest OTLP/JSON.
+
+    Спаны копятся в памяти и пишутся фоновым потоком пачками, раз в flush_interval секунд,
+    так что запись на диск не попадает во время ответа.
+    """
+
+    def __init__(self, path: str, service_name: str, flush_interval: float = 1.0, max_buffer: int = 10000):
+        self.path = path
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, span: Span):
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(span)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "app.services.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+    def flush(self):
+        """Записывает накопленные спаны одной строкой"""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            line = json.dumps(self.to_otlp(spans), ensure_ascii=False, separators=(",", ":"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            logger.error(f"Не удалось записать трассы в {self.path}: {e}")
+
+    def shutdown(self):
+        self._stop = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+class Tracer:
+    """Трассировка без внешних зависимостей.
+
+    Выключенный трейсер (по умолчанию) не создаёт спанов: автоматические точки
+    (запросы, SQL, шаблоны, фоновые задачи) проверяют только tracer.enabled.
+    """
+
+    def __init__(self, exporter: JSONLinesSpanExporter, enabled: bool = False, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+                   traceparent: Optional[str] = None) -> Optional[Span]:
+        """Новый спан - дочерний текущего или корневой; None, если трасса не записывается.
+
+        traceparent (входящий заголовок) задаёт родителя и решение о сэмплировании для корневого спана.
+        """
+        if not self.enabled:
+            return None
+        parent = current_span.get()
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+        incoming = parse_traceparent(traceparent)
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+            return Span(name, trace_id, parent_id, kind, attributes) if sampled else None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return Span(name, f"{random.getrandbits(128):032x}", None, kind, attributes)
+
+    def start_child(self, name: str, kind: int = SPAN_KIND_INTERNAL,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Дочерний спан только внутри записываемой трассы (SQL, шаблоны): сами трассы не начинают"""
+        if not self.enabled:
+            return None
+        parent = current_span.get()
+        if parent is None:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None):
+        if error is not None:
+            span.record_exception(error)
+        span.end_ns = time.time_ns()
+        self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+             traceparent: Optional[str] = None):
+        """Спан на время блока; внутри блока он текущий. Отдаёт None, если трасса не записывается"""
+        span = self.start_span(name, kind, attributes, traceparent)
+        if span is None:
+            yield None
+            return
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            current_span.reset(token)
+            self.end_span(span)
+
+    def traceparent(self) -> Optional[str]:
+        """Заголовок traceparent для исходящих запросов из текущего спана"""
+        span = current_span.get()
+        return span.traceparent if span is not None else None
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+
+# Глобальный трейсер (включается TRACING_ENABLED=true)
+tracer = Tracer(
+    JSONLinesSpanExporter(settings.tracing_export_path, settings.tracing_service_name,
+                          settings.tracing_flush_interval),
+    enabled=settings.tracing_enabled,
+    sample_rate=settings.tracing_sample_rate,
+)
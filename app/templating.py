@@ -0,0 +1,66 @@
+from pathlib import Path
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, Template, TemplateError
+from .config import settings
+from .services.fragment_cache import FragmentCacheExtension
+from .services.logger import logger
+from .services.static_assets import asset_manifest
+from .services.tracing import current_span, tracer
+
+TEMPLATES_DIR = "app/templates"
+
+
+class TracedTemplate(Template):
+    """Шаблон, рендер которого попадает в трассу запроса отдельным спаном"""
+
+    def render(self, *args, **kwargs) -> str:
+        if not tracer.enabled or current_span.get() is None:
+            return super().render(*args, **kwargs)
+        with tracer.span(f"render {self.name}", attributes={"template.name": self.name}):
+            return super().render(*args, **kwargs)
+
+
+def create_templates() -> Jinja2Templates:
+    """Создаёт общий для всего приложения объект шаблонов.
+
+    Скомпилированные шаблоны сохраняются в файловый bytecode-кэш, поэтому
+    воркеры после перезапуска не компилируют их заново. Проверка изменений
+    файлов (auto_reload) включена только в development.
+    """
+    if settings.template_bytecode_cache_dir:
+        cache_dir = Path(settings.template_bytecode_cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+    else:
+        bytecode_cache = FileSystemBytecodeCache()
+
+    templates = Jinja2Templates(
+        directory=TEMPLATES_DIR,
+        auto_reload=settings.environment == "development",
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,  # Все шаблоны остаются в памяти
+        extensions=[FragmentCacheExtension],
+    )
+    templates.env.template_class = TracedTemplate
+    # URL статики с fingerprint из manifest.json (см. scripts/build_static.py)
+    templates.env.globals["static_url"] = asset_manifest.url
+    # Шаблоны заказов проверяют необязательные атрибуты через hasattr
+    templates.env.globals["hasattr"] = hasattr
+    return templates
+
+
+def precompile_templates() -> int:
+    """Загружает все шаблоны заранее, возвращает количество скомпилированных"""
+    compiled = 0
+    for name in templates.env.list_templates(extensions=["html"]):
+        try:
+            templates.env.get_template(name)
+            compiled += 1
+        except TemplateError as e:
+            logger.warning(f"Не удалось скомпилировать шаблон {name}: {e}")
+    logger.info(f"Предварительно скомпилировано шаблонов: {compiled}")
+    return compiled
+
+
+# Единственный экземпляр шаблонов для всех роутеров
+templates = create_templates()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк рендеринга каталога магазина (shop/catalog.html) с кэшем фрагментов
+"""
+
+import sys
+import os
+import time
+from datetime import datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Product, ProductPhoto
+from app.services.fragment_cache import fragment_cache
+from app.templating import templates
+
+PRODUCTS_COUNT = 2000
+ROUNDS = 5
+
+
+def make_products(count):
+    """Создаёт товары в памяти (без БД)"""
+    statuses = ["IN_STOCK", "ON_ORDER", "IN_TRANSIT", "OUT_OF_STOCK"]
+    products = []
+    for i in range(1, count + 1):
+        product = Product(
+            id=i,
+            name=f"Товар {i}",
+            quantity=i % 7,
+            sell_price_rub=Decimal("1000.00") + i,
+            availability_status=statuses[i % len(statuses)],
+            updated_at=datetime(2025, 1, 1),
+        )
+        for j in range(3):
+            product.photos.append(ProductPhoto(
+                id=i * 10 + j,
+                file_path=f"app/static/uploads/products/{i}-{j}.jpg",
+                is_main=(j == 1),
+                sort_order=j,
+            ))
+        products.append(product)
+    return products
+
+
+def measure(template, products):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        template.render(products=products)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+def main():
+    template = templates.env.get_template("shop/catalog.html")
+    products = make_products(PRODUCTS_COUNT)
+
+    # Холодный рендер: кэш очищается перед каждым прогоном
+    cold = []
+    for _ in range(ROUNDS):
+        fragment_cache.clear()
+        start = time.perf_counter()
+        template.render(products=products)
+        cold.append(time.perf_counter() - start)
+
+    # Тёплый рендер: все карточки уже в кэше
+    warm_min, warm_avg = measure(template, products)
+
+    print(f"Каталог, товаров: {PRODUCTS_COUNT}, прогонов: {ROUNDS}")
+    print(f"  без кэша:  min {min(cold) * 1000:.1f} ms, avg {sum(cold) / len(cold) * 1000:.1f} ms")
+    print(f"  с кэшем:   min {warm_min * 1000:.1f} ms, avg {warm_avg * 1000:.1f} ms")
+    print(f"  ускорение: x{min(cold) / warm_min:.1f}")
+
+
+if __name__ == "__main__":
+    main()
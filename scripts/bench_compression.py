@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк CompressionMiddleware на крупных ответах: HTML каталога,
+JSON корзины и потоковая CSV-выгрузка
+"""
+
+import sys
+import os
+import asyncio
+import json
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.middleware.compression import CompressionMiddleware, CompressionStats, brotli
+from app.templating import templates
+from bench_catalog_render import make_products
+
+ITERATIONS = 50
+
+
+def make_bodies():
+    catalog = templates.env.get_template("shop/catalog.html").render(products=make_products(300)).encode()
+
+    cart = json.dumps({
+        "items": [
+            {"product_id": i, "product_name": f"Товар {i}", "quantity": i % 5 + 1,
+             "unit_price": 1500.0 + i, "total_price": (1500.0 + i) * (i % 5 + 1)}
+            for i in range(200)
+        ],
+        "total_items": 600,
+        "total_amount": 987654.0,
+    }, ensure_ascii=False).encode()
+
+    csv_rows = [
+        f"{i};Клиент {i};+7900{i:07d};Товар {i % 50};{i % 5 + 1};{1000 + i}.00\n".encode()
+        for i in range(20000)
+    ]
+    csv_chunks = [b"".join(csv_rows[i:i + 500]) for i in range(0, len(csv_rows), 500)]
+    return [
+        ("HTML каталога (300 товаров)", "text/html; charset=utf-8", [catalog]),
+        ("JSON корзины (200 позиций)", "application/json", [cart]),
+        ("CSV-выгрузка (поток, 20000 строк)", "text/csv", csv_chunks),
+    ]
+
+
+def make_app(content_type, chunks):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type.encode())]
+        if len(chunks) == 1:
+            headers.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+async def run(app, accept_encoding):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sum(len(m.get("body", b"")) for m in sent if m["type"] == "http.response.body")
+
+
+async def main():
+    encodings = [b"gzip"] + ([b"br"] if brotli is not None else [])
+    for title, content_type, chunks in make_bodies():
+        raw_size = sum(len(c) for c in chunks)
+        inner = make_app(content_type, chunks)
+        print(f"{title}: {raw_size / 1024:.1f} KB")
+
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            await run(inner, b"identity")
+        baseline = (time.perf_counter() - start) / ITERATIONS
+
+        for encoding in encodings:
+            stats = CompressionStats()
+            app = CompressionMiddleware(inner, stats=stats)
+            start = time.perf_counter()
+            for _ in range(ITERATIONS):
+                size = await run(app, encoding)
+            elapsed = (time.perf_counter() - start) / ITERATIONS
+            print(f"  {encoding.decode():5s} {size / 1024:8.1f} KB  ratio {size / raw_size:.3f}  "
+                  f"+{(elapsed - baseline) * 1000:.2f} ms/ответ")
+    if brotli is None:
+        print("brotli не установлен - измерен только gzip")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
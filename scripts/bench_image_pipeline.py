@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк обработки фото: задержка загрузки (ресайз в запросе против
+сохранения с фоновой обработкой) и объём картинок на странице каталога
+"""
+
+import sys
+import os
+import io
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+from app.services.image_variants import render_variants, verify_image
+
+PHOTOS = 12
+CARDS_PER_PAGE = 24
+WORKERS = 2
+
+
+def make_photo(seed: int) -> bytes:
+    """Фото 4000x3000 с деталями, чтобы сжатие было похоже на реальное"""
+    img = Image.new("RGB", (4000, 3000), (seed * 20 % 255, 90, 160))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, 4000, 40):
+        draw.line([(i, 0), (4000 - i, 3000)], fill=((i + seed) % 255, i % 200, 255 - i % 255), width=3)
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def inline_upload(content: bytes, path: Path):
+    """Прежняя загрузка: запись и ресайз до 1920x1080 прямо в запросе"""
+    path.write_bytes(content)
+    with Image.open(path) as img:
+        if img.width > 1920 or img.height > 1080:
+            img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
+            img.save(path, quality=85, optimize=True)
+
+
+def deferred_upload(content: bytes, path: Path):
+    """Новая загрузка: запись и проверка заголовка, варианты - в пуле"""
+    path.write_bytes(content)
+    verify_image(str(path))
+
+
+def main():
+    photos = [make_photo(i) for i in range(PHOTOS)]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        start = time.perf_counter()
+        for i, content in enumerate(photos):
+            inline_upload(content, tmp / f"inline-{i}.jpg")
+        inline = (time.perf_counter() - start) / PHOTOS
+
+        start = time.perf_counter()
+        for i, content in enumerate(photos):
+            deferred_upload(content, tmp / f"upload-{i}.jpg")
+        deferred = (time.perf_counter() - start) / PHOTOS
+
+        start = time.perf_counter()
+        for i in range(PHOTOS):
+            variants = render_variants(str(tmp / f"upload-{i}.jpg"), str(tmp / "serial"), f"upload-{i}")
+        serial = time.perf_counter() - start
+
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            pool.submit(sum, [0]).result()  # Прогрев процессов
+            start = time.perf_counter()
+            futures = [
+                pool.submit(render_variants, str(tmp / f"upload-{i}.jpg"), str(tmp / "pool"), f"upload-{i}")
+                for i in range(PHOTOS)
+            ]
+            results = [f.result() for f in futures]
+            pooled = time.perf_counter() - start
+
+        original_size = sum(len(c) for c in photos) / PHOTOS
+        old_size = sum((tmp / f"inline-{i}.jpg").stat().st_size for i in range(PHOTOS)) / PHOTOS
+        variant_size = {}
+        for variants in results:
+            for v in variants:
+                variant_size.setdefault((v["size"], v["format"]), []).append(v["file_size"])
+
+    print(f"Загрузка фото 4000x3000 ({original_size / 1024:.0f} KB), {PHOTOS} шт.:")
+    print(f"  ресайз в запросе:      {inline * 1000:.1f} ms/загрузка")
+    print(f"  сохранение + проверка: {deferred * 1000:.1f} ms/загрузка")
+    print(f"Создание вариантов ({len(variants)} файлов на фото):")
+    print(f"  последовательно:       {serial * 1000 / PHOTOS:.1f} ms/фото")
+    print(f"  пул из {WORKERS} процессов:    {pooled * 1000 / PHOTOS:.1f} ms/фото")
+    print(f"Картинки страницы каталога ({CARDS_PER_PAGE} карточек):")
+    print(f"  прежний файл 1920px:   {old_size * CARDS_PER_PAGE / 1024:.0f} KB")
+    for (size, fmt), sizes in sorted(variant_size.items()):
+        avg = sum(sizes) / len(sizes)
+        print(f"  {size:5s} {fmt:4s}:            {avg * CARDS_PER_PAGE / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
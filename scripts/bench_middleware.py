@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов middleware на запрос: ErrorHandlerMiddleware
+на BaseHTTPMiddleware (прежний вариант) против чистого ASGI и PerformanceMiddleware,
+для обычного ответа и StreamingResponse
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response, StreamingResponse
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.services.monitoring import PerformanceMiddleware, PerformanceMonitor
+
+ITERATIONS = 2000
+STREAM_CHUNKS = 20
+
+
+class BaseHTTPErrorHandler(BaseHTTPMiddleware):
+    """Прежняя схема: call_next запускает приложение в отдельной задаче и гонит тело через очередь"""
+
+    async def dispatch(self, request, call_next):
+        try:
+            return await call_next(request)
+        except Exception:
+            return Response("error", status_code=500)
+
+
+async def plain_app(scope, receive, send):
+    await Response(b"x" * 1024, media_type="text/plain")(scope, receive, send)
+
+
+async def streaming_app(scope, receive, send):
+    async def chunks():
+        for _ in range(STREAM_CHUNKS):
+            yield b"x" * 1024
+    await StreamingResponse(chunks(), media_type="text/plain")(scope, receive, send)
+
+
+async def run(app):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""}
+    done = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+
+
+async def per_request(app):
+    for _ in range(100):  # Прогрев
+        await run(app)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await run(app)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def main():
+    for title, inner in (("Обычный ответ (1 KB)", plain_app),
+                         (f"StreamingResponse ({STREAM_CHUNKS} x 1 KB)", streaming_app)):
+        baseline = await per_request(inner)
+        print(f"{title}: без middleware {baseline * 1e6:.1f} мкс/запрос")
+        for name, app in (
+            ("ErrorHandler на BaseHTTPMiddleware", BaseHTTPErrorHandler(inner)),
+            ("ErrorHandlerMiddleware (ASGI)", ErrorHandlerMiddleware(inner)),
+            ("PerformanceMiddleware (ASGI)", PerformanceMiddleware(inner, PerformanceMonitor())),
+            ("ErrorHandler + Performance (ASGI)",
+             ErrorHandlerMiddleware(PerformanceMiddleware(inner, PerformanceMonitor()))),
+        ):
+            elapsed = await per_request(app)
+            print(f"  {name:36s} +{(elapsed - baseline) * 1e6:7.1f} мкс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк хранилища PerformanceMonitor: накладные расходы записи одного запроса,
+стоимость сводки за час и память под последние запросы - кольцевые буферы
+на array и поминутные корзины против прежнего deque словарей с datetime
+"""
+
+import sys
+import os
+import random
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.monitoring import REQUEST_BUFFER_SIZE, PerformanceMonitor
+
+ITERATIONS = 100000
+ROUTES = ["/orders/{order_id}", "/shop/", "/shop/product/{product_id}", "/api/metrics/performance", "/products/"]
+
+
+class DequeStorage:
+    """Прежняя схема: словарь с datetime на каждый запрос и фильтрация списка при каждой сводке"""
+
+    def __init__(self):
+        self.request_times = deque(maxlen=REQUEST_BUFFER_SIZE)
+
+    def record(self, path, method, duration, status_code):
+        self.request_times.append({
+            'timestamp': datetime.now(),
+            'path': path,
+            'method': method,
+            'duration': duration,
+            'status_code': status_code
+        })
+
+    def summary(self):
+        hour_ago = datetime.now() - timedelta(hours=1)
+        recent = [r for r in self.request_times if r['timestamp'] > hour_ago]
+        if not recent:
+            return 0, 0
+        return len(recent), sum(r['duration'] for r in recent) / len(recent)
+
+
+def make_requests(count):
+    random.seed(1)
+    return [(random.choice(ROUTES), random.lognormvariate(-4, 1)) for _ in range(count)]
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_record(requests):
+    legacy = DequeStorage()
+    start = time.perf_counter()
+    for route, duration in requests:
+        legacy.record(route, "GET", duration, 200)
+    legacy_time = (time.perf_counter() - start) / len(requests)
+
+    monitor = PerformanceMonitor()
+    start = time.perf_counter()
+    for route, duration in requests:
+        monitor.record_request_time(route, "GET", duration, 200, route)
+    monitor_time = (time.perf_counter() - start) / len(requests)
+
+    # Только хранилище последних запросов, без гистограмм маршрутов
+    ring = monitor.recent_requests
+    counter = monitor.request_counter
+    start = time.perf_counter()
+    for _, duration in requests:
+        now = time.time()
+        ring.append(now, duration, 200, 1)
+        counter.record(duration, now)
+    storage_time = (time.perf_counter() - start) / len(requests)
+    return legacy, monitor, legacy_time, monitor_time, storage_time
+
+
+def storage_memory(factory, requests):
+    """Байт, занятых хранилищем после заполнения буфера"""
+    tracemalloc.start()
+    storage = factory()
+    for route, duration in requests:
+        storage(route, duration)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    requests = make_requests(ITERATIONS)
+    legacy, monitor, legacy_time, monitor_time, storage_time = bench_record(requests)
+
+    print(f"Запись запроса ({ITERATIONS} запросов, {len(ROUTES)} маршрутов):")
+    print(f"  deque словарей с datetime:        {legacy_time * 1e6:.2f} мкс")
+    print(f"  array-буфер + поминутные корзины: {storage_time * 1e6:.2f} мкс")
+    print(f"  record_request_time целиком:      {monitor_time * 1e6:.2f} мкс (с гистограммой маршрута)")
+
+    legacy_summary = per_call(legacy.summary, 200)
+    monitor_summary = per_call(monitor.request_counter.summary, 200)
+    metrics = per_call(monitor.get_performance_metrics, 200)
+    print(f"Сводка за час (буфер {REQUEST_BUFFER_SIZE} запросов):")
+    print(f"  фильтрация deque:          {legacy_summary * 1e6:.1f} мкс")
+    print(f"  поминутные корзины:        {monitor_summary * 1e6:.1f} мкс")
+    print(f"  get_performance_metrics(): {metrics * 1e6:.1f} мкс")
+
+    def legacy_factory():
+        storage = DequeStorage()
+        return lambda route, duration: storage.record(route, "GET", duration, 200)
+
+    def ring_factory():
+        monitor = PerformanceMonitor()
+        return lambda route, duration: (monitor.recent_requests.append(time.time(), duration, 200, 1),
+                                        monitor.request_counter.record(duration))
+
+    fill = requests[:REQUEST_BUFFER_SIZE * 2]
+    print(f"Память под последние {REQUEST_BUFFER_SIZE} запросов:")
+    print(f"  deque словарей с datetime: {storage_memory(legacy_factory, fill) / 1024:.0f} KiB")
+    print(f"  array-буфер + корзины:     {storage_memory(ring_factory, fill) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк листа этикеток с QR-кодами: время до первого байта, общее время
+и размер PDF для пачки заказов
+"""
+
+import sys
+import os
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.qr_labels import LABELS_PER_PAGE, stream_label_sheet
+
+LABELS = 500
+WORKERS = 2
+
+
+def make_labels(count):
+    return [{
+        "payload": f"https://sirius.example/o/{i:032x}",
+        "order_code": f"AB{i:06d}",
+        "product_name": f"Товар с длинным названием номер {i}",
+        "details": f"{i % 5 + 1} шт. · {1000 + i} ₽",
+        "customer_name": f"Клиент {i}",
+    } for i in range(count)]
+
+
+async def run(labels, executor):
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    async for chunk in stream_label_sheet(labels, executor):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    return first_byte, time.perf_counter() - start, size
+
+
+async def main():
+    labels = make_labels(LABELS)
+    pages = -(-LABELS // LABELS_PER_PAGE)
+    with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+        await run(labels[:1], executor)  # Прогрев процессов пула
+        first_byte, total, size = await run(labels, executor)
+    print(f"Этикеток: {LABELS}, страниц: {pages}, процессов: {WORKERS}")
+    print(f"  первый байт:  {first_byte * 1000:.1f} ms")
+    print(f"  весь PDF:     {total * 1000:.0f} ms ({total * 1000 / pages:.1f} ms/страница)")
+    print(f"  размер:       {size / 1024:.0f} KB ({size / 1024 / pages:.1f} KB/страница)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
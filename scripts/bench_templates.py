@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк загрузки и рендеринга шаблонов: компиляция при первом запросе,
+bytecode-кэш и auto_reload
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from app.services.fragment_cache import FragmentCacheExtension, fragment_cache
+from app.services.static_assets import asset_manifest
+from bench_catalog_render import make_products
+
+TEMPLATES_DIR = "app/templates"
+RENDER_ITERATIONS = 200
+
+
+def make_env(bytecode_cache=None, auto_reload=True):
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,
+        extensions=[FragmentCacheExtension],
+    )
+    env.globals["static_url"] = asset_manifest.url
+    return env
+
+
+def load_all(env):
+    """Загружает все шаблоны, возвращает время в секундах"""
+    start = time.perf_counter()
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    return time.perf_counter() - start
+
+
+def steady_state(env, products):
+    """Среднее время get_template + render одного запроса каталога"""
+    env.get_template("shop/catalog.html").render(products=products)
+    start = time.perf_counter()
+    for _ in range(RENDER_ITERATIONS):
+        env.get_template("shop/catalog.html").render(products=products)
+    return (time.perf_counter() - start) / RENDER_ITERATIONS
+
+
+def main():
+    templates_count = len(make_env().list_templates(extensions=["html"]))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = load_all(make_env())
+        load_all(make_env(FileSystemBytecodeCache(cache_dir)))  # Заполняем кэш
+        warm = load_all(make_env(FileSystemBytecodeCache(cache_dir)))
+
+    products = make_products(50)
+    fragment_cache.clear()
+    reload_on = steady_state(make_env(auto_reload=True), products)
+    reload_off = steady_state(make_env(auto_reload=False), products)
+
+    print(f"Первый запрос (загрузка всех {templates_count} шаблонов):")
+    print(f"  без bytecode-кэша: {cold * 1000:.1f} ms")
+    print(f"  с bytecode-кэшем:  {warm * 1000:.1f} ms")
+    print(f"Установившийся режим (shop/catalog.html, {len(products)} товаров, {RENDER_ITERATIONS} запросов):")
+    print(f"  auto_reload=True:  {reload_on * 1000:.3f} ms/запрос")
+    print(f"  auto_reload=False: {reload_off * 1000:.3f} ms/запрос")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Сборка статики: fingerprint в именах файлов, manifest.json и gzip/brotli варианты.
+Результат - app/static/build, шаблоны получают URL через static_url().
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.static_assets import STATIC_DIR, BUILD_DIR_NAME, build_assets, brotli
+
+
+def main():
+    manifest = build_assets()
+    build_dir = STATIC_DIR / BUILD_DIR_NAME
+
+    print(f"Собрано файлов: {len(manifest)}")
+    for source, target in sorted(manifest.items()):
+        target_path = STATIC_DIR / target
+        sizes = [f"{target_path.stat().st_size} B"]
+        for suffix in (".gz", ".br"):
+            variant = target_path.with_name(target_path.name + suffix)
+            if variant.exists():
+                sizes.append(f"{suffix[1:]} {variant.stat().st_size} B")
+        print(f"  {source} -> {target} ({', '.join(sizes)})")
+
+    if brotli is None:
+        print("brotli не установлен - созданы только gzip-варианты")
+    print(f"Манифест: {build_dir / 'manifest.json'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Сборка мусора медиа: удаляет фото товаров, их варианты и QR-изображения,
+на которые не ссылается ни одна запись БД.
+
+    python scripts/media_gc.py --dry-run
+    python scripts/media_gc.py --quarantine quarantine/media
+"""
+
+import sys
+import os
+import argparse
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import SessionLocal
+from app.services.media_gc import MediaGarbageCollector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Удаление файлов-сирот из uploads и qr")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не удалять")
+    parser.add_argument("--quarantine", help="переносить сирот в этот каталог вместо удаления")
+    parser.add_argument("--min-age-hours", type=float, default=1.0, help="не трогать файлы моложе (часов)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    collector = MediaGarbageCollector(
+        batch_size=args.batch_size,
+        min_age=args.min_age_hours * 3600,
+        quarantine_dir=args.quarantine,
+        dry_run=args.dry_run
+    )
+    db = SessionLocal()
+    try:
+        report = collector.run(db).to_dict()
+    finally:
+        db.close()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    total = report["total"]
+    action = "можно освободить" if args.dry_run else "освобождено"
+    print(f"Файлов-сирот: {total['orphans']}, {action} {total['bytes_reclaimed'] / (1024 * 1024):.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
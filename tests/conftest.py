@@ -9,6 +9,12 @@ from app.main import app
 from app.db import get_db, Base
 from app.services.auth import get_password_hash
 from app.models import User, Product, Order, Supply, OperationLog, PaymentMethodModel, PaymentInstrument, CashFlow, ProductPhoto, ShopCart, ShopOrder
+from app.services.image_pipeline import image_pipeline
+from app.services.nplusone import nplusone_detector
+from app.services.product_photos import ProductPhotoService
+
+# В тестах повторяющийся SQL (N+1) - ошибка, а не предупреждение в логе
+nplusone_detector.mode = "raise"
 
 # Глобальные переменные для тестовой БД
 test_db_path = None
@@ -203,3 +209,10 @@ def authenticated_user_client(client, test_user):
         pytest.fail(f"Ошибка аутентификации: {response.status_code}")
     
     return client
+
+@pytest.fixture(scope="function")
+def upload_dirs(tmp_path, monkeypatch):
+    """Загрузки и варианты пишутся во временный каталог"""
+    monkeypatch.setattr(ProductPhotoService, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(image_pipeline, "variants_dir", tmp_path / "variants")
+    return tmp_path
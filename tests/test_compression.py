@@ -0,0 +1,108 @@
+import gzip
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from app.middleware.compression import CompressionMiddleware, CompressionStats
+
+LARGE_TEXT = "Сириус " * 1000
+
+
+def make_client():
+    """Тестовое приложение с CompressionMiddleware"""
+    app = FastAPI()
+    stats = CompressionStats()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, stats=stats)
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(LARGE_TEXT)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/tagged")
+    async def tagged(request: Request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return Response(status_code=304, headers={"etag": '"v1"'})
+        return PlainTextResponse(LARGE_TEXT, headers={"etag": '"v1"'})
+
+    @app.get("/partial")
+    async def partial():
+        return PlainTextResponse(LARGE_TEXT, status_code=206,
+                                 headers={"content-range": f"bytes 0-99/{len(LARGE_TEXT)}"})
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def rows():
+            for i in range(100):
+                yield f"{i};{LARGE_TEXT[:50]}\n"
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return TestClient(app), stats
+
+
+def test_large_response_compressed():
+    """Крупный ответ сжимается gzip"""
+    client, stats = make_client()
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.text == LARGE_TEXT
+    assert stats.compressed["gzip"] == 1
+    assert stats.bytes_out < stats.bytes_in
+
+
+def test_small_and_binary_responses_skipped():
+    """Маленькие ответы и сжатые форматы не сжимаются"""
+    client, stats = make_client()
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    assert stats.skipped["small"] == 1
+    assert stats.skipped["media_type"] == 1
+
+
+def test_streaming_response_compressed():
+    """StreamingResponse сжимается потоково"""
+    client, stats = make_client()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode().count("\n") == 100
+
+
+def test_accept_encoding_q_values():
+    """q=0 запрещает кодировку, выбирается наибольший q"""
+    middleware = CompressionMiddleware(None)
+    assert middleware.choose_encoding("gzip;q=0") is None
+    assert middleware.choose_encoding("gzip; q=0.0, identity") is None
+    assert middleware.choose_encoding("*;q=0.5") is not None
+    assert middleware.choose_encoding("br;q=0, gzip;q=0.8") == "gzip"
+
+
+def test_vary_on_uncompressed_text():
+    """Vary: Accept-Encoding и у несжатых текстовых ответов (маленьких и без поддержки сжатия)"""
+    client, stats = make_client()
+    for url, accept in (("/small", "gzip"), ("/large", "identity"), ("/large", "gzip;q=0")):
+        response = client.get(url, headers={"Accept-Encoding": accept})
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+    assert stats.skipped["not_accepted"] == 2
+
+
+def test_partial_content_and_etag():
+    """206 не сжимается; у сжатого ответа ETag слабый, и он подходит для If-None-Match"""
+    client, stats = make_client()
+    response = client.get("/partial", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 206 and "content-encoding" not in response.headers
+
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["etag"] == 'W/"v1"'
+    revalidated = client.get("/tagged", headers={"Accept-Encoding": "gzip", "If-None-Match": 'W/"v1"'})
+    assert revalidated.status_code == 304
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app as main_app
+from app.middleware.error_handler import ErrorHandlerMiddleware
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/xss")
+    async def xss():
+        raise RuntimeError("<script>alert(1)</script>")
+
+    @app.get("/stream")
+    async def stream(fail: bool = False):
+        async def chunks():
+            yield b"first;"
+            if fail:
+                raise RuntimeError("stream broken")
+            yield b"second"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(ErrorHandlerMiddleware)
+    return TestClient(app)
+
+
+def test_error_before_response_becomes_500():
+    """Исключение до начала ответа - JSON для API и страница для браузера"""
+    client = make_client()
+
+    response = client.get("/boom")
+    assert response.status_code == 500
+    assert response.json()["error"] == "Внутренняя ошибка сервера"
+
+    response = client.get("/boom", headers={"accept": "text/html"})
+    assert response.status_code == 500 and "text/html" in response.headers["content-type"]
+
+
+def test_error_details_escaped_and_hidden_outside_development(monkeypatch):
+    """Текст исключения экранируется в HTML и не показывается вне development"""
+    client = make_client()
+    monkeypatch.setattr(settings, "debug", True)
+    monkeypatch.setattr(settings, "environment", "development")
+    page = client.get("/xss", headers={"accept": "text/html"}).text
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in page and "<script>" not in page
+
+    monkeypatch.setattr(settings, "environment", "production")
+    assert "alert(1)" not in client.get("/xss", headers={"accept": "text/html"}).text
+    assert client.get("/xss").json()["detail"] == "Произошла ошибка"
+
+
+def test_streaming_response_passes_through():
+    """Тело StreamingResponse уходит частями, без буферизации"""
+    messages = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        # StreamingResponse слушает отключение клиента: ждём, пока ответ не отправлен
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            disconnected.set()
+
+    async def endpoint(scope, receive, send):
+        async def chunks():
+            yield b"first;"
+            yield b"second"
+        await StreamingResponse(chunks())(scope, receive, send)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    asyncio.run(ErrorHandlerMiddleware(endpoint)(scope, receive, send))
+    bodies = [m["body"] for m in messages if m["type"] == "http.response.body" and m["body"]]
+    assert bodies == [b"first;", b"second"]
+
+    response = make_client().get("/stream")
+    assert response.status_code == 200 and response.text == "first;second"
+
+
+def test_error_after_response_started_is_reraised():
+    """Ошибка посреди потокового ответа не подменяет уже отправленные заголовки"""
+    with pytest.raises(RuntimeError, match="stream broken"):
+        make_client().get("/stream?fail=true")
+
+
+def test_registered_outermost():
+    """ErrorHandlerMiddleware - самый внешний слой приложения, снаружи PerformanceMiddleware"""
+    assert main_app.user_middleware[0].cls is ErrorHandlerMiddleware
@@ -0,0 +1,79 @@
+import io
+import os
+from PIL import Image
+from app.models import ProductPhoto
+from app.services.image_variants import VARIANT_FORMATS, VARIANT_SIZES, render_variants
+
+
+def make_jpeg(width=2400, height=1600) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def test_render_variants(tmp_path):
+    """Для каждого размера создаются WebP и JPEG, вписанные в рамку и без увеличения"""
+    source = tmp_path / "source.jpg"
+    source.write_bytes(make_jpeg(800, 400))
+
+    variants = render_variants(str(source), str(tmp_path / "out"), "source")
+
+    assert len(variants) == len(VARIANT_SIZES) * len(VARIANT_FORMATS)
+    by_key = {(v["size"], v["format"]): v for v in variants}
+    assert (by_key[("thumb", "webp")]["width"], by_key[("thumb", "webp")]["height"]) == (320, 160)
+    assert by_key[("full", "jpeg")]["width"] == 800  # Маленький исходник не увеличивается
+    with Image.open(by_key[("card", "webp")]["file_path"]) as img:
+        assert img.format == "WEBP"
+
+
+def test_upload_creates_variants(client, db_session, test_product, upload_dirs):
+    """Загрузка отвечает сразу, а варианты появляются после фоновой обработки"""
+    response = client.post(
+        f"/api/shop/products/{test_product.id}/photos",
+        files={"photo": ("photo.jpg", make_jpeg(), "image/jpeg")},
+        data={"is_main": "true"}
+    )
+    assert response.status_code == 200
+
+    photo = db_session.query(ProductPhoto).filter(ProductPhoto.product_id == test_product.id).one()
+    db_session.refresh(photo)
+    assert photo.processing_status == "ready"
+    assert len(photo.variants) == len(VARIANT_SIZES) * len(VARIANT_FORMATS)
+    assert photo.variant("card", "webp").width == 640
+    assert photo.variant_url("thumb", "webp").endswith("-thumb.webp")
+    assert photo.srcset("jpeg").endswith("-full.jpg 1620w")  # 2400x1600 вписано в 1920x1080
+
+
+def test_upload_rejects_broken_image(client, db_session, test_product, upload_dirs):
+    """Файл, который не читается как изображение, отклоняется до записи в БД"""
+    response = client.post(
+        f"/api/shop/products/{test_product.id}/photos",
+        files={"photo": ("photo.jpg", b"not an image", "image/jpeg")}
+    )
+    assert response.status_code == 400
+    assert db_session.query(ProductPhoto).filter(ProductPhoto.product_id == test_product.id).count() == 0
+
+
+def test_duplicate_upload_reuses_file(client, db_session, test_product, upload_dirs):
+    """Одинаковое фото хранится одним файлом и удаляется вместе с последней ссылкой"""
+    content = make_jpeg(800, 600)
+    for _ in range(2):
+        response = client.post(
+            f"/api/shop/products/{test_product.id}/photos",
+            files={"photo": ("photo.jpeg", content, "image/jpeg")}
+        )
+        assert response.status_code == 200
+
+    first, second = db_session.query(ProductPhoto).order_by(ProductPhoto.id).all()
+    assert first.file_path == second.file_path
+    assert first.file_path.endswith(f"{first.content_hash[:2]}/{first.content_hash[2:4]}/{first.content_hash}.jpg")
+    assert second.processing_status == "ready"  # Варианты взяты у первого фото
+    assert {v.file_path for v in second.variants} == {v.file_path for v in first.variants}
+    assert len([p for p in upload_dirs.rglob("*.jpg") if "variants" not in p.parts]) == 1
+
+    assert client.delete(f"/api/shop/products/photos/{first.id}").status_code == 200
+    assert os.path.exists(second.file_path)
+    assert all(os.path.exists(v.file_path) for v in second.variants)
+
+    assert client.delete(f"/api/shop/products/photos/{second.id}").status_code == 200
+    assert not os.path.exists(second.file_path)
@@ -0,0 +1,90 @@
+import io
+import pytest
+from PIL import Image
+from app.models import ProductPhoto
+from app.services.media_cache import DiskLRUCache, media_cache, resized_images
+from app.services.product_photos import ProductPhotoService
+
+
+@pytest.fixture
+def photo(db_session, test_product, tmp_path, monkeypatch):
+    """Фото товара во временном каталоге и пустой кэш /media"""
+    monkeypatch.setattr(media_cache, "directory", tmp_path / "cache")
+    monkeypatch.setattr(media_cache, "_entries", None)
+    source = tmp_path / "source.jpg"
+    Image.new("RGB", (1600, 1200), (10, 120, 200)).save(source, "JPEG")
+    photo = ProductPhoto(
+        product_id=test_product.id,
+        filename="source.jpg",
+        original_filename="source.jpg",
+        file_path=str(source),
+        file_size=source.stat().st_size,
+        mime_type="image/jpeg"
+    )
+    db_session.add(photo)
+    db_session.commit()
+    return photo
+
+
+def test_resize_on_demand_and_cache(client, photo):
+    """Первый запрос создаёт копию, повторный отдаётся из дискового кэша"""
+    misses = media_cache.misses
+    response = client.get(f"/media/products/{photo.id}/320x320.webp")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "no-cache"  # URL без версии перепроверяется
+    assert Image.open(io.BytesIO(response.content)).size == (320, 240)
+    assert media_cache.misses == misses + 1
+
+    hits = media_cache.hits
+    again = client.get(f"/media/products/{photo.id}/320x320.webp")
+    assert again.content == response.content
+    assert media_cache.hits == hits + 1
+
+    not_modified = client.get(
+        f"/media/products/{photo.id}/320x320.webp",
+        headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+
+
+def test_versioned_url_and_delete(client, db_session, photo):
+    """URL с версией содержимого кэшируется навсегда; после удаления фото копии не отдаются"""
+    url = resized_images.url(photo, (320, 320))
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert resized_images.photo_version(photo) in response.headers["etag"]
+    assert client.get(url.replace("/legacy/", "/0123456789abcdef/")).status_code == 404
+
+    photo_id = photo.id
+    ProductPhotoService.delete_photo(db_session, photo_id)
+    assert not (media_cache.directory / str(photo_id)).exists()
+    assert client.get(url).status_code == 404
+    assert client.get(f"/media/products/{photo_id}/320x320.webp").status_code == 404
+
+
+def test_size_whitelist(client, photo):
+    """Размеры и форматы вне белого списка не обрабатываются"""
+    assert client.get(f"/media/products/{photo.id}/333x333.webp").status_code == 404
+    assert client.get(f"/media/products/{photo.id}/320x320.gif").status_code == 404
+    assert client.get("/media/products/999999/320x320.webp").status_code == 404
+
+
+def test_disk_lru_eviction(tmp_path):
+    """При превышении лимита вытесняется давно не запрошенный файл"""
+    cache = DiskLRUCache(tmp_path, max_bytes=250)
+    for key in ("a.bin", "b.bin"):
+        temp = cache.temp_path(key)
+        temp.write_bytes(b"x" * 100)
+        cache.put(key, temp)
+
+    assert cache.get("a.bin") is not None  # a становится самым свежим
+    temp = cache.temp_path("c.bin")
+    temp.write_bytes(b"x" * 100)
+    cache.put("c.bin", temp)
+
+    assert cache.get("b.bin") is None
+    assert not (tmp_path / "b.bin").exists()
+    assert cache.get("a.bin") is not None and cache.get("c.bin") is not None
+    assert cache.total_bytes == 200 and cache.evictions == 1
@@ -0,0 +1,62 @@
+import os
+import time
+from pathlib import Path
+from app.models import ProductPhoto
+from app.services.media_gc import MediaGarbageCollector, MediaRoot, _referenced_photos, _referenced_qr
+
+
+def make_file(path: Path, size: int = 100, age: float = 7200) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+
+def make_roots(tmp_path):
+    products_dir = tmp_path / "products"
+    qr_dir = tmp_path / "qr"
+    return products_dir, qr_dir, [
+        MediaRoot("products", products_dir, lambda path: Path(path).as_posix(), _referenced_photos),
+        MediaRoot("qr", qr_dir, lambda path: "qr/" + Path(path).relative_to(qr_dir).as_posix(), _referenced_qr),
+    ]
+
+
+def test_orphans_removed_in_batches(db_session, test_product, test_order, tmp_path):
+    """Удаляются только файлы без ссылок в БД и старше min_age"""
+    products_dir, qr_dir, roots = make_roots(tmp_path)
+    kept = make_file(products_dir / "ab" / "cd" / "kept.jpg")
+    orphans = [make_file(products_dir / "ef" / "01" / f"orphan-{i}.jpg", size=1000) for i in range(5)]
+    recent = make_file(products_dir / ".tmp" / "upload.tmp", age=10)
+    qr_kept = make_file(qr_dir / f"{test_order.id}.png")
+    qr_orphan = make_file(qr_dir / "999999.png", size=300)
+
+    db_session.add(ProductPhoto(
+        product_id=test_product.id, filename="kept.jpg", original_filename="kept.jpg",
+        file_path=kept.as_posix(), file_size=100, mime_type="image/jpeg"
+    ))
+    test_order.qr_image_path = f"qr/{test_order.id}.png"
+    db_session.commit()
+
+    report = MediaGarbageCollector(roots=roots, batch_size=2).run(db_session).to_dict()
+
+    assert report["roots"]["products"]["orphans"] == 5
+    assert report["roots"]["products"]["skipped_recent"] == 1
+    assert report["roots"]["qr"]["removed"] == 1
+    assert report["total"]["bytes_reclaimed"] == 5 * 1000 + 300
+    assert kept.exists() and recent.exists() and qr_kept.exists()
+    assert not qr_orphan.exists() and not any(p.exists() for p in orphans)
+
+
+def test_dry_run_and_quarantine(db_session, tmp_path):
+    """dry_run ничего не трогает, карантин переносит файлы с сохранением путей"""
+    products_dir, _, roots = make_roots(tmp_path)
+    orphan = make_file(products_dir / "ab" / "cd" / "orphan.jpg")
+
+    report = MediaGarbageCollector(roots=roots, dry_run=True).run(db_session).to_dict()
+    assert report["total"]["orphans"] == 1 and orphan.exists()
+
+    quarantine = tmp_path / "quarantine"
+    MediaGarbageCollector(roots=roots, quarantine_dir=quarantine).run(db_session)
+    assert not orphan.exists()
+    assert (quarantine / "products" / "ab" / "cd" / "orphan.jpg").exists()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import time
+from app.config import settings
+from app.services.metrics_export import MetricsFileStore, collect_local, merge_snapshots, render_openmetrics
+
+
+def test_metrics_endpoint(client):
+    """/metrics отдаёт OpenMetrics с гистограммой запросов по шаблону маршрута"""
+    client.get("/api/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/openmetrics-text")
+    text = response.text
+    assert text.endswith("# EOF\n")
+
+    buckets = [
+        int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith('sirius_http_request_duration_seconds_bucket{method="GET",route="/api/health"')
+    ]
+    assert buckets == sorted(buckets) and buckets[-1] >= 1
+    assert "sirius_process_cpu_seconds_total{pid=" in text
+
+
+
+def test_metrics_requires_token_outside_development(client, monkeypatch):
+    """Вне development /metrics без METRICS_TOKEN закрыт, с токеном - только по Bearer"""
+    monkeypatch.setattr(settings, "environment", "production")
+    monkeypatch.setattr(settings, "metrics_token", None)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "metrics_token", "secret")
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+
+
+def test_snapshots_merged_across_workers(tmp_path):
+    """Счётчики и гистограммы воркеров складываются, процессные метрики различаются по pid"""
+    local = collect_local()
+    other = {**local, "pid": os.getppid(), "written_at": time.time()}
+    store = MetricsFileStore(str(tmp_path))
+    store.write(other)
+
+    # Снимок завершившегося процесса удаляется при чтении
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    store.write({**local, "pid": finished.pid, "written_at": time.time()})
+
+    others = store.read_others()
+    assert [snapshot["pid"] for snapshot in others] == [os.getppid()]
+    assert not os.path.exists(store.path_for(finished.pid))
+
+    merged = merge_snapshots([local] + others)
+    requests = merged["sirius_http_request_duration_seconds"]["samples"]
+    for labels, value in requests.values():
+        single = next(v for l, v in local["families"]["sirius_http_request_duration_seconds"]["samples"] if l == labels)
+        assert value["count"] == 2 * single["count"]
+    pids = {labels["pid"] for labels, _ in merged["sirius_process_cpu_seconds"]["samples"].values()}
+    assert pids == {str(os.getpid()), str(os.getppid())}
+    assert render_openmetrics(merged).endswith("# EOF\n")
@@ -0,0 +1,81 @@
+import random
+from app.services.monitoring import (
+    MAX_ERROR_TYPES, OTHER_ERROR, LatencyHistogram, PerformanceMonitor, TimeBucketedCounter, performance_monitor,
+)
+
+
+def test_histogram_percentiles():
+    """Перцентили по лог-корзинам с погрешностью не больше шага корзины"""
+    random.seed(1)
+    samples = sorted(random.lognormvariate(-4, 1) for _ in range(10000))
+    histogram = LatencyHistogram()
+    for value in samples:
+        histogram.record(value)
+
+    assert histogram.count == len(samples) and len(histogram.counts) == 73
+    for q in (0.5, 0.9, 0.99):
+        exact = samples[int(q * len(samples)) - 1]
+        assert exact <= histogram.percentile(q) <= exact * 1.2
+
+
+def test_routes_grouped_by_template():
+    """Запросы группируются по шаблону маршрута, ошибки считаются по классам статусов"""
+    monitor = PerformanceMonitor()
+    monitor.record_request_time("/orders/1", "GET", 0.010, 200, "/orders/{order_id}")
+    monitor.record_request_time("/orders/2", "GET", 0.020, 404, "/orders/{order_id}")
+    monitor.record_request_time("/orders/3", "GET", 0.030, 500, "/orders/{order_id}")
+
+    (route,) = monitor.get_route_metrics()
+    assert route["route"] == "GET /orders/{order_id}" and route["count"] == 3
+    assert route["status"]["4xx"] == 1 and route["status"]["5xx"] == 1
+    assert route["error_rate"]["total"] == round(2 / 3, 4)
+
+
+def test_middleware_records_route_template(client, test_product):
+    """PerformanceMiddleware подставляет шаблон маршрута вместо пути"""
+    performance_monitor.reset_metrics()
+    client.get(f"/shop/product/{test_product.id}?from=metrics-test")  # Мимо кэша ответов
+    client.get("/no-such-page")
+
+    data = client.get("/api/metrics/performance").json()["data"]
+    routes = {route["route"]: route for route in data["routes"]}
+    assert any(key.startswith("GET /shop/product/{") for key in routes)
+    assert routes["GET <unmatched>"]["status"]["4xx"] == 1
+    assert data["requests"]["p99"] >= data["requests"]["p50"] > 0
+
+
+def test_ring_buffer_keeps_last_requests():
+    """Кольцевой буфер хранит только последние запросы, медленные отдаются с шаблоном маршрута"""
+    monitor = PerformanceMonitor(buffer_size=4)
+    for i in range(10):
+        monitor.record_request_time(f"/orders/{i}", "GET", i / 10, 200, "/orders/{order_id}")
+
+    assert monitor.recent_requests.size == 4
+    slow = monitor.get_slow_queries(0.65)
+    assert [round(r["duration"], 1) for r in slow] == [0.7, 0.8, 0.9]
+    assert slow[0]["path"] == "/orders/{order_id}" and slow[0]["method"] == "GET"
+    assert slow[0]["status_code"] == 200
+
+
+def test_time_buckets_expire():
+    """Сводка за окно учитывает только свежие корзины"""
+    counter = TimeBucketedCounter(width=60, buckets=60)
+    counter.record(1.0, now=0)
+    counter.record(3.0, now=30)
+    counter.record(2.0, now=1800)
+
+    summary = counter.summary(now=1800)
+    assert summary == {"count": 3, "avg": 2.0, "min": 1.0, "max": 3.0}
+    assert counter.summary(now=3650)["count"] == 1  # Первая минута вышла из окна
+    counter.record(5.0, now=3600)  # Та же корзина, что у now=0: старые значения сброшены
+    assert counter.summary(now=3600) == {"count": 2, "avg": 3.5, "min": 2.0, "max": 5.0}
+
+
+def test_error_types_bounded():
+    """Число типов ошибок ограничено, лишние попадают в общий счётчик"""
+    monitor = PerformanceMonitor()
+    for i in range(MAX_ERROR_TYPES + 5):
+        monitor.record_error(f"error_{i}", "/", "boom")
+
+    errors = monitor.get_error_summary()
+    assert len(errors) == MAX_ERROR_TYPES + 1 and errors[OTHER_ERROR] == 5
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import text
+from app.models import Order
+from app.services.nplusone import NPlusOneDetector, NPlusOneError, nplusone_detector
+from app.services.sql_stats import track_queries
+
+
+def test_repeated_select_raises_with_location(db_session):
+    """Один и тот же SELECT больше порога раз - NPlusOneError с местом в коде"""
+    with pytest.raises(NPlusOneError) as error:
+        with track_queries("loop"):
+            for product_id in range(nplusone_detector.threshold + 1):
+                db_session.execute(text("SELECT id FROM products WHERE id = :id"), {"id": product_id})
+
+    message = str(error.value)
+    assert f"{nplusone_detector.threshold + 1}x SELECT id FROM products WHERE id = ?" in message
+    assert "tests/test_nplusone.py:" in message and "test_repeated_select_raises_with_location" in message
+
+
+def test_below_threshold_and_writes_pass(db_session, test_order):
+    """Повторы до порога и пакеты INSERT/UPDATE не считаются N+1"""
+    with track_queries("ok") as log:
+        for _ in range(nplusone_detector.threshold):
+            db_session.execute(text("SELECT 1 FROM orders WHERE id = :id"), {"id": test_order.id})
+        for _ in range(nplusone_detector.threshold + 5):
+            db_session.execute(text("UPDATE orders SET qty = qty WHERE id = :id"), {"id": test_order.id})
+    assert log.count == nplusone_detector.threshold * 2 + 5 and not log.locations
+
+
+def test_warn_mode_logs(monkeypatch, db_session, test_order):
+    """В режиме warn N+1 только попадает в лог"""
+    detector = NPlusOneDetector(threshold=2, mode="warn")
+    monkeypatch.setattr("app.services.sql_stats.nplusone_detector", detector)
+    warnings = []
+    monkeypatch.setattr("app.services.nplusone.logger.warning", warnings.append)
+
+    with track_queries("orders"):
+        for _ in range(3):
+            db_session.query(Order).filter(Order.id == test_order.id).first()
+
+    assert detector.detected == 1 and len(warnings) == 1 and "N+1 в orders: 3x SELECT" in warnings[0]
+
+
+def test_middleware_records_request_once(db_session):
+    """NPlusOneError в режиме raise не записывает запрос второй раз как 500"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.services.monitoring import PerformanceMiddleware, PerformanceMonitor
+
+    app = FastAPI()
+
+    @app.get("/loop")
+    async def loop():
+        for product_id in range(nplusone_detector.threshold + 1):
+            db_session.execute(text("SELECT id FROM products WHERE id = :id"), {"id": product_id})
+        return {}
+
+    monitor = PerformanceMonitor()
+    app.add_middleware(PerformanceMiddleware, monitor=monitor)
+    with pytest.raises(NPlusOneError):
+        TestClient(app).get("/loop")
+
+    assert len(monitor.recent_requests.indexes()) == 1 and not monitor.error_counts
+    assert monitor.recent_requests.status_codes[monitor.recent_requests.indexes()[0]] == 200
@@ -0,0 +1,66 @@
+import marshal
+import time
+import pytest
+from app.services.profiler import RequestProfiler, StackSampler, request_profiler
+
+
+def test_claim_counts_down_matching_requests():
+    """Сессия забирает только подходящие запросы и выключается после count"""
+    profiler = RequestProfiler()
+    profiler.arm("/orders/{order_id:int}", 2, "sampling", method="get")
+    assert profiler.armed
+
+    assert profiler.claim("GET", "/orders") is None
+    assert profiler.claim("POST", "/orders/5") is None
+    assert profiler.claim("GET", "/orders/5") is not None
+    assert profiler.claim("GET", "/orders/6") is not None
+    assert profiler.claim("GET", "/orders/7") is None and not profiler.armed
+
+    with pytest.raises(ValueError):
+        profiler.arm("/orders", 0)
+    with pytest.raises(ValueError):
+        profiler.arm("/orders", 1, "perf")
+
+
+def test_stack_sampler_collapsed_stacks():
+    """Сэмплер собирает стеки занятого потока в формате collapsed"""
+    def busy_loop():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    sampler = StackSampler(interval=0.002)
+    sampler.start()
+    busy_loop()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert any(stack.endswith(f"busy_loop (test_profiler.py:{busy_loop.__code__.co_firstlineno})")
+               for stack in sampler.stacks)
+
+
+def test_profile_next_requests_via_admin(authenticated_client, test_product):
+    """Администратор включает cProfile для маршрута и скачивает pstats после N запросов"""
+    request_profiler.sessions.clear()
+    response = authenticated_client.post("/admin/profiler", data={
+        "route": "/shop/product/{product_id:int}", "count": 2, "mode": "cprofile"
+    })
+    session_id = response.json()["data"]["id"]
+    assert authenticated_client.get(f"/admin/profiler/{session_id}/profile.pstats").status_code == 409
+
+    for i in range(3):
+        authenticated_client.get(f"/shop/product/{test_product.id}?profile={i}")
+
+    (session,) = authenticated_client.get("/admin/profiler").json()["data"]["sessions"]
+    assert session["status"] == "done" and session["profiled"] == 2 and not request_profiler.armed
+
+    stats = marshal.loads(authenticated_client.get(f"/admin/profiler/{session_id}/profile.pstats").content)
+    assert any(function == "shop_product_detail" for _, _, function in stats)
+    assert "function calls" in authenticated_client.get(f"/admin/profiler/{session_id}/profile.txt").text
+    assert authenticated_client.get(f"/admin/profiler/{session_id}/stacks.txt").status_code == 404
+
+
+def test_profiler_requires_admin(client):
+    """Без входа администратора профилировщик недоступен"""
+    response = client.post("/admin/profiler", data={"route": "/", "count": 1})
+    assert response.status_code in (401, 403) and not request_profiler.armed
@@ -0,0 +1,58 @@
+from app.models import Order, OrderStatus, Product
+from app.services.qr_service import QRService
+from tests.test_qr_tokens import count_queries
+
+
+def make_orders(db_session, test_order, count):
+    orders = []
+    for i in range(count):
+        order = Order(
+            phone=f"+7900111{i:04d}", customer_name=f"Клиент {i}", product_id=test_order.product_id,
+            product_name="Товар", qty=2, unit_price_rub=100, eur_rate=90, order_code=f"B{i:05d}",
+            status="PAID_NOT_ISSUED", source="shop", user_id=test_order.user_id
+        )
+        db_session.add(order)
+        orders.append(order)
+    db_session.flush()
+    for order in orders:
+        QRService.issue_token(db_session, order)
+    db_session.commit()
+    return orders
+
+
+def test_resolve_tokens_single_query(db_session, test_order):
+    """Пачка токенов разрешается одним запросом"""
+    orders = make_orders(db_session, test_order, 10)
+    expected = {order.qr_payload: order.id for order in orders}
+    db_session.expunge_all()
+
+    resolved, statements = count_queries(db_session, lambda: QRService.resolve_tokens(db_session, expected))
+    assert len(statements) == 1
+    assert {token: order.id for token, order in resolved.items()} == expected
+
+
+def test_batch_issue(authenticated_client, db_session, test_order, test_product):
+    """Пакетная выдача: одна транзакция, остатки списаны, результаты по каждому скану"""
+    orders = make_orders(db_session, test_order, 5)
+    payloads = [f"/o/{order.qr_payload}" for order in orders]
+    payloads += [payloads[0], "мусор", "/o/" + "Z" * QRService.TOKEN_LENGTH]
+    stock_before = test_product.quantity
+
+    response = authenticated_client.post("/shop/admin/qr-scan/batch", json={"payloads": payloads, "issue": True})
+    data = response.json()
+    assert data["success"] and data["issued"] == 5
+    assert [r["result"] for r in data["results"]] == ["issued"] * 5 + ["duplicate", "invalid", "not_found"]
+    assert data["results"][0]["order_status"] == OrderStatus.PAID_ISSUED.value
+
+    db_session.expire_all()
+    assert all(o.status == OrderStatus.PAID_ISSUED and o.issued_at for o in db_session.query(Order).filter(Order.source == "shop"))
+    assert db_session.get(Product, test_product.id).quantity == stock_before - 10
+
+    again = authenticated_client.post("/shop/admin/qr-scan/batch", json={"payloads": payloads[:2]}).json()
+    assert [r["result"] for r in again["results"]] == ["already_issued", "already_issued"]
+
+
+def test_batch_requires_staff(client):
+    """Пакетный скан доступен только персоналу"""
+    response = client.post("/shop/admin/qr-scan/batch", json={"payloads": ["x"], "issue": True})
+    assert response.status_code in (401, 403)
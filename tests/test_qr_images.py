@@ -0,0 +1,41 @@
+import io
+from PIL import Image
+from app.services.qr_service import QRService, qr_image_cache
+
+
+def test_qr_rendered_in_memory(client, db_session, test_order):
+    """QR-код рендерится по запросу из qr_payload, файлы не создаются"""
+    qr_image_cache.clear()
+    assert QRService.generate_qr_for_order(db_session, test_order)
+    assert test_order.has_qr and test_order.qr_image_path is None
+
+    url = QRService.get_qr_image_url(test_order)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert (qr_image_cache.hits, qr_image_cache.misses) == (0, 1)  # Промах считается один раз
+    assert response.headers["content-type"] == "image/png"
+    assert "max-age=31536000" in response.headers["cache-control"]
+    img = Image.open(io.BytesIO(response.content))
+    assert img.width == img.height and img.width >= 400
+
+    svg = client.get(QRService.get_qr_image_url(test_order, "svg"))
+    assert svg.status_code == 200
+    assert svg.headers["content-type"].startswith("image/svg+xml")
+    assert svg.text.startswith("<svg") and len(svg.content) < 4096
+
+    hits = qr_image_cache.hits
+    assert client.get(url).content == response.content
+    assert qr_image_cache.hits == hits + 1
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_qr_unknown_and_revoked_tokens(client, db_session, test_order):
+    """Неизвестный или отозванный токен - 404"""
+    assert client.get(f"/qr/{'A' * QRService.TOKEN_LENGTH}.png").status_code == 404
+    assert client.get("/qr/short.png").status_code == 404
+
+    QRService.generate_qr_for_order(db_session, test_order)
+    url = QRService.get_qr_image_url(test_order)
+    assert client.get(url).status_code == 200
+    QRService.revoke_qr_token(db_session, test_order)
+    assert client.get(url).status_code == 404
@@ -0,0 +1,44 @@
+import re
+from app.models import Order
+from app.services.qr_labels import LABELS_PER_PAGE, StreamingPdfWriter, render_label_page
+
+
+def add_orders(db_session, test_order, count):
+    for i in range(count):
+        db_session.add(Order(
+            phone=f"+7900000{i:04d}", customer_name=f"Клиент {i}", product_id=test_order.product_id,
+            product_name="Товар для этикетки", qty=1, unit_price_rub=100, eur_rate=90,
+            order_code=f"L{i:05d}", status="PAID_NOT_ISSUED", user_id=test_order.user_id
+        ))
+    db_session.commit()
+
+
+def test_pdf_writer_structure():
+    """Таблица xref указывает на начала объектов"""
+    writer = StreamingPdfWriter()
+    raster = render_label_page([{"payload": "/o/token", "order_code": "AB123456", "product_name": "Товар"}])
+    pdf = writer.header() + writer.page(raster) + writer.page(raster) + writer.finish()
+
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+    assert b"/Count 2" in pdf
+    xref_offset = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n", pdf[xref_offset:])
+    for number, offset in enumerate(entries, start=1):
+        assert pdf[int(offset):].startswith(f"{number} 0 obj".encode())
+
+
+def test_label_sheet_endpoint(authenticated_client, db_session, test_order):
+    """Лист этикеток для заказов к выдаче: страницы по 24 этикетки, токены выданы всем"""
+    add_orders(db_session, test_order, LABELS_PER_PAGE)
+
+    response = authenticated_client.get("/orders/labels.pdf?status=paid_not_issued")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+    assert b"/Count 2" in response.content  # 25 заказов -> 2 страницы
+
+    db_session.expire_all()
+    assert db_session.query(Order).filter(Order.qr_payload.is_(None)).count() == 0
+
+    empty = authenticated_client.get("/orders/labels.pdf?status=paid_issued")
+    assert empty.status_code == 404
@@ -0,0 +1,52 @@
+from app.models import Order, OrderStatus, Product, QRScanEvent
+from app.services.qr_service import QRService
+from tests.test_qr_batch import make_orders
+
+
+def event(client_id, order, scanned_at, action="issue"):
+    return {"client_id": client_id, "payload": f"/o/{order.qr_payload}", "action": action, "scanned_at": scanned_at}
+
+
+def test_sync_idempotent_and_ordered(authenticated_client, db_session, test_order, test_product):
+    """Очередь применяется по времени сканирования, повтор не выдаёт заказ дважды"""
+    first, second = make_orders(db_session, test_order, 2)
+    stock_before = test_product.quantity
+    events = [
+        event("dev1-3", first, "2026-10-19T10:05:00Z"),  # Второй скан того же заказа - позже
+        event("dev1-1", first, "2026-10-19T10:00:00Z"),
+        event("dev1-2", second, "2026-10-19T10:01:00", action="scan"),
+        {"client_id": "dev1-4", "payload": "/o/" + "Q" * QRService.TOKEN_LENGTH,
+         "action": "issue", "scanned_at": "2026-10-19T10:02:00Z"},
+    ]
+    body = {"device_id": "dev1", "events": events}
+
+    data = authenticated_client.post("/shop/admin/qr-sync", json=body).json()
+    assert data["success"] and data["applied"] == 2
+    assert [(r["status"], r["result"]) for r in data["results"]] == [
+        ("conflict", "already_issued"), ("applied", "issued"), ("applied", "found"), ("conflict", "not_found")
+    ]
+    assert data["results"][0]["issued_at"]
+    assert {c["client_id"] for c in data["conflicts"]} == {"dev1-3", "dev1-4"}
+
+    again = authenticated_client.post("/shop/admin/qr-sync", json=body).json()
+    assert again["duplicates"] == 4 and again["applied"] == 0
+    assert [r["result"] for r in again["results"]] == [r["result"] for r in data["results"]]
+
+    db_session.expire_all()
+    assert db_session.query(QRScanEvent).count() == 4
+    assert db_session.get(Order, first.id).status == OrderStatus.PAID_ISSUED
+    assert db_session.get(Order, second.id).status == OrderStatus.PAID_NOT_ISSUED
+    assert db_session.get(Product, test_product.id).quantity == stock_before - first.qty
+
+
+def test_manifest_lists_open_orders(authenticated_client, db_session, test_order):
+    """Манифест содержит только открытые заказы и поддерживает If-None-Match"""
+    first, second = make_orders(db_session, test_order, 2)
+    first.status = OrderStatus.PAID_ISSUED
+    db_session.commit()
+
+    response = authenticated_client.get("/shop/admin/qr-manifest")
+    manifest = response.json()
+    assert manifest["orders"] == {second.qr_payload: second.order_code}
+    not_modified = authenticated_client.get("/shop/admin/qr-manifest", headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
@@ -0,0 +1,51 @@
+from sqlalchemy import event
+from app.models import QRToken, ShopOrder
+from app.services.qr_service import QRService
+
+
+def count_queries(db_session, func):
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+    return result, statements
+
+
+def test_token_index_lookup(db_session, test_order, test_product):
+    """Токен записывается в qr_tokens, заказ находится одним запросом"""
+    QRService.generate_qr_for_order(db_session, test_order)
+    entry = db_session.query(QRToken).filter(QRToken.token == test_order.qr_payload).one()
+    assert (entry.entity_type, entry.entity_id, entry.revoked) == ("order", test_order.id, False)
+
+    db_session.expunge_all()
+    order, statements = count_queries(db_session, lambda: QRService.get_order_by_qr_token(db_session, entry.token))
+    assert order.id == test_order.id and len(statements) == 1
+
+    missing, statements = count_queries(db_session, lambda: QRService.get_order_by_qr_token(db_session, "x" * 32))
+    assert missing is None and len(statements) == 1
+
+
+def test_shop_order_token_and_revoke(db_session, test_product):
+    """Токены заказов магазина в том же индексе; отозванный токен не находится"""
+    shop_order = ShopOrder(
+        order_code="SHOP0001", order_code_last4="0001", customer_name="Клиент", customer_phone="+79000000000",
+        product_id=test_product.id, product_name=test_product.name, quantity=1,
+        unit_price_rub=100, total_amount=100
+    )
+    db_session.add(shop_order)
+    db_session.commit()
+
+    QRService.generate_qr_for_order(db_session, shop_order)
+    token = shop_order.qr_payload
+    assert QRService.get_order_by_qr_token(db_session, token) is shop_order
+
+    QRService.revoke_qr_token(db_session, shop_order)
+    assert QRService.get_order_by_qr_token(db_session, token) is None
+    assert db_session.query(QRToken).filter(QRToken.token == token).one().revoked
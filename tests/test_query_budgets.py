@@ -0,0 +1,148 @@
+"""
+Бюджеты SQL по основным страницам: число запросов и загруженных строк
+на реалистичном наборе данных. Рост сверх бюджета - регрессия производительности
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import pytest
+from app.models import Order, Product, ProductBatch, ProductPhoto, ShopOrder, Supply
+from app.services.monitoring import performance_monitor
+
+PRODUCTS = 60
+ORDERS = 150
+SHOP_ORDERS = 60
+SUPPLIES = 80
+BATCHES = 20
+CART_ITEMS = 5
+
+# Страница -> (максимум SQL-запросов, максимум загруженных ORM-строк) на наборе из seeded.
+# Число запросов не должно зависеть от объёма данных (см. test_query_count_does_not_grow)
+BUDGETS = {
+    "/shop/": (3, 200),
+    "/shop/product/{product_id}": (3, 5),
+    "/shop/cart": (2, 20),
+    "/shop/checkout": (3, 20),
+    "/orders": (7, 150),
+    "/products": (4, 200),
+    "/products/{product_id}": (5, 10),
+    "/admin": (9, 35),
+    "/admin/analytics": (10, 75),
+    "/admin/analytics/sales": (5, 250),
+    "/admin/analytics/inventory": (3, 70),
+    "/admin/analytics/supplies": (2, 150),
+    "/admin/analytics/profit": (3, 210),
+    "/shop/admin/orders": (2, 70),
+    "/api/shop/cart": (2, 20),
+    "/api/admin/delivery-notifications": (2, 30),
+}
+
+
+@pytest.fixture
+def seeded(db_session, test_admin):
+    """Набор данных, похожий на рабочий: товары с фото, заказы, поставки, заказы магазина"""
+    statuses = ["IN_STOCK", "ON_ORDER", "IN_TRANSIT", "OUT_OF_STOCK"]
+    products = [
+        Product(name=f"Товар {i}", description=f"Описание {i}", quantity=i % 7 * 3, min_stock=5,
+                buy_price_eur=Decimal("40.00") + i, sell_price_rub=Decimal("4000.00") + i * 10,
+                supplier_name=f"Поставщик {i % 4}", availability_status=statuses[i % 4],
+                expected_date=date.today() + timedelta(days=i % 10) if i % 4 else None)
+        for i in range(PRODUCTS)
+    ]
+    db_session.add_all(products)
+    db_session.flush()
+
+    for product in products:
+        for j in range(2):
+            db_session.add(ProductPhoto(
+                product_id=product.id, filename=f"{product.id}-{j}.jpg", original_filename=f"{j}.jpg",
+                file_path=f"app/static/uploads/products/{product.id}-{j}.jpg", file_size=1024,
+                mime_type="image/jpeg", is_main=(j == 0), sort_order=j))
+    order_statuses = ["PAID_NOT_ISSUED", "PAID_ISSUED", "PAID_DENIED"]
+    for i in range(ORDERS):
+        product = products[i % PRODUCTS]
+        db_session.add(Order(
+            phone=f"+7900{i:07d}", customer_name=f"Клиент {i}", client_city="Грозный",
+            product_id=product.id, product_name=product.name, qty=i % 3 + 1,
+            unit_price_rub=product.sell_price_rub, eur_rate=Decimal("95.00"),
+            order_code=f"B{i:07d}", order_code_last4=f"{i:04d}", payment_method="CARD",
+            status=order_statuses[i % 3], user_id=test_admin.username,
+            created_at=datetime.now() - timedelta(days=i % 30)))
+    shop_statuses = ["ordered_not_paid", "ordered_paid", "ordered_in_transit", "ordered_ready", "ordered_issued"]
+    for i in range(SHOP_ORDERS):
+        product = products[i % PRODUCTS]
+        db_session.add(ShopOrder(
+            order_code=f"S{i:07d}", order_code_last4=f"{i:04d}", customer_name=f"Покупатель {i}",
+            customer_phone=f"+7911{i:07d}", product_id=product.id, product_name=product.name,
+            quantity=1, unit_price_rub=product.sell_price_rub, total_amount=product.sell_price_rub,
+            status=shop_statuses[i % len(shop_statuses)],
+            expected_delivery_date=date.today() + timedelta(days=i % 5)))
+    for i in range(SUPPLIES):
+        db_session.add(Supply(product_id=products[i % PRODUCTS].id, qty=10 + i % 5,
+                              supplier_name=f"Поставщик {i % 4}", buy_price_eur=Decimal("40.00")))
+    # Партии в пути: в окне уведомлений (5 дней), просроченные и уже прибывшие
+    today = datetime.combine(date.today(), datetime.min.time())
+    for i in range(BATCHES):
+        kind = i % 4
+        db_session.add(ProductBatch(
+            product_id=products[i % PRODUCTS].id, batch_code=f"BATCH-{i:04d}", quantity=5 + i,
+            expected_arrival_date=today + timedelta(days=i % 5) if kind < 2 else today - timedelta(days=1 + i % 3),
+            preorder_price_rub=Decimal("3500.00"), status="arrived" if kind == 3 else "in_transit"))
+    db_session.commit()
+    return products
+
+
+def fill_cart(client, products):
+    """Корзина текущей сессии клиента"""
+    for product in products[:CART_ITEMS]:
+        response = client.post("/api/shop/cart/add", json={"product_id": product.id, "quantity": 1, "session_id": ""})
+        assert response.status_code == 200
+
+
+def measure(client, url, marker):
+    """Статус ответа, число SQL-запросов и загруженных строк одного запроса.
+
+    marker в строке запроса - чтобы не попасть в кэш ответов
+    """
+    performance_monitor.reset_metrics()
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}budget={marker}")
+    routes = performance_monitor.get_route_metrics()
+    return response.status_code, sum(r["db"]["queries"] for r in routes), sum(r["db"]["rows"] for r in routes)
+
+
+@pytest.mark.parametrize("page", list(BUDGETS))
+def test_page_within_query_budget(authenticated_client, seeded, page):
+    """Страница укладывается в бюджет SQL-запросов и загруженных строк"""
+    fill_cart(authenticated_client, seeded)
+    max_queries, max_rows = BUDGETS[page]
+    url = page.format(product_id=seeded[3].id)
+
+    status_code, queries, rows = measure(authenticated_client, url, "page")
+
+    assert status_code == 200
+    assert queries <= max_queries, f"{page}: {queries} SQL-запросов при бюджете {max_queries}"
+    assert rows <= max_rows, f"{page}: {rows} строк при бюджете {max_rows}"
+
+
+def test_query_count_does_not_grow(authenticated_client, seeded, db_session):
+    """Вдвое больше данных - то же число запросов (N+1 ниже порога детектора тоже ловится)"""
+    fill_cart(authenticated_client, seeded)
+    pages = ["/shop/", "/orders", "/products", "/admin/analytics", "/admin/analytics/inventory",
+             "/admin/analytics/supplies", "/admin/analytics/profit", "/shop/admin/orders",
+             "/api/admin/delivery-notifications"]
+    before = {page: measure(authenticated_client, page, "before")[1] for page in pages}
+
+    for i, product in enumerate(seeded[:20]):
+        extra = Product(name=f"Новый товар {i}", quantity=5, sell_price_rub=Decimal("100.00"))
+        db_session.add(extra)
+        db_session.add(Supply(product=extra, qty=5, supplier_name="Поставщик", buy_price_eur=Decimal("1.00")))
+        db_session.add(Order(phone=f"+7922{i:07d}", customer_name="Клиент", product=extra, product_name=extra.name,
+                             qty=1, unit_price_rub=Decimal("100.00"), eur_rate=Decimal("95.00"),
+                             order_code=f"N{i:07d}", order_code_last4=f"{i:04d}", status="PAID_ISSUED",
+                             user_id="testadmin"))
+        db_session.add(ProductBatch(product=extra, batch_code=f"NEW-{i:04d}", quantity=5, status="in_transit",
+                                    expected_arrival_date=datetime.now() + timedelta(days=i % 5)))
+    db_session.commit()
+
+    after = {page: measure(authenticated_client, page, "after")[1] for page in pages}
+    assert after == before
@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+from jinja2 import DictLoader, Environment
+from app.middleware.response_cache import ResponseCacheMiddleware
+from app.services.response_cache import response_cache, ResponseCache
+from app.services.fragment_cache import FragmentCacheExtension, fragment_cache
+from app.models import ProductPhoto
+from app.services.products import update_product
+from app.schemas.product import ProductUpdate
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Очищает кэш ответов между тестами"""
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def test_catalog_cached(client, test_product):
+    """Повторный запрос каталога отдаётся из кэша"""
+    first = client.get("/shop/")
+    assert first.status_code == 200
+    assert first.headers.get("x-cache") == "MISS"
+
+    second = client.get("/shop/")
+    assert second.status_code == 200
+    assert second.headers.get("x-cache") == "HIT"
+    assert second.text == first.text
+    assert "set-cookie" not in second.headers
+
+
+def test_product_write_invalidates_cache(client, db_session, test_product):
+    """Изменение товара сбрасывает кэш страниц магазина"""
+    client.get(f"/shop/product/{test_product.id}")
+    assert client.get(f"/shop/product/{test_product.id}").headers.get("x-cache") == "HIT"
+
+    update_product(db_session, test_product.id, ProductUpdate(name="Новое имя"))
+
+    response = client.get(f"/shop/product/{test_product.id}")
+    assert response.headers.get("x-cache") == "MISS"
+    assert "Новое имя" in response.text
+
+
+def test_non_cached_routes(client):
+    """Корзина не кэшируется"""
+    response = client.get("/shop/cart")
+    assert response.status_code == 200
+    assert "x-cache" not in response.headers
+
+
+def test_lru_eviction():
+    """Кэш ограничен по количеству записей"""
+    cache = ResponseCache(max_entries=2)
+    for key in ("/a", "/b", "/c"):
+        cache.set(key, 200, [], b"", ttl=60)
+    assert cache.get("/a") is None
+    assert cache.get("/c") is not None
+
+
+def test_fragment_cache_extension(db_session, test_product):
+    """Блок {% cache %} рендерится один раз на версию товара"""
+    fragment_cache.clear()
+    env = Environment(loader=DictLoader({
+        "card.html": '{% cache "card", product_version(product) %}{{ product.name }}:{{ renders() }}{% endcache %}'
+    }), extensions=[FragmentCacheExtension])
+    template = env.get_template("card.html")
+    calls = []
+
+    def renders():
+        calls.append(1)
+        return len(calls)
+
+    assert template.render(product=test_product, renders=renders) == f"{test_product.name}:1"
+    assert template.render(product=test_product, renders=renders) == f"{test_product.name}:1"
+
+    # Изменение фото/партий обновляет products.updated_at - версию видят все воркеры
+    db_session.add(ProductPhoto(product_id=test_product.id, filename="card.jpg", original_filename="card.jpg",
+                               file_path="card.jpg", file_size=1, mime_type="image/jpeg"))
+    db_session.commit()
+    assert template.render(product=test_product, renders=renders) == f"{test_product.name}:2"
+
+
+def run_concurrent(middleware, count):
+    """count одновременных GET /shop/ через middleware, возвращает коды ответов"""
+    async def request():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": "GET", "path": "/shop/", "query_string": b"", "headers": []},
+                         receive, send)
+        return sent[0]["status"]
+
+    async def main():
+        return await asyncio.gather(*(request() for _ in range(count)))
+
+    return asyncio.run(main())
+
+
+def test_single_flight_after_uncacheable_leader():
+    """После 404 лидера ожидающие запросы не выполняются разом: следующий лидер заполняет кэш"""
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await asyncio.sleep(0.01)
+        status = 404 if len(calls) == 1 else 200
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/html; charset=utf-8")]})
+        await send({"type": "http.response.body", "body": b"page"})
+
+    cache = ResponseCache()
+    statuses = run_concurrent(ResponseCacheMiddleware(app, cache=cache), 10)
+
+    assert len(calls) == 2
+    assert sorted(statuses) == [200] * 9 + [404]
+    assert cache.hits == 8 and not cache._inflight
+
+
+def test_waiter_times_out_on_hung_leader():
+    """Зависший лидер не держит остальные запросы дольше fill_timeout"""
+    release = asyncio.Event()
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        if len(calls) == 1:
+            await release.wait()
+        else:
+            release.set()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/html; charset=utf-8")]})
+        await send({"type": "http.response.body", "body": b"page"})
+
+    cache = ResponseCache()
+    statuses = run_concurrent(ResponseCacheMiddleware(app, cache=cache, fill_timeout=0.05), 2)
+
+    assert statuses == [200, 200] and len(calls) == 2
+    assert not cache._inflight
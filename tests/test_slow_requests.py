@@ -0,0 +1,32 @@
+from app.services.slow_requests import parameter_shape, slow_request_log
+
+
+def test_parameter_shape_hides_values():
+    """В трассу попадают типы параметров, а не значения"""
+    assert parameter_shape((5, "+79001234567", None)) == "(int, str[12], None)"
+    assert parameter_shape({"id_1": 5}) == "{id_1: int}"
+    assert parameter_shape([(1, "a"), (2, "b")], executemany=True) == "2 x (int, str[1])"
+
+
+def test_slow_requests_require_admin(client):
+    """Трасса медленных запросов (пути, SQL, планы) не отдаётся без входа админа"""
+    assert client.get("/api/metrics/slow-requests").status_code == 401
+
+
+def test_slow_request_captured_with_plan(monkeypatch, authenticated_client, test_product):
+    """Запрос дольше порога сохраняется со всеми SQL-запросами и планом самого медленного"""
+    monkeypatch.setattr(slow_request_log, "threshold", 0.0)
+    slow_request_log.clear()
+    authenticated_client.get(f"/shop/product/{test_product.id}?from=slow-test")  # Мимо кэша ответов
+
+    entries = authenticated_client.get("/api/metrics/slow-requests").json()["data"]["requests"]
+    entry = next(e for e in entries if e["path"] == f"/shop/product/{test_product.id}")
+    assert entry["route"] == "/shop/product/{product_id:int}" and entry["status_code"] == 200
+    assert entry["queries"] == len(entry["statements"]) > 0 and entry["truncated"] == 0
+    assert [s["offset"] for s in entry["statements"]] == sorted(s["offset"] for s in entry["statements"])
+
+    product_select = next(s for s in entry["statements"] if "FROM products" in s["sql"])
+    assert "?" in product_select["sql"] and "int" in product_select["params"]
+    assert str(test_product.id) not in product_select["params"]
+    assert entry["explains"] and all(explain.get("plan") for explain in entry["explains"])
+    assert any("products" in line for explain in entry["explains"] for line in explain["plan"])
@@ -0,0 +1,39 @@
+from app.services.monitoring import performance_monitor
+from app.services.sql_stats import SQLStats, OTHER_FINGERPRINT, sql_fingerprint, sql_stats
+
+
+def test_fingerprint_strips_literals():
+    """Литералы и параметры заменяются на ?, списки IN сворачиваются"""
+    first = sql_fingerprint("SELECT * FROM orders WHERE id IN (1, 2, 3) AND status = 'PAID'")
+    second = sql_fingerprint("select *  from orders\n where id in (?, ?)  and status = :status_1")
+
+    assert first[0] == "SELECT * FROM orders WHERE id IN (?...) AND status = ?"
+    assert first[1:] == ("SELECT", "orders")
+    assert second[0].upper() == first[0].upper()
+    assert sql_fingerprint("UPDATE products SET quantity=quantity - 2 WHERE products.id = 5")[1:] == ("UPDATE", "products")
+
+
+def test_fingerprints_are_capped():
+    """Сверх лимита отпечатки копятся в общей записи"""
+    stats = SQLStats(max_fingerprints=2)
+    for table in ("a", "b", "c", "d"):
+        stats.record(f"SELECT x FROM {table}", 0.001)
+
+    assert set(stats.fingerprints) == {"SELECT x FROM a", "SELECT x FROM b", OTHER_FINGERPRINT}
+    assert stats.fingerprints[OTHER_FINGERPRINT].histogram.count == 2
+
+
+def test_engine_statements_recorded_per_request(client, test_product):
+    """Запросы к БД через движок попадают в статистику отпечатков, базы и маршрута"""
+    sql_stats.reset()
+    performance_monitor.reset_metrics()
+    client.get(f"/shop/product/{test_product.id}?from=sql-stats-test")  # Мимо кэша ответов
+
+    data = client.get("/api/metrics/sql?order_by=count").json()["data"]
+    assert data["fingerprints"] > 0
+    product_queries = [q for q in data["queries"] if q["table"] == "products" and q["operation"] == "SELECT"]
+    assert product_queries and "?" in product_queries[0]["fingerprint"]
+    assert performance_monitor.database_histograms["SELECT"].count > 0
+
+    route = next(r for r in performance_monitor.get_route_metrics() if r["route"].startswith("GET /shop/product/{"))
+    assert route["db"]["queries"] > 0 and route["db"]["max_queries"] == route["db"]["queries"]
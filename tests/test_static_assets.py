@@ -0,0 +1,53 @@
+import gzip
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.services.static_assets import (
+    AssetManifest, PrecompressedStaticFiles, build_assets,
+    IMMUTABLE_CACHE_CONTROL, DEFAULT_CACHE_CONTROL
+)
+
+
+def make_static_dir(tmp_path):
+    """Создаёт каталог статики с файлами для сборки"""
+    static_dir = tmp_path / "static"
+    (static_dir / "uploads").mkdir(parents=True)
+    (static_dir / "site.css").write_text("body { color: black; }\n" * 50)
+    (static_dir / "uploads" / "photo.jpg").write_bytes(b"\xff\xd8\xff")
+    return static_dir
+
+
+def test_build_assets_manifest(tmp_path):
+    """Сборка добавляет хэш в имя и не трогает загрузки"""
+    static_dir = make_static_dir(tmp_path)
+    manifest = build_assets(static_dir)
+
+    assert set(manifest) == {"site.css"}
+    assert manifest["site.css"].startswith("build/site.")
+    assert (static_dir / (manifest["site.css"] + ".gz")).exists()
+
+    assets = AssetManifest(static_dir)
+    assert assets.url("site.css") == f"/static/{manifest['site.css']}"
+    assert assets.url("missing.js") == "/static/missing.js"
+
+
+def test_precompressed_static_files(tmp_path):
+    """Отдаётся gzip-вариант с immutable-кэшированием"""
+    static_dir = make_static_dir(tmp_path)
+    manifest = build_assets(static_dir)
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
+    client = TestClient(app)
+
+    response = client.get(f"/static/{manifest['site.css']}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert int(response.headers["content-length"]) == len(
+        gzip.compress((static_dir / manifest["site.css"]).read_bytes(), compresslevel=9, mtime=0)
+    )
+    assert response.text == (static_dir / "site.css").read_text()
+
+    response = client.get("/static/site.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["cache-control"] == DEFAULT_CACHE_CONTROL
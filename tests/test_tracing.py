@@ -0,0 +1,55 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware.tracing import TracingMiddleware
+from app.services.tracing import JSONLinesSpanExporter, Tracer, parse_traceparent, tracer
+
+
+def test_parse_traceparent():
+    """Разбор W3C traceparent: некорректные и нулевые идентификаторы отбрасываются"""
+    trace_id, span_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert parse_traceparent(f"00-{trace_id}-{span_id}-01") == (trace_id, span_id, True)
+    assert parse_traceparent(f"00-{trace_id}-{span_id}-00") == (trace_id, span_id, False)
+    assert parse_traceparent(f"00-{'0' * 32}-{span_id}-01") is None
+    assert parse_traceparent("garbage") is None and parse_traceparent(None) is None
+
+
+def test_disabled_tracer_creates_no_spans(tmp_path):
+    """Выключенный трейсер ничего не создаёт и не пишет"""
+    disabled = Tracer(JSONLinesSpanExporter(str(tmp_path / "traces.jsonl"), "test"), enabled=False)
+    with disabled.span("work") as span:
+        assert span is None
+    disabled.shutdown()
+    assert not (tmp_path / "traces.jsonl").exists()
+
+
+def test_request_trace_exported_as_otlp(monkeypatch, tmp_path, client, test_product):
+    """Запрос с traceparent даёт серверный спан с дочерними спанами SQL и шаблона в файле OTLP/JSON"""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "exporter", JSONLinesSpanExporter(str(path), "sirius-test"))
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    traced_client = TestClient(TracingMiddleware(app))
+    response = traced_client.get(f"/shop/product/{test_product.id}?from=tracing-test",
+                                 headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    tracer.exporter.shutdown()
+
+    assert response.status_code == 200
+    assert response.headers["traceresponse"].startswith(f"00-{trace_id}-")
+    lines = path.read_text(encoding="utf-8").splitlines()
+    resource_spans = [json.loads(line)["resourceSpans"][0] for line in lines]
+    assert resource_spans[0]["resource"]["attributes"][0] == {"key": "service.name", "value": {"stringValue": "sirius-test"}}
+    spans = [span for rs in resource_spans for scope in rs["scopeSpans"] for span in scope["spans"]]
+
+    server = next(span for span in spans if span["kind"] == 2)
+    assert server["name"] == "GET /shop/product/{product_id:int}"
+    assert server["traceId"] == trace_id and server["parentSpanId"] == parent_id
+    assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in server["attributes"]
+    assert "tracing-test" not in json.dumps(server["attributes"])  # Строка запроса в трассу не попадает
+
+    children = [span for span in spans if span["parentSpanId"] == server["spanId"]]
+    assert any(span["name"] == "SELECT products" and span["kind"] == 3 for span in children)
+    assert any(span["name"] == "render shop/product.html" for span in children)
+    assert all(span["traceId"] == trace_id for span in spans)
+    assert all(int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"]) for span in spans)
@@ -0,0 +1,130 @@
+import asyncio
+import io
+import os
+import time
+import tracemalloc
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from starlette.datastructures import UploadFile
+from starlette.requests import Request
+from app.middleware.upload_limit import RequestSizeLimitMiddleware
+from app.models import ProductPhoto
+from app.services.product_photos import ProductPhotoService
+
+MB = 1024 * 1024
+
+
+def run_asgi(app, headers, chunks):
+    """Прогоняет запрос через ASGI-приложение; возвращает (статус, сколько частей тела прочитано)"""
+    consumed = 0
+    sent = []
+
+    async def receive():
+        nonlocal consumed
+        if consumed < len(chunks):
+            consumed += 1
+            return {"type": "http.request", "body": chunks[consumed - 1], "more_body": consumed < len(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/upload", "headers": headers, "query_string": b""}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], consumed
+
+
+async def read_body_app(scope, receive, send):
+    body = await Request(scope, receive).body()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(len(body)).encode()})
+
+
+def test_oversized_upload_streamed_with_bounded_memory(upload_dirs):
+    """Файл больше лимита читается частями и отклоняется сразу после превышения"""
+    big = upload_dirs / "big.jpg"
+    with open(big, "wb") as f:
+        f.write(b"\xff\xd8\xff\xe0" + b"\x00" * 1024)
+        f.truncate(50 * MB)  # Разреженный файл - место на диске не занимает
+    # Прогрев: event loop и пул потоков не должны попасть в замер
+    with pytest.raises(HTTPException):
+        asyncio.run(ProductPhotoService.stream_upload(UploadFile(file=io.BytesIO(b"GIF89a"), filename="x.gif")))
+
+    with open(big, "rb") as source:
+        tracemalloc.start()
+        try:
+            with pytest.raises(HTTPException) as error:
+                asyncio.run(ProductPhotoService.stream_upload(UploadFile(file=source, filename="big.jpg")))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        bytes_read = source.tell()
+
+    assert error.value.status_code == 413
+    assert peak < 2 * MB  # В памяти не больше нескольких частей, а не 50 МБ
+    assert bytes_read <= ProductPhotoService.MAX_FILE_SIZE + ProductPhotoService.CHUNK_SIZE
+    assert list((upload_dirs / ".tmp").iterdir()) == []  # Временный файл удалён
+
+
+def test_magic_bytes_decide_format(client, db_session, test_product, upload_dirs):
+    """Формат определяется по содержимому, а не по имени и content_type клиента"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (0, 128, 255)).save(buffer, "PNG")
+    response = client.post(
+        f"/api/shop/products/{test_product.id}/photos",
+        files={"photo": ("photo.jpg", buffer.getvalue(), "image/jpeg")}
+    )
+    assert response.status_code == 200
+    photo = db_session.query(ProductPhoto).filter(ProductPhoto.product_id == test_product.id).one()
+    assert photo.mime_type == "image/png"
+    assert photo.file_path.endswith(".png")
+
+    disguised = client.post(
+        f"/api/shop/products/{test_product.id}/photos",
+        files={"photo": ("photo.jpg", b"<?php echo 1; ?>", "image/jpeg")}
+    )
+    assert disguised.status_code == 400
+
+
+def test_concurrent_upload_limit(client, test_product, upload_dirs, monkeypatch):
+    """Сверх лимита одновременных загрузок отвечаем 429"""
+    monkeypatch.setattr(ProductPhotoService, "_active_uploads", ProductPhotoService.MAX_CONCURRENT_UPLOADS)
+    response = client.post(
+        f"/api/shop/products/{test_product.id}/photos",
+        files={"photo": ("photo.jpg", b"\xff\xd8\xff\xe0", "image/jpeg")}
+    )
+    assert response.status_code == 429
+
+
+def test_request_size_limit_by_content_length():
+    """Content-Length больше лимита - 413 без чтения тела"""
+    app = RequestSizeLimitMiddleware(read_body_app, max_body_size=10 * MB)
+    status, consumed = run_asgi(app, [(b"content-length", str(200 * MB).encode())], [b"x" * MB])
+    assert status == 413
+    assert consumed == 0
+
+
+def test_request_size_limit_chunked():
+    """Без Content-Length чтение обрывается сразу после превышения лимита"""
+    app = RequestSizeLimitMiddleware(read_body_app, max_body_size=3 * MB)
+    status, consumed = run_asgi(app, [], [b"x" * MB] * 50)
+    assert status == 413
+    assert consumed == 4
+
+    status, _ = run_asgi(app, [], [b"x" * MB] * 2)
+    assert status == 200
+
+
+def test_reused_blob_mtime_refreshed(tmp_path):
+    """Повторная загрузка бывшей сироты обновляет mtime, чтобы сборщик мусора её не удалил"""
+    blob = tmp_path / "blob.jpg"
+    blob.write_bytes(b"old")
+    os.utime(blob, (1, 1))
+    temp = tmp_path / "upload.tmp"
+    temp.write_bytes(b"old")
+
+    ProductPhotoService.store_blob(temp, blob)
+
+    assert not temp.exists()
+    assert blob.stat().st_mtime > time.time() - 60